@@ -0,0 +1,127 @@
+"""Maintenance commands, run with `flask <command>`"""
+
+import click
+from flask.cli import with_appcontext
+from app.db import db
+
+
+@click.command('repair-ratings')
+@click.option('--ownership-id', 'ownership_ids', type=int, multiple=True,
+              help='Only repair these listings (repeatable); default is all')
+@with_appcontext
+def repair_ratings_command(ownership_ids):
+    """Recompute listing rating aggregates from the reviews table"""
+    from app.services.rating_service import repair_ratings
+
+    fixed = repair_ratings(ownership_ids or None)
+    db.session.commit()
+    click.echo(f"Repaired rating aggregates for {fixed} listing(s)")
+
+
+@click.command('import-catalog')
+@click.argument('source', type=click.File('rb'))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']),
+              help='Input format; default is from the file extension')
+@click.option('--batch-size', type=int, default=1000, show_default=True, help='Rows per INSERT batch')
+@with_appcontext
+def import_catalog_command(source, fmt, batch_size):
+    """Bulk-import instruments from a CSV or JSON Lines file (- for stdin)"""
+    from app.services.catalog_import import import_catalog
+
+    if fmt is None:
+        name = getattr(source, 'name', '')
+        if str(name).endswith('.csv'):
+            fmt = 'csv'
+        elif str(name).endswith(('.jsonl', '.ndjson')):
+            fmt = 'jsonl'
+        else:
+            raise click.UsageError("Cannot tell the format from the file name; pass --format")
+
+    summary = import_catalog(source, fmt, batch_size=batch_size)
+    for error in summary['errors']:
+        click.echo(f"line {error['line']}: {error['error']}", err=True)
+    rate = summary['rows'] / summary['seconds'] if summary['seconds'] else 0
+    click.echo(f"Read {summary['rows']} row(s): {summary['inserted']} inserted, "
+               f"{summary['duplicates']} duplicate(s), {summary['error_count']} error(s) "
+               f"in {summary['seconds']:.2f}s ({rate:.0f} rows/s)")
+
+
+@click.command('export')
+@click.argument('dataset', type=click.Choice(['instruments', 'listings', 'rentals', 'payments']))
+@click.option('--output', '-o', type=click.File('wb'), default='-', help='Output file (default: stdout)')
+@click.option('--format', 'fmt', type=click.Choice(['ndjson', 'csv']), default='ndjson', show_default=True)
+@click.option('--gzip', is_flag=True, help='Gzip-compress the output')
+@with_appcontext
+def export_command(dataset, output, fmt, gzip):
+    """Stream a whole table to a file as NDJSON or CSV"""
+    from app.services.export_service import export_chunks
+
+    for chunk in export_chunks(dataset, fmt, gzip):
+        output.write(chunk)
+
+
+@click.command('refresh-co-rentals')
+@click.option('--full', is_flag=True, help='Rebuild every neighbour list instead of folding in new rentals')
+@click.option('--top-k', type=int, default=20, show_default=True, help='Neighbours kept per instrument')
+@with_appcontext
+def refresh_co_rentals_command(full, top_k):
+    """Update the item-to-item co-rental neighbours from rental history"""
+    from app.services.co_rental_service import refresh_co_rentals
+
+    summary = refresh_co_rentals(full=full, k=top_k)
+    kind = 'Rebuilt' if summary['full'] else 'Updated'
+    click.echo(f"{kind} neighbours of {summary['instruments']} instrument(s) through rental "
+               f"{summary['rentals_through']} in {summary['seconds']:.2f}s")
+
+
+@click.command('refresh-recommendations')
+@click.option('--all', 'everyone', is_flag=True, help='Refresh every user, not just stale feeds')
+@click.option('--max-age', type=float, help='Also refresh feeds older than this many seconds')
+@click.option('--batch-size', type=int, default=100, show_default=True, help='Users per batch')
+@with_appcontext
+def refresh_recommendations_command(everyone, max_age, batch_size):
+    """Recompute stale (or all) precomputed recommendation feeds"""
+    from datetime import timedelta
+    from app.models import User
+    from app.services.user_feed_service import refresh_stale_feeds
+
+    user_ids = db.session.scalars(db.select(User.id)).all() if everyone else ()
+    refreshed = refresh_stale_feeds(batch_size, user_ids,
+                                    timedelta(seconds=max_age) if max_age is not None else None)
+    click.echo(f"Refreshed {refreshed} recommendation feed(s)")
+
+
+@click.command('feed-refresher')
+@with_appcontext
+def feed_refresher_command():
+    """Keep recommendation feeds fresh in the foreground (run one per deployment)"""
+    from flask import current_app
+    from app.services.user_feed_service import create_feed_refresher
+
+    refresher = create_feed_refresher(current_app._get_current_object())
+    click.echo(f"Refreshing stale recommendation feeds every {refresher.poll_interval:g}s (Ctrl+C to stop)")
+    try:
+        refresher.run()
+    except KeyboardInterrupt:
+        refresher.stop()
+
+
+@click.command('compact-leaderboards')
+@with_appcontext
+def compact_leaderboards_command():
+    """Rebuild the decayed leaderboards from rentals and reviews with a fresh epoch"""
+    from app.services.leaderboard_service import compact_leaderboards
+
+    summary = compact_leaderboards()
+    click.echo(f"Compacted leaderboards to {summary['entries']} entries "
+               f"(epoch {summary['epoch']:%Y-%m-%d %H:%M:%S}) in {summary['seconds']:.2f}s")
+
+
+def register_commands(app):
+    app.cli.add_command(repair_ratings_command)
+    app.cli.add_command(import_catalog_command)
+    app.cli.add_command(export_command)
+    app.cli.add_command(refresh_co_rentals_command)
+    app.cli.add_command(refresh_recommendations_command)
+    app.cli.add_command(feed_refresher_command)
+    app.cli.add_command(compact_leaderboards_command)
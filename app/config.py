@@ -1,3 +1,4 @@
+import json
 import os
 from datetime import timedelta
 
@@ -12,6 +13,67 @@ class Config:
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(days=7)
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)
     
+    # Cache-Control sent with ETag-validated public catalog/listing responses
+    PUBLIC_CACHE_CONTROL = os.environ.get('PUBLIC_CACHE_CONTROL') or 'public, no-cache'
+    
+    # Users allowed to export rentals and payments (comma-separated ids)
+    DATA_EXPORT_USER_IDS = {
+        int(uid) for uid in os.environ.get('DATA_EXPORT_USER_IDS', '').split(',') if uid.strip()
+    }
+    
+    # Extra instrument-type keywords, e.g. '{"ukulele": ["uke", "ukulele"], "guitar": ["strat"]}'
+    INSTRUMENT_KEYWORDS = json.loads(os.environ.get('INSTRUMENT_KEYWORDS') or '{}')
+    
+    # Hugging Face needs classifier: timeouts (s), LRU+TTL cache, circuit breaker
+    HF_CLASSIFICATION_URL = os.environ.get('HF_CLASSIFICATION_URL') or \
+        'https://api-inference.huggingface.co/models/facebook/bart-large-mnli'
+    HF_CONNECT_TIMEOUT = float(os.environ.get('HF_CONNECT_TIMEOUT') or 0.5)
+    HF_READ_TIMEOUT = float(os.environ.get('HF_READ_TIMEOUT') or 2.0)
+    HF_CACHE_SIZE = int(os.environ.get('HF_CACHE_SIZE') or 1024)
+    HF_CACHE_TTL = float(os.environ.get('HF_CACHE_TTL') or 3600)
+    HF_BREAKER_THRESHOLD = int(os.environ.get('HF_BREAKER_THRESHOLD') or 5)
+    HF_BREAKER_RESET = float(os.environ.get('HF_BREAKER_RESET') or 30)
+    # Classify concurrently with local scoring instead of before it
+    HF_CLASSIFY_CONCURRENT = (os.environ.get('HF_CLASSIFY_CONCURRENT') or 'true').lower() == 'true'
+    
+    # Precomputed recommendation feeds: in-app background refresher (off: run one `flask feed-refresher`
+    # process instead, since every web worker would start its own), batch size, poll and sweep periods
+    # and max age (s)
+    RECOMMENDATION_REFRESHER = (os.environ.get('RECOMMENDATION_REFRESHER') or 'false').lower() == 'true'
+    RECOMMENDATION_REFRESH_BATCH = int(os.environ.get('RECOMMENDATION_REFRESH_BATCH') or 100)
+    RECOMMENDATION_POLL_INTERVAL = float(os.environ.get('RECOMMENDATION_POLL_INTERVAL') or 10)
+    RECOMMENDATION_SWEEP_INTERVAL = float(os.environ.get('RECOMMENDATION_SWEEP_INTERVAL') or 3600)
+    RECOMMENDATION_MAX_AGE = float(os.environ.get('RECOMMENDATION_MAX_AGE') or 86400)
+    RECOMMENDATION_REFRESH_DELAY = float(os.environ.get('RECOMMENDATION_REFRESH_DELAY') or 1.0)
+    
+    # Most listings the shared inventory snapshot holds in memory (beyond: readers fall back to SQL)
+    INVENTORY_SNAPSHOT_MAX_LISTINGS = int(os.environ.get('INVENTORY_SNAPSHOT_MAX_LISTINGS') or 50000)
+    
+    # Decayed leaderboards: half-life, Bayesian prior (reviews' worth of weight), compaction period (s)
+    LEADERBOARD_HALF_LIFE_DAYS = float(os.environ.get('LEADERBOARD_HALF_LIFE_DAYS') or 30)
+    LEADERBOARD_PRIOR_WEIGHT = float(os.environ.get('LEADERBOARD_PRIOR_WEIGHT') or 5)
+    LEADERBOARD_COMPACT_INTERVAL = float(os.environ.get('LEADERBOARD_COMPACT_INTERVAL') or 86400)
+    
+    # Chatbot LLM job queue: worker threads, waiting-job limit (429 beyond), finished-job retention (s),
+    # and how long /chat and friends wait for their job before answering 202 with a job id (s; defaults to
+    # the Ollama generation timeout, so clients get a 200 unless they send "Prefer: respond-async")
+    LLM_WORKERS = int(os.environ.get('LLM_WORKERS') or 2)
+    LLM_QUEUE_SIZE = int(os.environ.get('LLM_QUEUE_SIZE') or 16)
+    LLM_JOB_TTL = float(os.environ.get('LLM_JOB_TTL') or 600)
+    LLM_SYNC_WAIT = float(os.environ.get('LLM_SYNC_WAIT') or 120)
+    
+    # Chatbot conversation memory: approximate token budget of the history in the prompt, and the
+    # part of it kept for the rolling summary of older turns (at most half)
+    CHAT_HISTORY_TOKENS = int(os.environ.get('CHAT_HISTORY_TOKENS') or 1024)
+    CHAT_SUMMARY_TOKENS = int(os.environ.get('CHAT_SUMMARY_TOKENS') or 256)
+    
+    # Chatbot response cache: entries (0 disables), lifetime (s), and the character-trigram
+    # similarity at which a near-duplicate question reuses a cached answer (0, the default, = exact
+    # normalized matches only; near-identical wording can ask something else, e.g. "under $20" vs "over $20")
+    CHAT_CACHE_SIZE = int(os.environ.get('CHAT_CACHE_SIZE') or 512)
+    CHAT_CACHE_TTL = float(os.environ.get('CHAT_CACHE_TTL') or 3600)
+    CHAT_CACHE_SIMILARITY = float(os.environ.get('CHAT_CACHE_SIMILARITY') or 0)
+    
     # Flask-Smorest API Configuration (Swagger/OpenAPI)
     API_TITLE = "Musical Instruments Rental API"
     API_VERSION = "v1.0.0"
@@ -0,0 +1,47 @@
+"""Conditional GET (ETag / If-None-Match) for public read endpoints"""
+
+import hashlib
+import json
+from functools import wraps
+from flask import current_app, g, make_response, request
+from app.services.change_counter_service import change_versions
+
+DEFAULT_CACHE_CONTROL = 'public, no-cache'
+
+
+def conditional_get(*tables, daily=False):
+    """
+    Decorator answering If-None-Match with 304 before the view runs.
+
+    The strong ETag hashes the request path and query string with the change
+    counters of `tables` (plus today's date when `daily`, for endpoints whose
+    default window is "today"). It is computed before the view queries
+    anything, so a write landing mid-request can only cause a spurious
+    refetch. Counters move just after their commit (see
+    change_counter_service), so a revalidation in between may still get a
+    304 for the previous state. The counters read are left in
+    g.etag_versions so the view can build its body from the same state.
+    Place it above the flask-smorest decorators.
+    Cache-Control comes from the PUBLIC_CACHE_CONTROL setting.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            g.etag_versions = versions = change_versions(tables)
+            key = [request.path, sorted(request.args.items(multi=True)), versions]
+            if daily:
+                from app.services.availability_service import today
+                key.append(today().isoformat())
+            etag = hashlib.sha1(json.dumps(key, sort_keys=True).encode('utf-8')).hexdigest()
+
+            if etag in request.if_none_match:
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = current_app.config.get('PUBLIC_CACHE_CONTROL', DEFAULT_CACHE_CONTROL)
+            return response
+        return wrapper
+    return decorator
@@ -10,9 +10,12 @@ from dotenv import load_dotenv
 # Load environment variables from .env file
 load_dotenv()
 
-def create_app():
+def create_app(test_config=None):
     app = Flask(__name__)
     app.config.from_object(Config)  
+    if test_config:
+        # Overrides must land before extensions read the config (e.g. the DB URI)
+        app.config.update(test_config)
     
     # Initialize extensions
     db.init_app(app)
@@ -45,7 +48,7 @@ def create_app():
     # Import blueprint modules
     from app.routes import (
         auth, instruments, rentals, recommendations, users, 
-        instru_ownership, dashboard, survey, payments, reviews, chatbot
+        instru_ownership, dashboard, survey, payments, reviews, chatbot, export
     )
     
     # Register all blueprints with the Api object for Flask-Smorest documentation
@@ -61,6 +64,17 @@ def create_app():
     api.register_blueprint(payments.bp)
     api.register_blueprint(reviews.blp)
     api.register_blueprint(chatbot.blp)
+    api.register_blueprint(export.blp)
+    
+    # Maintenance CLI commands (flask repair-ratings, ...)
+    from app.commands import register_commands
+    register_commands(app)
+    
+    # In-process refresh of precomputed recommendation feeds, for single-process deployments only;
+    # otherwise run `flask feed-refresher` once (tests start it explicitly)
+    if app.config['RECOMMENDATION_REFRESHER'] and not app.testing:
+        from app.services.user_feed_service import start_feed_refresher
+        start_feed_refresher(app)
     
     # Add helpful root endpoints (outside of API documentation)
     @app.route('/')
@@ -83,6 +97,7 @@ def create_app():
                 'reviews': '/api/reviews',
                 'chatbot': '/api/chatbot',
                 'dashboard': '/api/dashboard',
+                'export': '/api/export',
                 'users': '/api/users'
             }
         }), 200
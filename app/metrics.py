@@ -0,0 +1,74 @@
+"""In-process latency metrics
+
+Each metric keeps a count, a running total and a bounded window of recent
+samples for percentiles. Samples are per worker process, so scrape every
+worker, or export the recorded values to a real metrics backend, to get
+fleet-wide numbers.
+
+Tracked metrics:
+
+- chat.ttft: seconds from the start of a streamed chat job to its first token
+- chat.generation: seconds from the start of the job to the last token
+- llm.queue_wait: seconds an LLM job waited for a worker thread
+- llm.execution: seconds an LLM job ran (generation plus saving the exchange)
+
+/api/chatbot/metrics also reports llm.queue (the current queue state) and
+chat.cache (response cache size, hits, misses and hit ratio) alongside these.
+"""
+
+from collections import deque
+from threading import Lock
+from typing import Dict, Optional
+import numpy as np
+
+WINDOW = 1024  # Recent samples kept per metric for percentiles
+
+
+class Metric:
+    """Count, total and a sliding window of samples of one measurement"""
+
+    def __init__(self, window: int = WINDOW):
+        self.count = 0
+        self.total = 0.0
+        self._samples = deque(maxlen=window)
+        self._lock = Lock()
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self.count += 1
+            self.total += value
+            self._samples.append(value)
+
+    def summary(self) -> Dict:
+        """count, mean and p50/p95/p99 over the window (values in milliseconds)"""
+        with self._lock:
+            samples = np.array(self._samples, dtype=np.float64)
+            count, total = self.count, self.total
+        if not count:
+            return {'count': 0}
+        p50, p95, p99 = np.percentile(samples * 1000, [50, 95, 99])
+        return {'count': count, 'mean_ms': round(total / count * 1000, 3),
+                'p50_ms': round(float(p50), 3), 'p95_ms': round(float(p95), 3), 'p99_ms': round(float(p99), 3)}
+
+
+_metrics: Dict[str, Metric] = {}
+_registry_lock = Lock()
+
+
+def get_metric(name: str) -> Metric:
+    metric = _metrics.get(name)
+    if metric is None:
+        with _registry_lock:
+            metric = _metrics.setdefault(name, Metric())
+    return metric
+
+
+def observe(name: str, seconds: float) -> None:
+    """Record one sample of a latency metric"""
+    get_metric(name).observe(seconds)
+
+
+def summary(prefix: Optional[str] = None) -> Dict[str, Dict]:
+    """Summaries of every metric (optionally only names starting with prefix)"""
+    return {name: metric.summary() for name, metric in sorted(_metrics.items())
+            if prefix is None or name.startswith(prefix)}
@@ -7,5 +7,14 @@ from app.models.instru_ownership import Instru_ownership
 from app.models.survey_response import SurveyResponse
 from app.models.payment import Payment
 from app.models.chat_message import ChatMessage
+from app.models.chat_summary import ChatSummary
+from app.models.chat_session import ChatSession
+from app.models.booking import Booking
+from app.models.change_counter import ChangeCounter
+from app.models.instrument_neighbor import InstrumentNeighbor
+from app.models.job_checkpoint import JobCheckpoint
+from app.models.user_recommendation import UserRecommendation
+from app.models.leaderboard_entry import LeaderboardEntry
+from app.models.llm_job_state import LLMJobState
 
-__all__ = ['db', 'Instrument', 'Rental', 'Review', 'User', 'Instru_ownership', 'SurveyResponse', 'Payment', 'ChatMessage']
+__all__ = ['db', 'Instrument', 'Rental', 'Review', 'User', 'Instru_ownership', 'SurveyResponse', 'Payment', 'ChatMessage', 'ChatSummary', 'ChatSession', 'Booking', 'ChangeCounter', 'InstrumentNeighbor', 'JobCheckpoint', 'UserRecommendation', 'LeaderboardEntry', 'LLMJobState']
@@ -0,0 +1,38 @@
+from app.db import db
+from datetime import datetime
+from sqlalchemy import event, DDL
+
+class Booking(db.Model):
+    """A booked date interval (inclusive on both ends) for one listing"""
+    __tablename__ = 'bookings'
+    __table_args__ = (
+        db.Index('ix_bookings_ownership_period', 'instru_ownership_id', 'start_date', 'end_date'),
+        db.Index('ix_bookings_end_date', 'end_date'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    instru_ownership_id = db.Column(db.Integer, db.ForeignKey('instruments ownership.id'), nullable=False)
+    rental_id = db.Column(db.Integer, db.ForeignKey('rentals.id'), nullable=False, unique=True)
+    start_date = db.Column(db.Date, nullable=False)
+    end_date = db.Column(db.Date, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # Relationships
+    instru_ownership = db.relationship('Instru_ownership', back_populates='bookings')
+    rental = db.relationship('Rental', back_populates='booking')
+
+
+# PostgreSQL enforces "no two bookings of one listing overlap" itself, with an
+# exclusion constraint over daterange (backed by a GiST index), and gets a second
+# GiST index for "which listings are busy in [start, end]" scans.
+# The same DDL is applied to existing databases by migration d2a6e9f3b7c1.
+BOOKINGS_POSTGRES_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS btree_gist",
+    """ALTER TABLE bookings ADD CONSTRAINT bookings_no_overlap EXCLUDE USING gist (
+        instru_ownership_id WITH =, daterange(start_date, end_date, '[]') WITH &&
+    )""",
+    "CREATE INDEX ix_bookings_period ON bookings USING gist (daterange(start_date, end_date, '[]'))",
+]
+
+for statement in BOOKINGS_POSTGRES_DDL:
+    event.listen(Booking.__table__, 'after_create', DDL(statement).execute_if(dialect='postgresql'))
@@ -0,0 +1,9 @@
+from app.db import db
+
+
+class ChangeCounter(db.Model):
+    """Per-table write counter, bumped right after every commit that wrote to the table"""
+    __tablename__ = 'change_counters'
+
+    table_name = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0, server_default='0')
@@ -6,6 +6,10 @@ from datetime import datetime
 class ChatMessage(db.Model):
     """Store user and chatbot messages for conversation history"""
     __tablename__ = 'chat_messages'
+    __table_args__ = (
+        # Conversation memory reads a session's newest messages by id
+        db.Index('ix_chat_messages_session', 'user_id', 'session_id', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -13,6 +17,7 @@ class ChatMessage(db.Model):
     message_type = db.Column(db.String(20), nullable=False)  # 'user' or 'assistant'
     content = db.Column(db.Text, nullable=False)  # The actual message
     context_data = db.Column(db.JSON)  # Store metadata like user preferences used, instruments recommended
+    token_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # Approximate prompt tokens of content
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Relationships
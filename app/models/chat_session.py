@@ -0,0 +1,25 @@
+"""Chat session index: one row per conversation, kept in step with its messages"""
+from app.db import db
+
+
+class ChatSession(db.Model):
+    """
+    Summary row of one user's chat session (times, message count, title).
+
+    Updated by chatbot_service.save_chat_exchange with every stored exchange,
+    so listing sessions never has to scan chat_messages.
+    """
+    __tablename__ = 'chat_sessions'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'session_id', name='uq_chat_sessions_session'),
+        # The sessions list is a keyset scan of one user's rows, most recent first
+        db.Index('ix_chat_sessions_user_recent', 'user_id', 'last_message_at', 'id'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    session_id = db.Column(db.String(100), nullable=False)
+    started_at = db.Column(db.DateTime, nullable=False)
+    last_message_at = db.Column(db.DateTime, nullable=False)
+    message_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    title = db.Column(db.String(200))  # Start of the first user message
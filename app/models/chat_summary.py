@@ -0,0 +1,24 @@
+"""Rolling summary of the older turns of a chat session"""
+from app.db import db
+from datetime import datetime
+
+
+class ChatSummary(db.Model):
+    """
+    Condensed form of a session's messages up to through_message_id.
+
+    Maintained by conversation_memory: turns that no longer fit the prompt's
+    token budget are folded in, the newer ones are sent verbatim.
+    """
+    __tablename__ = 'chat_summaries'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'session_id', name='uq_chat_summaries_session'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    session_id = db.Column(db.String(100), nullable=False)
+    summary = db.Column(db.Text, nullable=False, default='')
+    token_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    through_message_id = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # Last folded message
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
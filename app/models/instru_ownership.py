@@ -3,6 +3,11 @@ from datetime import datetime
 
 class Instru_ownership(db.Model):
     __tablename__ = 'instruments ownership'
+    __table_args__ = (
+        # Available-listing reads filter on is_available and page by id
+        db.Index('ix_instruments_ownership_available_id', 'is_available', 'id'),
+        db.Index('ix_instruments_ownership_instrument_id', 'instrument_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -11,12 +16,34 @@ class Instru_ownership(db.Model):
     daily_rate = db.Column(db.Float, nullable=False)
     image_url = db.Column(db.String(255))
     location = db.Column(db.String(100))
-    is_available = db.Column(db.Boolean, default=True)
+    is_available = db.Column(db.Boolean, default=True)  # Listed by the owner; rented dates live in Booking
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Bumped by book_rental's claim UPDATE, which locks the listing so its bookings run one at a time
+    booking_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Review aggregates, maintained by rating_service alongside every review write
+    rating_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_sum = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_1 = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_2 = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_3 = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_4 = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_5 = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
     # Relationships
     user = db.relationship('User', back_populates='instru_ownerships')
     instrument = db.relationship('Instrument', back_populates='instru_ownerships')
     rentals = db.relationship('Rental', back_populates='instru_ownership')
     reviews = db.relationship('Review', back_populates='instru_ownership', cascade='all, delete-orphan')
-    
\ No newline at end of file
+    bookings = db.relationship('Booking', back_populates='instru_ownership', cascade='all, delete-orphan')
+    
+
+    @property
+    def average_rating(self):
+        """Mean review rating, or None when the listing has no reviews"""
+        if not self.rating_count:
+            return None
+        return self.rating_sum / self.rating_count
+
+    @property
+    def rating_distribution(self):
+        return {stars: getattr(self, f'rating_{stars}') or 0 for stars in range(1, 6)}
@@ -1,8 +1,15 @@
 from app.db import db
 from datetime import datetime
+from sqlalchemy import event, DDL
 
 class Instrument(db.Model):
     __tablename__ = 'instruments'
+    __table_args__ = (
+        # Keyset pagination walks (created_at, id); the category variant serves filtered pages
+        db.Index('ix_instruments_created_at_id', 'created_at', 'id'),
+        db.Index('ix_instruments_category_created_at_id', 'category', 'created_at', 'id'),
+        db.Index('ix_instruments_brand', 'brand'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -14,4 +21,46 @@ class Instrument(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Relationships
-    instru_ownerships = db.relationship('Instru_ownership', back_populates='instrument', lazy=True)
\ No newline at end of file
+    instru_ownerships = db.relationship('Instru_ownership', back_populates='instrument', lazy=True)
+
+
+# Full-text search index (queried by app/services/search_service.py).
+# PostgreSQL: a generated, weighted tsvector column with a GIN index.
+# SQLite: an FTS5 external-content table kept in sync by triggers.
+# The same DDL is applied to existing databases by migration b4f8c2d1e6a3.
+FTS_POSTGRES_DDL = [
+    """ALTER TABLE instruments ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(brand, '') || ' ' || coalesce(model, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(description, '')), 'C')
+    ) STORED""",
+    "CREATE INDEX ix_instruments_search_vector ON instruments USING GIN (search_vector)",
+]
+
+FTS_SQLITE_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS instruments_fts USING fts5(
+        name, brand, model, description,
+        content='instruments', content_rowid='id', tokenize='porter unicode61'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS instruments_fts_ai AFTER INSERT ON instruments BEGIN
+        INSERT INTO instruments_fts(rowid, name, brand, model, description)
+        VALUES (new.id, new.name, new.brand, new.model, new.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS instruments_fts_ad AFTER DELETE ON instruments BEGIN
+        INSERT INTO instruments_fts(instruments_fts, rowid, name, brand, model, description)
+        VALUES ('delete', old.id, old.name, old.brand, old.model, old.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS instruments_fts_au AFTER UPDATE ON instruments BEGIN
+        INSERT INTO instruments_fts(instruments_fts, rowid, name, brand, model, description)
+        VALUES ('delete', old.id, old.name, old.brand, old.model, old.description);
+        INSERT INTO instruments_fts(rowid, name, brand, model, description)
+        VALUES (new.id, new.name, new.brand, new.model, new.description);
+    END""",
+]
+
+for statement in FTS_POSTGRES_DDL:
+    event.listen(Instrument.__table__, 'after_create', DDL(statement).execute_if(dialect='postgresql'))
+for statement in FTS_SQLITE_DDL:
+    event.listen(Instrument.__table__, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+event.listen(Instrument.__table__, 'before_drop',
+             DDL("DROP TABLE IF EXISTS instruments_fts").execute_if(dialect='sqlite'))
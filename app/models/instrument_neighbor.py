@@ -0,0 +1,10 @@
+from app.db import db
+
+
+class InstrumentNeighbor(db.Model):
+    """Top-k co-rental neighbours of an instrument (cosine similarity over renters), rebuilt by co_rental_service"""
+    __tablename__ = 'instrument_neighbors'
+
+    instrument_id = db.Column(db.Integer, db.ForeignKey('instruments.id', ondelete='CASCADE'), primary_key=True)
+    neighbor_id = db.Column(db.Integer, db.ForeignKey('instruments.id', ondelete='CASCADE'), primary_key=True)
+    score = db.Column(db.Float, nullable=False)
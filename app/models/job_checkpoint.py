@@ -0,0 +1,11 @@
+from datetime import datetime
+from app.db import db
+
+
+class JobCheckpoint(db.Model):
+    """High-water mark of an incremental background job (e.g. the last rental id it has processed)"""
+    __tablename__ = 'job_checkpoints'
+
+    job = db.Column(db.String(64), primary_key=True)
+    position = db.Column(db.BigInteger, nullable=False, default=0, server_default='0')
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
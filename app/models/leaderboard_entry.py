@@ -0,0 +1,22 @@
+from app.db import db
+
+
+class LeaderboardEntry(db.Model):
+    """
+    An instrument's time-decayed rental and rating totals within one leaderboard scope.
+
+    Values are stored relative to the leaderboard epoch (see leaderboard_service),
+    so they only ever grow by plain increments and compare directly.
+    """
+    __tablename__ = 'leaderboard_entries'
+    __table_args__ = (
+        # Top-k by rentals within a scope is an index range scan
+        db.Index('ix_leaderboard_entries_popularity', 'scope', 'scope_key', 'popularity'),
+    )
+
+    scope = db.Column(db.String(16), primary_key=True)  # global, category, location
+    scope_key = db.Column(db.String(100), primary_key=True)  # '' for global, else lower-cased category/location
+    instrument_id = db.Column(db.Integer, db.ForeignKey('instruments.id', ondelete='CASCADE'), primary_key=True)
+    popularity = db.Column(db.Float, nullable=False, default=0, server_default='0')
+    rating_weight = db.Column(db.Float, nullable=False, default=0, server_default='0')
+    rating_sum = db.Column(db.Float, nullable=False, default=0, server_default='0')
@@ -0,0 +1,25 @@
+"""Shared state of queued chatbot LLM jobs"""
+from app.db import db
+
+
+class LLMJobState(db.Model):
+    """
+    Status and outcome of one LLMJobQueue job, visible to every server process.
+
+    A job runs in the process that accepted it, but its status URL may be
+    polled through any worker, so llm_jobs writes each transition here.
+    """
+    __tablename__ = 'llm_jobs'
+    __table_args__ = (
+        # Finished jobs are pruned by age
+        db.Index('ix_llm_jobs_finished', 'finished_at'),
+    )
+
+    id = db.Column(db.String(32), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    status = db.Column(db.String(16), nullable=False)  # queued, running, done or failed
+    result = db.Column(db.JSON)  # The job's return value once done
+    error = db.Column(db.Text)  # The failure message once failed
+    submitted_at = db.Column(db.DateTime, nullable=False)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
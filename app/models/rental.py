@@ -16,4 +16,5 @@ class Rental(db.Model):
     # Relationships
     user = db.relationship('User', back_populates='rentals')
     instru_ownership = db.relationship('Instru_ownership', back_populates='rentals')
-    review = db.relationship('Review', back_populates='rental', uselist=False, cascade='all, delete-orphan')
\ No newline at end of file
+    review = db.relationship('Review', back_populates='rental', uselist=False, cascade='all, delete-orphan')
+    booking = db.relationship('Booking', back_populates='rental', uselist=False, cascade='all, delete-orphan')
\ No newline at end of file
@@ -0,0 +1,18 @@
+from datetime import datetime
+from app.db import db
+
+
+class UserRecommendation(db.Model):
+    """Precomputed recommendation feed of one user (ranked instrument ids), kept fresh by user_feed_service"""
+    __tablename__ = 'user_recommendations'
+    __table_args__ = (
+        # The refresher picks stale rows, oldest first
+        db.Index('ix_user_recommendations_stale_computed_at', 'stale', 'computed_at'),
+    )
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    instrument_ids = db.Column(db.JSON, nullable=False, default=list)
+    computed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    stale = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
+    # Bumped with every stale mark, so a refresh only clears marks it has seen
+    version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
@@ -0,0 +1,61 @@
+"""Keyset (cursor) pagination helpers shared by list endpoints"""
+import base64
+import binascii
+import json
+from sqlalchemy import and_, or_
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(values):
+    """
+    Encode the sort key of the last row on a page into an opaque cursor.
+
+    Args:
+        values: JSON-serializable dict describing the last row's sort key
+
+    Returns:
+        URL-safe cursor string
+    """
+    raw = json.dumps(values, separators=(',', ':'), default=str).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor produced by encode_cursor.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (binascii.Error, UnicodeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {e}")
+    if not isinstance(values, dict):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def keyset_after(columns, values):
+    """
+    Build a WHERE clause selecting rows strictly after `values` in ascending
+    (columns...) order, i.e. (c1, c2) > (v1, v2) spelled out so it works on
+    every backend and can still use a composite index on the same columns.
+    """
+    clauses = []
+    for i, (column, value) in enumerate(zip(columns, values)):
+        equal_prefix = [c == v for c, v in zip(columns[:i], values[:i])]
+        clauses.append(and_(*equal_prefix, column > value))
+    return or_(*clauses)
+
+
+def keyset_before(columns, values):
+    """Descending counterpart of keyset_after: (c1, c2) < (v1, v2)"""
+    clauses = []
+    for i, (column, value) in enumerate(zip(columns, values)):
+        equal_prefix = [c == v for c, v in zip(columns[:i], values[:i])]
+        clauses.append(and_(*equal_prefix, column < value))
+    return or_(*clauses)
@@ -1,23 +1,97 @@
 """Routes for chatbot functionality"""
 
+from flask import Response, current_app, jsonify, request
 from flask.views import MethodView
 from flask_smorest import Blueprint, abort
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.db import db
-from app.models import ChatMessage, User
-from app.schemas import ChatQuerySchema, ChatResponseSchema, ChatMessageSchema
-from app.services.chatbot_service import chat_with_user, get_session_history
+from app.models import ChatMessage, ChatSession, ChatSummary, User
+from app.schemas import (
+    ChatQuerySchema, ChatResponseSchema, ChatJobSchema, ChatMessageSchema, ChatSessionListArgsSchema,
+    ChatSessionPageSchema
+)
+from app.services.chatbot_service import chat_with_user, get_session_history, stream_chat_with_user
+from app.services.response_cache import get_response_cache
+from app.services.llm_jobs import DONE, FAILED, QueueFull, get_llm_queue
+from app.metrics import summary as metrics_summary
+from app.pagination import encode_cursor, decode_cursor, keyset_before
+from datetime import datetime
+import json
+import queue
 import uuid
 
 blp = Blueprint('chatbot', __name__, url_prefix='/api/chatbot', description='Chatbot endpoints')
 
 
+def _chat_job(user_id, session_id, message):
+    """Job body: chat_with_user, with its error responses turned into failures"""
+    response = chat_with_user(user_id, session_id, message)
+    if 'error' in response:
+        raise RuntimeError(response['error'])
+    return ChatResponseSchema().dump(response)  # Stored in llm_jobs, so kept as JSON
+
+
+def _stream_job(events, user_id, session_id, message):
+    """Job body: stream_chat_with_user, handing each event to the request through events"""
+    try:
+        for event in stream_chat_with_user(user_id, session_id, message):
+            events.put(event)
+    except Exception:
+        events.put(('error', {'session_id': session_id, 'message': "The response was interrupted. Please try again."}))
+        raise
+    finally:
+        events.put(None)
+
+
+def _job_status(job):
+    body = job.to_dict()
+    body['status_url'] = f"{blp.url_prefix}/jobs/{job.id}"
+    if job.status == DONE:
+        body['result'] = job.result
+    return body
+
+
+def _submit(user_id, func, *args):
+    """Queue a chat job; 429 with Retry-After when the queue is full"""
+    jobs = get_llm_queue()
+    try:
+        return jobs.submit(user_id, func, *args)
+    except QueueFull:
+        abort(429, message="The assistant is busy, please retry shortly",
+              headers={'Retry-After': str(jobs.retry_after())})
+
+
+def _run_chat(user_id, session_id, message):
+    """
+    Run one chat turn on the LLM job queue.
+    
+    Returns the chat response once the job finishes. Clients that send
+    "Prefer: respond-async" get 202 with the job id to poll right away, as
+    does anyone whose job outlasts LLM_SYNC_WAIT seconds (by default the
+    generation timeout, so the synchronous contract holds). 429 with
+    Retry-After when the queue is full.
+    """
+    job = _submit(user_id, _chat_job, user_id, session_id, message)
+    
+    respond_async = 'respond-async' in request.headers.get('Prefer', '')
+    if not respond_async and job.wait(current_app.config['LLM_SYNC_WAIT']):
+        if job.status == FAILED:
+            abort(500, message=job.error)
+        return jsonify(job.result)
+    
+    response = jsonify(ChatJobSchema().dump(_job_status(job)))
+    response.status_code = 202
+    response.headers['Location'] = f"{blp.url_prefix}/jobs/{job.id}"
+    return response
+
+
 @blp.route('/chat')
 class ChatbotChat(MethodView):
     """Main endpoint for chatbot interaction"""
     
     @blp.arguments(ChatQuerySchema)
     @blp.response(200, ChatResponseSchema)
+    @blp.alt_response(202, schema=ChatJobSchema, description='Queued: poll status_url for the result')
     @jwt_required()
     def post(self, args):
         """Send a message to the chatbot and get a response"""
@@ -33,13 +107,133 @@ class ChatbotChat(MethodView):
         if not user_message or not user_message.strip():
             abort(400, message="Message cannot be empty")
         
-        # Get chatbot response
-        response = chat_with_user(user_id, session_id, user_message)
+        # Get chatbot response (queued; 202 with a job id if it takes longer than LLM_SYNC_WAIT)
+        return _run_chat(user_id, session_id, user_message)
+
+
+def _sse(event, data):
+    """One Server-Sent Events frame"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+@blp.route('/chat/stream')
+class ChatbotChatStream(MethodView):
+    """Streaming variant of /chat"""
+    
+    @blp.arguments(ChatQuerySchema)
+    @jwt_required()
+    def post(self, args):
+        """Send a message to the chatbot and stream the response as Server-Sent Events
+        
+        Events, each with a JSON data line:
+        - start: {session_id, source} where source is llm or fallback
+        - token: {text} for each piece of the reply as it is generated
+        - done: {session_id, message_id, assistant_response, recommendations, source, ttft_ms, total_ms}
+        - error: {session_id, message} if generation fails midway
+        
+        The [RECOMMENDATIONS] block is never streamed; it is parsed from the
+        end of the reply and returned in the done event. Messages are saved
+        once the stream completes. Generation runs on the LLM job queue like
+        /chat: 429 with Retry-After when the queue is full, and ": keep-alive"
+        comments while the job waits for an LLM worker. Workers must allow
+        long-lived responses (threaded or async), since a stream lasts as
+        long as generation.
+        """
+        user_id = int(get_jwt_identity())
+        User.query.get_or_404(user_id)
+        
+        session_id = args.get('session_id') or str(uuid.uuid4())
+        user_message = args.get('message')
+        if not user_message or not user_message.strip():
+            abort(400, message="Message cannot be empty")
+        
+        events = queue.Queue()
+        _submit(user_id, _stream_job, events, user_id, session_id, user_message)
         
-        if 'error' in response:
-            abort(500, message=response['error'])
+        def frames():
+            while True:
+                try:
+                    item = events.get(timeout=1.0)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                if item is None:
+                    return
+                yield _sse(*item)
         
-        return response
+        return Response(frames(), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+@blp.route('/jobs/<job_id>')
+class ChatbotJob(MethodView):
+    """Poll a queued chat job"""
+    
+    @blp.response(200, ChatJobSchema)
+    @jwt_required()
+    def get(self, job_id):
+        """Get a chat job's status, and its chat response once done
+        
+        status is queued, running, done (result holds the /chat response)
+        or failed (error holds the reason).
+        """
+        job = get_llm_queue().get(job_id)
+        if job is None or job.user_id != int(get_jwt_identity()):
+            abort(404, message=f"Job {job_id} not found")
+        return _job_status(job)
+
+
+@blp.route('/jobs/<job_id>/events')
+class ChatbotJobEvents(MethodView):
+    """Subscribe to a queued chat job"""
+    
+    @jwt_required()
+    def get(self, job_id):
+        """Stream a chat job's status changes as Server-Sent Events
+        
+        Sends a status event on every change (queued, running) and a final
+        done or failed event with the same body as GET /jobs/<job_id>.
+        """
+        job = get_llm_queue().get(job_id)
+        if job is None or job.user_id != int(get_jwt_identity()):
+            abort(404, message=f"Job {job_id} not found")
+        
+        def events():
+            status = None
+            while True:
+                finished = job.wait(timeout=1.0)
+                if job.status != status:
+                    status = job.status
+                    yield _sse(status if finished else 'status', ChatJobSchema().dump(_job_status(job)))
+                if finished:
+                    return
+                yield ": keep-alive\n\n"
+        
+        return Response(events(), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+@blp.route('/metrics')
+class ChatbotMetrics(MethodView):
+    """Chat latency metrics of this worker process"""
+    
+    @blp.response(200)
+    @jwt_required()
+    def get(self):
+        """Chat and LLM queue metrics
+        
+        chat.ttft / chat.generation: time to first token and total time of
+        streamed replies; llm.queue_wait / llm.execution: time jobs spend
+        waiting for a worker and running; llm.queue: current queue state;
+        chat.cache: response cache size, hits, misses and hit ratio.
+        """
+        metrics = metrics_summary('chat.')
+        metrics.update(metrics_summary('llm.'))
+        metrics['llm.queue'] = get_llm_queue().stats()
+        cache = get_response_cache()
+        if cache:
+            metrics['chat.cache'] = cache.stats()
+        return metrics
 
 
 @blp.route('/history/<session_id>')
@@ -67,44 +261,39 @@ class ChatbotHistory(MethodView):
 class ChatbotSessions(MethodView):
     """Get all conversation sessions for the current user"""
     
-    @blp.response(200)
+    @blp.arguments(ChatSessionListArgsSchema, location='query')
+    @blp.response(200, ChatSessionPageSchema)
     @jwt_required()
-    def get(self):
-        """Get all session IDs for the current user"""
+    def get(self, args):
+        """Get a page of the current user's sessions
+
+        Sessions are ordered by most recent message first and paginated with
+        a cursor: pass the returned next_cursor back as ?cursor= to get the
+        next page. Each page is one range scan of the chat_sessions index.
+        """
         user_id = int(get_jwt_identity())
+        query = ChatSession.query.filter_by(user_id=user_id)
         
-        # Get unique session IDs for this user
-        sessions = db.session.query(ChatMessage.session_id).filter_by(
-            user_id=user_id
-        ).distinct().all()
-        
-        session_list = []
-        for (session_id,) in sessions:
-            # Get first and last message for each session
-            first_msg = ChatMessage.query.filter_by(
-                user_id=user_id,
-                session_id=session_id
-            ).order_by(ChatMessage.created_at.asc()).first()
-            
-            last_msg = ChatMessage.query.filter_by(
-                user_id=user_id,
-                session_id=session_id
-            ).order_by(ChatMessage.created_at.desc()).first()
-            
-            session_list.append({
-                'session_id': session_id,
-                'started_at': first_msg.created_at if first_msg else None,
-                'last_message_at': last_msg.created_at if last_msg else None,
-                'message_count': ChatMessage.query.filter_by(
-                    user_id=user_id,
-                    session_id=session_id
-                ).count()
-            })
+        sort_columns = (ChatSession.last_message_at, ChatSession.id)
+        if args.get('cursor'):
+            try:
+                cursor = decode_cursor(args['cursor'])
+                before = (datetime.fromisoformat(cursor['last_message_at']), int(cursor['id']))
+            except (KeyError, TypeError, ValueError):
+                abort(400, message="Invalid cursor")
+            query = query.filter(keyset_before(sort_columns, before))
         
-        return {
-            'sessions': session_list,
-            'total_sessions': len(session_list)
-        }
+        # Fetch one extra row to learn whether another page exists
+        limit = args['limit']
+        sessions = query.order_by(*(column.desc() for column in sort_columns)).limit(limit + 1).all()
+        
+        next_cursor = None
+        if len(sessions) > limit:
+            sessions = sessions[:limit]
+            last = sessions[-1]
+            next_cursor = encode_cursor({'last_message_at': last.last_message_at.isoformat(), 'id': last.id})
+        
+        return {'sessions': sessions, 'next_cursor': next_cursor}
 
 
 @blp.route('/ask-instrument-question')
@@ -113,6 +302,7 @@ class AskInstrumentQuestion(MethodView):
     
     @blp.arguments(ChatQuerySchema)
     @blp.response(200, ChatResponseSchema)
+    @blp.alt_response(202, schema=ChatJobSchema, description='Queued: poll status_url for the result')
     @jwt_required()
     def post(self, args):
         """Ask the chatbot about instruments and get recommendations"""
@@ -127,12 +317,7 @@ class AskInstrumentQuestion(MethodView):
         # Enhance question context
         enhanced_question = f"Regarding musical instruments: {question}"
         
-        response = chat_with_user(user_id, session_id, enhanced_question)
-        
-        if 'error' in response:
-            abort(500, message=response['error'])
-        
-        return response
+        return _run_chat(user_id, session_id, enhanced_question)
 
 
 @blp.route('/recommend-for-me')
@@ -141,6 +326,7 @@ class RecommendForMe(MethodView):
     
     @blp.arguments(ChatQuerySchema)
     @blp.response(200, ChatResponseSchema)
+    @blp.alt_response(202, schema=ChatJobSchema, description='Queued: poll status_url for the result')
     @jwt_required()
     def post(self, args):
         """Get personalized instrument recommendations"""
@@ -154,12 +340,7 @@ class RecommendForMe(MethodView):
         {preference_question if preference_question else 'Consider my experience level, budget, and preferred genres.'}
         Please suggest 3-5 specific instruments from your available inventory that match my profile."""
         
-        response = chat_with_user(user_id, session_id, recommendation_prompt)
-        
-        if 'error' in response:
-            abort(500, message=response['error'])
-        
-        return response
+        return _run_chat(user_id, session_id, recommendation_prompt)
 
 
 @blp.route('/clear-session/<session_id>')
@@ -177,6 +358,9 @@ class ClearSession(MethodView):
             user_id=user_id,
             session_id=session_id
         ).delete()
+        # Along with the session's index row and the summary of its older turns
+        for model in (ChatSession, ChatSummary):
+            model.query.filter_by(user_id=user_id, session_id=session_id).delete()
         
         db.session.commit()
         
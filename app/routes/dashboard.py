@@ -3,6 +3,7 @@ from flask_smorest import Blueprint
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.models import User, Rental, Instru_ownership
 from app.schemas import RentalSchema, InstruOwnershipSchema
+from app.services.availability_service import busy_ownership_ids, today
 
 bp = Blueprint('dashboard', __name__, url_prefix='/api/dashboard')
 
@@ -32,6 +33,7 @@ class DashboardStats(MethodView):
             }
         else:  # owner
             ownerships = Instru_ownership.query.filter_by(user_id=user_id).all()
+            booked_today = busy_ownership_ids(today(), today())
             owned_instrument_ids = [o.id for o in ownerships]
             rentals = Rental.query.filter(Rental.instru_ownership_id.in_(owned_instrument_ids)).all()
             
@@ -39,7 +41,7 @@ class DashboardStats(MethodView):
                 'user_type': 'owner',
                 'statistics': {
                     'total_instruments': len(ownerships),
-                    'available_instruments': len([o for o in ownerships if o.is_available]),
+                    'available_instruments': len([o for o in ownerships if o.is_available and o.id not in booked_today]),
                     'total_rentals': len(rentals),
                     'active_rentals': len([r for r in rentals if r.status == 'active']),
                     'completed_rentals': len([r for r in rentals if r.status == 'completed']),
@@ -110,9 +112,10 @@ class OwnerDashboard(MethodView):
         # Get all instruments owned by this user
         ownerships = Instru_ownership.query.filter_by(user_id=user_id).all()
 
-        # Calculate statistics
+        # Calculate statistics (available = listed and not booked today)
+        booked_today = busy_ownership_ids(today(), today())
         total_instruments = len(ownerships)
-        available_instruments = len([o for o in ownerships if o.is_available])
+        available_instruments = len([o for o in ownerships if o.is_available and o.id not in booked_today])
         rented_instruments = total_instruments - available_instruments
 
         # Get all rentals for instruments owned by this user
@@ -151,7 +154,7 @@ class OwnerDashboard(MethodView):
                 'category': o.instrument.category,
                 'condition': o.condition,
                 'daily_rate': o.daily_rate,
-                'is_available': o.is_available,
+                'is_available': bool(o.is_available) and o.id not in booked_today,
                 'location': o.location,
                 'created_at': o.created_at.isoformat()
             } for o in ownerships],
@@ -0,0 +1,37 @@
+from flask import Response, current_app, stream_with_context
+from flask.views import MethodView
+from flask_smorest import Blueprint, abort
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.schemas import ExportArgsSchema
+from app.services.export_service import DATASETS, export_chunks, content_type, file_name
+
+blp = Blueprint('export', __name__, url_prefix='/api/export', description='Bulk data export')
+
+# Datasets with other users' personal/financial data
+RESTRICTED_DATASETS = {'rentals', 'payments'}
+
+
+@blp.route('/<string:dataset>')
+class Export(MethodView):
+    @blp.arguments(ExportArgsSchema, location='query')
+    @blp.response(200)
+    @jwt_required()
+    def get(self, args, dataset):
+        """Stream a whole table as NDJSON or CSV (optionally gzipped)
+
+        Datasets: instruments, listings, rentals, payments. Rows are streamed
+        straight from a database cursor, so any table size can be exported.
+        Rentals and payments are limited to users in DATA_EXPORT_USER_IDS.
+        """
+        if dataset not in DATASETS:
+            abort(404, message=f"Unknown dataset, expected one of: {', '.join(DATASETS)}")
+        if dataset in RESTRICTED_DATASETS and \
+                int(get_jwt_identity()) not in current_app.config.get('DATA_EXPORT_USER_IDS', set()):
+            abort(403, message="Not allowed to export this dataset")
+
+        fmt, gzip = args['format'], args['gzip']
+        return Response(
+            stream_with_context(export_chunks(dataset, fmt, gzip)),
+            mimetype=content_type(fmt, gzip),
+            headers={'Content-Disposition': f'attachment; filename="{file_name(dataset, fmt, gzip)}"'}
+        )
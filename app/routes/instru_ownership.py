@@ -3,16 +3,26 @@ from flask_smorest import Blueprint, abort
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.db import db
 from app.models import Instru_ownership, Instrument, User
-from app.schemas import InstruOwnershipSchema, InstruOwnershipUpdateSchema
+from app.schemas import (
+    InstruOwnershipSchema, InstruOwnershipUpdateSchema, AvailabilityPeriodArgsSchema, ListingAvailabilitySchema
+)
+from app.services.availability_service import free_during, resolve_period, bookings_for
+from app.etags import conditional_get
 
 bp = Blueprint('instru_ownership', __name__, url_prefix='/api/instru-ownership')
 
 @bp.route('')
 class InstruOwnershipList(MethodView):
+    @conditional_get('instruments', 'instruments ownership', 'bookings', daily=True)
+    @bp.arguments(AvailabilityPeriodArgsSchema, location='query')
     @bp.response(200, InstruOwnershipSchema(many=True))
-    def get(self):
-        """Get all available instruments for rent (public)"""
-        ownerships = Instru_ownership.query.filter_by(is_available=True).all()
+    def get(self, args):
+        """Get all instruments free to rent for a date window (public, default: today)"""
+        try:
+            free = free_during(args.get('start_date'), args.get('end_date'))
+        except ValueError as e:
+            abort(400, message=str(e))
+        ownerships = Instru_ownership.query.filter(free).all()
         return ownerships
 
     @bp.arguments(InstruOwnershipSchema)
@@ -59,6 +69,28 @@ class MyInstruments(MethodView):
         ownerships = Instru_ownership.query.filter_by(user_id=user_id).all()
         return ownerships
 
+@bp.route('/<int:ownership_id>/availability')
+class InstruOwnershipAvailability(MethodView):
+    @bp.arguments(AvailabilityPeriodArgsSchema, location='query')
+    @bp.response(200, ListingAvailabilitySchema)
+    def get(self, args, ownership_id):
+        """Check whether a listing is free for a date window and list overlapping bookings"""
+        ownership = Instru_ownership.query.get_or_404(ownership_id)
+        try:
+            start_date, end_date = resolve_period(args.get('start_date'), args.get('end_date'))
+        except ValueError as e:
+            abort(400, message=str(e))
+
+        bookings = bookings_for(ownership.id, start_date, end_date)
+        return {
+            'instru_ownership_id': ownership.id,
+            'start_date': start_date,
+            'end_date': end_date,
+            'is_listed': bool(ownership.is_available),
+            'is_free': bool(ownership.is_available) and not bookings,
+            'bookings': bookings
+        }
+
 @bp.route('/<int:ownership_id>')
 class InstruOwnershipResource(MethodView):
     @bp.response(200, InstruOwnershipSchema)
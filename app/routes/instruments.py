@@ -1,19 +1,66 @@
+from flask import request
 from flask.views import MethodView
 from flask_smorest import Blueprint, abort
 from flask_jwt_extended import jwt_required
 from app.db import db
 from app.models import Instrument, Instru_ownership
-from app.schemas import InstrumentSchema
+from app.schemas import (
+    InstrumentSchema, InstrumentListArgsSchema, InstrumentPageSchema, AvailableInstrumentsArgsSchema,
+    InstrumentSearchArgsSchema, InstrumentSearchPageSchema, AutocompleteArgsSchema,
+    CatalogImportArgsSchema, CatalogImportResultSchema, TrendingArgsSchema, TrendingInstrumentSchema
+)
+from app.pagination import encode_cursor, decode_cursor, keyset_after
+from app.etags import conditional_get
+from app.services.search_service import search_instruments
+from app.services.autocomplete_service import autocomplete
+from app.services.catalog_import import import_catalog
+from app.services.availability_service import free_during, resolve_period, today
+from app.services.inventory_service import INVENTORY_TABLES, get_inventory_snapshot
+from app.services.leaderboard_service import top_instruments
+from sqlalchemy import select
+from datetime import datetime
+from itertools import islice
 
 blp = Blueprint('instruments', __name__, url_prefix='/api/instruments', description='Instrument catalog endpoints')
 
 @blp.route('')
 class InstrumentList(MethodView):
-    @blp.response(200, InstrumentSchema(many=True))
-    def get(self):
-        """Get all instruments in the catalog"""
-        instruments = Instrument.query.all()
-        return instruments
+    @conditional_get('instruments')
+    @blp.arguments(InstrumentListArgsSchema, location='query')
+    @blp.response(200, InstrumentPageSchema)
+    def get(self, args):
+        """Get a page of instruments in the catalog
+
+        Results are ordered by (created_at, id) and paginated with a cursor:
+        pass the returned next_cursor back as ?cursor= to get the next page.
+        Optional exact-match filters: category, brand, model.
+        """
+        query = Instrument.query
+
+        for field in ('category', 'brand', 'model'):
+            if args.get(field):
+                query = query.filter(getattr(Instrument, field) == args[field])
+
+        sort_columns = (Instrument.created_at, Instrument.id)
+        if args.get('cursor'):
+            try:
+                cursor = decode_cursor(args['cursor'])
+                after = (datetime.fromisoformat(cursor['created_at']), int(cursor['id']))
+            except (KeyError, TypeError, ValueError):
+                abort(400, message="Invalid cursor")
+            query = query.filter(keyset_after(sort_columns, after))
+
+        # Fetch one extra row to learn whether another page exists
+        limit = args['limit']
+        instruments = query.order_by(*sort_columns).limit(limit + 1).all()
+
+        next_cursor = None
+        if len(instruments) > limit:
+            instruments = instruments[:limit]
+            last = instruments[-1]
+            next_cursor = encode_cursor({'created_at': last.created_at.isoformat(), 'id': last.id})
+
+        return {'items': instruments, 'next_cursor': next_cursor}
 
     @blp.arguments(InstrumentSchema)
     @blp.response(201, InstrumentSchema)
@@ -35,6 +82,109 @@ class InstrumentList(MethodView):
         db.session.commit()
         return instrument
 
+@blp.route('/import')
+class InstrumentImport(MethodView):
+    @blp.arguments(CatalogImportArgsSchema, location='query')
+    @blp.response(200, CatalogImportResultSchema)
+    @jwt_required()
+    def post(self, args):
+        """Bulk-import instruments from a CSV or JSON Lines request body
+
+        The body is streamed and parsed incrementally; send it raw with
+        Content-Type text/csv or application/x-ndjson (or pass ?format=).
+        Rows duplicating an existing (name, brand, model) are skipped and
+        invalid rows are reported by line number without stopping the import.
+        """
+        fmt = args.get('format')
+        if fmt is None:
+            content_type = request.mimetype or ''
+            if content_type in ('text/csv', 'application/csv'):
+                fmt = 'csv'
+            elif content_type in ('application/x-ndjson', 'application/jsonl', 'application/x-jsonlines'):
+                fmt = 'jsonl'
+            else:
+                abort(415, message="Send text/csv or application/x-ndjson, or pass ?format=csv|jsonl")
+        return import_catalog(request.stream, fmt, batch_size=args['batch_size'])
+
+@blp.route('/search')
+class InstrumentSearch(MethodView):
+    @blp.arguments(InstrumentSearchArgsSchema, location='query')
+    @blp.response(200, InstrumentSearchPageSchema)
+    def get(self, args):
+        """Full-text search over instrument name, brand, model and description
+
+        Results are ranked by relevance (best first) and paginated with
+        limit/offset; pass next_offset back as ?offset= for the next page.
+        """
+        limit = args['limit']
+        results = search_instruments(args['q'], limit=limit + 1, offset=args['offset'])
+
+        next_offset = None
+        if len(results) > limit:
+            results = results[:limit]
+            next_offset = args['offset'] + limit
+
+        return {
+            'items': [{
+                'id': instrument.id,
+                'name': instrument.name,
+                'category': instrument.category,
+                'brand': instrument.brand,
+                'model': instrument.model,
+                'description': instrument.description,
+                'created_at': instrument.created_at,
+                'score': round(score, 4)
+            } for instrument, score in results],
+            'next_offset': next_offset
+        }
+
+@blp.route('/autocomplete')
+class InstrumentAutocomplete(MethodView):
+    @blp.arguments(AutocompleteArgsSchema, location='query')
+    @blp.response(200)
+    def get(self, args):
+        """Suggest instrument names and brands starting with a prefix
+
+        Served from an in-memory sorted index, rebuilt when the catalog
+        changes; a request only reads the instruments change counter.
+        """
+        return {'suggestions': autocomplete(args['prefix'], args['limit'])}
+
+@blp.route('/trending')
+class TrendingInstruments(MethodView):
+    @blp.arguments(TrendingArgsSchema, location='query')
+    @blp.response(200, TrendingInstrumentSchema(many=True))
+    def get(self, args):
+        """Most rented (by=rentals) or best rated (by=rating) instruments, recent activity weighted most
+
+        Read from the precomputed leaderboards: global by default, or for one
+        category or location. Rental counts and ratings decay with a
+        LEADERBOARD_HALF_LIFE_DAYS half-life; ratings are ranked by a Bayesian
+        average so a single five-star review does not top the board.
+        """
+        if args.get('category') and args.get('location'):
+            abort(400, message="Pass at most one of category and location")
+        scope, key = 'global', ''
+        if args.get('category'):
+            scope, key = 'category', args['category']
+        elif args.get('location'):
+            scope, key = 'location', args['location']
+
+        leaders = top_instruments(args['by'], scope, key, limit=args['limit'])
+        instruments = {instrument.id: instrument for instrument in db.session.scalars(
+            select(Instrument).where(Instrument.id.in_([instrument_id for instrument_id, _ in leaders]))
+        )}
+        return [{
+            'id': instrument_id,
+            'name': instruments[instrument_id].name,
+            'category': instruments[instrument_id].category,
+            'brand': instruments[instrument_id].brand,
+            'model': instruments[instrument_id].model,
+            'description': instruments[instrument_id].description,
+            'created_at': instruments[instrument_id].created_at,
+            'score': round(score, 4)
+        } for instrument_id, score in leaders if instrument_id in instruments]
+
 @blp.route('/<int:instrument_id>')
 class InstrumentResource(MethodView):
     @blp.response(200, InstrumentSchema)
@@ -75,24 +225,94 @@ class InstrumentResource(MethodView):
 
 @blp.route('/available')
 class AvailableInstruments(MethodView):
+    @conditional_get(*INVENTORY_TABLES, daily=True)
+    @blp.arguments(AvailableInstrumentsArgsSchema, location='query')
     @blp.response(200)
-    def get(self):
-        """Get all available instruments for rent (with ownership details)"""
-        ownerships = Instru_ownership.query.filter_by(is_available=True).all()
-        
-        return [{
-            'id': o.id,
-            'instrument': {
-                'id': o.instrument.id,
-                'name': o.instrument.name,
-                'category': o.instrument.category,
-                'brand': o.instrument.brand,
-                'model': o.instrument.model,
-                'description': o.instrument.description
-            },
-            'condition': o.condition,
-            'daily_rate': o.daily_rate,
-            'image_url': o.image_url,
-            'location': o.location,
-            'owner_id': o.user_id
-        } for o in ownerships]
\ No newline at end of file
+    def get(self, args):
+        """Get available instruments for rent (with ownership details)
+
+        Requests for today are served from the shared in-process inventory
+        snapshot without touching the database. Other windows run one joined
+        query that selects only the columns the response needs.
+        Only listings free for the whole [start_date, end_date] window are
+        returned (default: today). Optional filters: category, location,
+        min_rate, max_rate. Paginated by listing id: pass next_cursor back as ?cursor=.
+        """
+        try:
+            start, end = resolve_period(args.get('start_date'), args.get('end_date'))
+        except ValueError as e:
+            abort(400, message=str(e))
+
+        after_id = None
+        if args.get('cursor'):
+            try:
+                after_id = int(decode_cursor(args['cursor'])['id'])
+            except (KeyError, TypeError, ValueError):
+                abort(400, message="Invalid cursor")
+
+        limit = args['limit']
+        snapshot = get_inventory_snapshot() if start == end == today() else None
+        if snapshot is not None and snapshot.complete:
+            rows = [listing._asdict() for listing in islice(snapshot.filter(
+                category=args.get('category'),
+                location=args.get('location'),
+                min_rate=args.get('min_rate'),
+                max_rate=args.get('max_rate'),
+                after_id=after_id
+            ), limit + 1)]
+        else:
+            query = select(
+                Instru_ownership.id,
+                Instru_ownership.condition,
+                Instru_ownership.daily_rate,
+                Instru_ownership.image_url,
+                Instru_ownership.location,
+                Instru_ownership.user_id.label('owner_id'),
+                Instrument.id.label('instrument_id'),
+                Instrument.name,
+                Instrument.category,
+                Instrument.brand,
+                Instrument.model,
+                Instrument.description
+            ).join(Instrument, Instru_ownership.instrument_id == Instrument.id
+            ).where(free_during(start, end))
+
+            if args.get('category'):
+                query = query.where(Instrument.category == args['category'])
+            if args.get('location'):
+                query = query.where(Instru_ownership.location == args['location'])
+            if args.get('min_rate') is not None:
+                query = query.where(Instru_ownership.daily_rate >= args['min_rate'])
+            if args.get('max_rate') is not None:
+                query = query.where(Instru_ownership.daily_rate <= args['max_rate'])
+            if after_id is not None:
+                query = query.where(Instru_ownership.id > after_id)
+
+            rows = db.session.execute(
+                query.order_by(Instru_ownership.id).limit(limit + 1)
+            ).mappings().all()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor({'id': rows[-1]['id']})
+
+        return {
+            'items': [{
+                'id': row['id'],
+                'instrument': {
+                    'id': row['instrument_id'],
+                    'name': row['name'],
+                    'category': row['category'],
+                    'brand': row['brand'],
+                    'model': row['model'],
+                    'description': row['description']
+                },
+                'condition': row['condition'],
+                'daily_rate': row['daily_rate'],
+                'image_url': row['image_url'],
+                'location': row['location'],
+                'owner_id': row['owner_id']
+            } for row in rows],
+            'next_cursor': next_cursor
+        }
@@ -4,6 +4,7 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.db import db
 from app.models import Payment, Rental, Instru_ownership
 from app.schemas import PaymentSchema, PaymentInitiateSchema, PaymentConfirmSchema, PaymentListSchema
+from app.services.availability_service import release
 import stripe
 import os
 from datetime import datetime
@@ -149,12 +150,9 @@ class PaymentConfirm(MethodView):
                 payment.completed_at = datetime.utcnow()
                 
                 # Update rental status to active
+                # (its dates were already booked when the rental was created)
                 rental.status = 'active'
                 
-                # Mark instrument as rented (unavailable)
-                ownership = rental.instru_ownership
-                ownership.is_available = False
-                
                 db.session.commit()
                 
                 return payment
@@ -223,11 +221,10 @@ class PaymentRefund(MethodView):
                 
                 payment.status = 'refunded'
                 
-                # Mark instrument as available again
+                # Free the booked dates again
                 rental = payment.rental
                 rental.status = 'cancelled'
-                ownership = rental.instru_ownership
-                ownership.is_available = True
+                release(rental)
                 
                 db.session.commit()
                 
@@ -1,10 +1,13 @@
 from flask.views import MethodView
 from flask_smorest import Blueprint
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.models import db, Instrument, Rental, Review, Instru_ownership
-from app.schemas import InstrumentSchema, InstrumentRecommendationRequestSchema
-from app.services.recommendation_service import recommend_instruments_by_needs
-from sqlalchemy import func
+from app.models import db, Instrument, Instru_ownership, UserRecommendation
+from app.schemas import InstrumentSchema, InstrumentRecommendationRequestSchema, InstrumentRecommendationBatchSchema
+from app.services.recommendation_service import recommend_instruments_by_needs, recommend_instruments_by_needs_batch
+from app.services.availability_service import free_during
+from app.services.user_feed_service import compute_recommendations, request_refresh, store_live_feed
+from sqlalchemy import select
+from datetime import datetime
 import os
 
 bp = Blueprint('recommendations', __name__, url_prefix='/api/recommendations', description='Recommendation endpoints')
@@ -17,64 +20,46 @@ class Recommendations(MethodView):
         """Get personalized recommendations
         
         Get instrument recommendations based on rental history and ratings.
-        Recommends similar instruments to what you've rented, most popular instruments,
-        and highest-rated instruments.
+        Recommends instruments most often co-rented with what you've rented,
+        instruments in categories you've rented or prefer, most popular and
+        highest-rated instruments.
+        
+        Served from the user's precomputed feed, refreshed in the background
+        after their rentals, reviews and survey change. New users get a live
+        computation. Response headers report freshness:
+        X-Recommendations-Source (precomputed or live),
+        X-Recommendations-Computed-At, X-Recommendations-Age (seconds) and
+        X-Recommendations-Stale (a refresh is pending).
         """
-        user_id = get_jwt_identity()
-        
-        # Get user's rental history
-        user_rentals = Rental.query.filter_by(user_id=user_id).all()
-        rented_categories = [r.instru_ownership.instrument.category for r in user_rentals]
-        
-        recommendations = []
-        
-        # Strategy 1: Similar instruments to what user has rented (available ownerships)
-        if rented_categories:
-            similar_ownerships = db.session.query(Instrument).join(
-                Instru_ownership, Instru_ownership.instrument_id == Instrument.id
-            ).filter(
-                Instrument.category.in_(rented_categories),
-                Instru_ownership.is_available == True
-            ).distinct().limit(5).all()
-            recommendations.extend(similar_ownerships)
-        
-        # Strategy 2: Popular instruments (most rented) - only from available ownerships
-        popular = db.session.query(
-            Instrument,
-            func.count(Rental.id).label('rental_count')
-        ).join(Instru_ownership, Instru_ownership.instrument_id == Instrument.id
-        ).join(Rental, Rental.instru_ownership_id == Instru_ownership.id
-        ).filter(
-            Instru_ownership.is_available == True
-        ).group_by(Instrument.id).order_by(
-            func.count(Rental.id).desc()
-        ).limit(5).all()
-        
-        recommendations.extend([p[0] for p in popular])
-        
-        # Strategy 3: Highest rated instruments - only from available ownerships
-        top_rated = db.session.query(
-            Instrument,
-            func.avg(Review.rating).label('avg_rating')
-        ).join(Instru_ownership, Instru_ownership.instrument_id == Instrument.id
-        ).join(Review, Review.instru_ownership_id == Instru_ownership.id
-        ).filter(
-            Instru_ownership.is_available == True
-        ).group_by(Instrument.id).order_by(
-            func.avg(Review.rating).desc()
-        ).limit(5).all()
-        
-        recommendations.extend([t[0] for t in top_rated])
-        
-        # Remove duplicates while preserving order
-        seen = set()
-        unique_recommendations = []
-        for instrument in recommendations:
-            if instrument.id not in seen:
-                seen.add(instrument.id)
-                unique_recommendations.append(instrument)
-        
-        return unique_recommendations[:10]
+        user_id = int(get_jwt_identity())
+        limit = 10
+        free_today = free_during()
+        feed = db.session.get(UserRecommendation, user_id)
+        
+        if feed is not None:
+            # Stored ranking, minus instruments with no listing free today
+            ranked = feed.instrument_ids
+            free = Instrument.query.filter(
+                Instrument.id.in_(ranked),
+                Instrument.id.in_(select(Instru_ownership.instrument_id).where(free_today))
+            ).all()
+            computed_at = feed.computed_at
+            headers = {
+                'X-Recommendations-Source': 'precomputed',
+                'X-Recommendations-Stale': 'true' if feed.stale else 'false',
+            }
+        else:
+            ranked = compute_recommendations(user_id, available=free_today, limit=limit)
+            free = Instrument.query.filter(Instrument.id.in_(ranked)).all() if ranked else []
+            computed_at = datetime.utcnow()
+            headers = {'X-Recommendations-Source': 'live', 'X-Recommendations-Stale': 'false'}
+            if not request_refresh([user_id]):
+                store_live_feed(user_id, ranked)  # For the refresher running elsewhere
+        
+        headers['X-Recommendations-Computed-At'] = computed_at.isoformat() + 'Z'
+        headers['X-Recommendations-Age'] = str(max(0, int((datetime.utcnow() - computed_at).total_seconds())))
+        by_id = {instrument.id: instrument for instrument in free}
+        return [by_id[i] for i in ranked if i in by_id][:limit], headers
 
 @bp.route('/by-needs')
 class RecommendationsByNeeds(MethodView):
@@ -108,4 +93,27 @@ class RecommendationsByNeeds(MethodView):
             hf_token=hf_token
         )
         
-        return recommendations
\ No newline at end of file
+        return recommendations
+
+@bp.route('/by-needs/batch')
+class RecommendationsByNeedsBatch(MethodView):
+    @bp.arguments(InstrumentRecommendationBatchSchema)
+    @bp.response(200)
+    @jwt_required()
+    def post(self, args):
+        """Get needs-based recommendations for many requests at once
+        
+        Scores every item against one load of the inventory, so a batch costs
+        about one database round-trip plus the scoring work, instead of one
+        round-trip per /by-needs call.
+        
+        Args:
+            items (list): Up to 500 {user_needs, budget, experience_level} objects
+            limit (int, optional): Recommendations per item (default 5, max 20)
+        
+        Returns:
+            One result per item, in order, each shaped like the /by-needs response
+        """
+        hf_token = os.getenv("HUGGINGFACE_API_KEY", None)
+        results = recommend_instruments_by_needs_batch(args['items'], hf_token=hf_token, limit=args['limit'])
+        return {"results": results, "count": len(results)}
@@ -4,7 +4,7 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.db import db
 from app.models import Rental, Instru_ownership
 from app.schemas import RentalSchema
-from datetime import datetime, timezone
+from app.services.availability_service import book_rental, release, end_early, today, BookingConflict
 
 blp = Blueprint('rentals', __name__, url_prefix='/api/rentals', description='Rental management endpoints')
 
@@ -19,9 +19,6 @@ class RentalList(MethodView):
 
         ownership = Instru_ownership.query.get_or_404(rental_data['instru_ownership_id'])
 
-        if not ownership.is_available:
-            abort(400, message="Instrument not available")
-
         if ownership.user_id == user_id:
             abort(400, message="You cannot rent your own instrument")
 
@@ -29,24 +26,15 @@ class RentalList(MethodView):
         start_date = rental_data['start_date']
         end_date = rental_data['end_date']
 
-        # Calculate cost
-        days = (end_date - start_date).days + 1
-        total_cost = days * ownership.daily_rate
-
-        rental = Rental(
-            user_id=user_id,
-            instru_ownership_id=ownership.id,
-            start_date=start_date,
-            end_date=end_date,
-            total_cost=total_cost,
-            status='pending'
-        )
+        if end_date < start_date:
+            abort(400, message="end_date must be on or after start_date")
 
-        # Mark ownership as unavailable
-        ownership.is_available = False
-
-        db.session.add(rental)
-        db.session.commit()
+        # Reserve the dates and create the pending rental in one transaction;
+        # fails if they overlap another booking of this listing
+        try:
+            rental = book_rental(ownership.id, user_id, start_date, end_date)
+        except BookingConflict as e:
+            abort(409, message=str(e))
 
         return rental
 
@@ -85,8 +73,8 @@ class RentalResource(MethodView):
         if rental.status != 'pending':
             abort(400, message="Cannot cancel rental that is already active")
 
-        # Make ownership available again
-        rental.instru_ownership.is_available = True
+        # Free the booked dates
+        release(rental)
 
         db.session.delete(rental)
         db.session.commit()
@@ -124,9 +112,9 @@ class ReturnRental(MethodView):
         if rental.user_id != user_id:
             abort(403, message="Unauthorized")
 
-        rental.actual_return_date = datetime.now(timezone.utc).date()
+        rental.actual_return_date = today()
         rental.status = 'completed'
-        rental.instru_ownership.is_available = True
+        end_early(rental, rental.actual_return_date)
 
         db.session.commit()
 
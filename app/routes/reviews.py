@@ -5,10 +5,21 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.db import db
 from app.models import Review, Rental, Instru_ownership, User
 from app.schemas import ReviewSchema, ReviewCreateSchema, ReviewUpdateSchema
-from sqlalchemy import func
+from app.services.rating_service import record_rating
 
 blp = Blueprint('reviews', 'reviews', url_prefix='/api/reviews', description='Operations on reviews')
 
+
+def rating_stats(ownership):
+    """Average, count and distribution from the listing's stored aggregates"""
+    average = ownership.average_rating
+    return {
+        'average_rating': round(average, 2) if average is not None else None,
+        'total_reviews': ownership.rating_count,
+        'rating_distribution': ownership.rating_distribution
+    }
+
+
 class ReviewList(MethodView):
     """Get all reviews or filter by ownership"""
     
@@ -77,6 +88,7 @@ class ReviewList(MethodView):
         )
         
         db.session.add(review)
+        record_rating(review.instru_ownership_id, new=review.rating)
         db.session.commit()
         
         return review, 201
@@ -100,11 +112,12 @@ class ReviewDetail(MethodView):
         review = Review.query.get_or_404(review_id, description='Review not found')
         
         # Verify the user is the reviewer
-        if review.renter_id != renter_id:
+        if review.renter_id != int(renter_id):
             abort(403, message='Can only update your own reviews')
         
         # Update fields
         if 'rating' in args:
+            record_rating(review.instru_ownership_id, old=review.rating, new=args['rating'])
             review.rating = args['rating']
         if 'comment' in args:
             review.comment = args['comment']
@@ -120,9 +133,10 @@ class ReviewDetail(MethodView):
         review = Review.query.get_or_404(review_id, description='Review not found')
         
         # Verify the user is the reviewer
-        if review.renter_id != renter_id:
+        if review.renter_id != int(renter_id):
             abort(403, message='Can only delete your own reviews')
         
+        record_rating(review.instru_ownership_id, old=review.rating)
         db.session.delete(review)
         db.session.commit()
 
@@ -149,22 +163,7 @@ class InstruOwnershipWithReviews(MethodView):
             instru_ownership_id=instru_ownership_id
         ).order_by(Review.created_at.desc()).all()
         
-        # Calculate statistics
-        stats = {
-            'average_rating': None,
-            'total_reviews': len(reviews),
-            'rating_distribution': {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}
-        }
-        
-        if reviews:
-            avg_result = db.session.query(func.avg(Review.rating)).filter_by(
-                instru_ownership_id=instru_ownership_id
-            ).scalar()
-            stats['average_rating'] = round(float(avg_result), 2) if avg_result else None
-            
-            # Calculate rating distribution
-            for review in reviews:
-                stats['rating_distribution'][review.rating] += 1
+        stats = rating_stats(ownership)
         
         # Get owner info
         owner = User.query.get(ownership.user_id)
@@ -235,21 +234,7 @@ class OwnerOwnedInstruments(MethodView):
                 instru_ownership_id=ownership.id
             ).order_by(Review.created_at.desc()).all()
             
-            # Calculate stats
-            stats = {
-                'average_rating': None,
-                'total_reviews': len(reviews),
-                'rating_distribution': {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}
-            }
-            
-            if reviews:
-                avg_result = db.session.query(func.avg(Review.rating)).filter_by(
-                    instru_ownership_id=ownership.id
-                ).scalar()
-                stats['average_rating'] = round(float(avg_result), 2) if avg_result else None
-                
-                for review in reviews:
-                    stats['rating_distribution'][review.rating] += 1
+            stats = rating_stats(ownership)
             
             result['instruments'].append({
                 'id': ownership.id,
@@ -264,7 +249,7 @@ class OwnerOwnedInstruments(MethodView):
                 'daily_rate': ownership.daily_rate,
                 'location': ownership.location,
                 'is_available': ownership.is_available,
-                'review_count': len(reviews),
+                'review_count': stats['total_reviews'],
                 'average_rating': stats['average_rating'],
                 'reviews': [
                     {
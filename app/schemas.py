@@ -1,4 +1,4 @@
-from marshmallow import Schema, fields
+from marshmallow import Schema, fields, validate
 
 class UserSchema(Schema):
     class Meta:
@@ -46,6 +46,116 @@ class InstrumentUpdateSchema(Schema):
     description = fields.Str()
     image_url = fields.Str()
 
+class InstrumentListArgsSchema(Schema):
+    """Query parameters for the paginated catalog listing"""
+    class Meta:
+        title = "InstrumentListArgs"
+
+    category = fields.Str()
+    brand = fields.Str()
+    model = fields.Str()
+    limit = fields.Int(load_default=20, validate=validate.Range(min=1, max=100))
+    cursor = fields.Str()  # Opaque next_cursor value from the previous page
+
+class InstrumentPageSchema(Schema):
+    """One page of the catalog listing"""
+    class Meta:
+        title = "InstrumentPage"
+
+    items = fields.List(fields.Nested(InstrumentSchema))
+    next_cursor = fields.Str(allow_none=True)  # None when this is the last page
+
+class InstrumentSearchArgsSchema(Schema):
+    """Query parameters for catalog full-text search"""
+    class Meta:
+        title = "InstrumentSearchArgs"
+
+    q = fields.Str(required=True, validate=validate.Length(min=1, max=200))
+    limit = fields.Int(load_default=20, validate=validate.Range(min=1, max=100))
+    offset = fields.Int(load_default=0, validate=validate.Range(min=0, max=1000))
+
+class InstrumentSearchResultSchema(InstrumentSchema):
+    class Meta:
+        title = "InstrumentSearchResult"
+
+    score = fields.Float(dump_only=True)  # Relevance, higher is better
+
+class InstrumentSearchPageSchema(Schema):
+    class Meta:
+        title = "InstrumentSearchPage"
+
+    items = fields.List(fields.Nested(InstrumentSearchResultSchema))
+    next_offset = fields.Int(allow_none=True)  # None when there are no more results
+
+class AutocompleteArgsSchema(Schema):
+    """Query parameters for name/brand autocomplete"""
+    class Meta:
+        title = "AutocompleteArgs"
+
+    prefix = fields.Str(required=True, validate=validate.Length(min=1, max=100))
+    limit = fields.Int(load_default=10, validate=validate.Range(min=1, max=50))
+
+class TrendingArgsSchema(Schema):
+    """Query parameters for the decayed leaderboards"""
+    class Meta:
+        title = "TrendingArgs"
+
+    by = fields.Str(load_default='rentals', validate=validate.OneOf(['rentals', 'rating']))
+    category = fields.Str()  # At most one of category and location (default: global)
+    location = fields.Str()
+    limit = fields.Int(load_default=10, validate=validate.Range(min=1, max=50))
+
+class TrendingInstrumentSchema(InstrumentSchema):
+    class Meta:
+        title = "TrendingInstrument"
+
+    score = fields.Float(dump_only=True)  # Decayed rentals, or Bayesian average rating
+
+class CatalogImportArgsSchema(Schema):
+    """Query parameters for the bulk catalog import"""
+    class Meta:
+        title = "CatalogImportArgs"
+
+    format = fields.Str(validate=validate.OneOf(['csv', 'jsonl']))  # Default: from Content-Type
+    batch_size = fields.Int(load_default=1000, validate=validate.Range(min=1, max=10000))
+
+class CatalogImportErrorSchema(Schema):
+    line = fields.Int()
+    error = fields.Str()
+
+class CatalogImportResultSchema(Schema):
+    class Meta:
+        title = "CatalogImportResult"
+
+    rows = fields.Int()
+    inserted = fields.Int()
+    duplicates = fields.Int()
+    error_count = fields.Int()
+    errors = fields.List(fields.Nested(CatalogImportErrorSchema))
+    seconds = fields.Float()
+
+class ExportArgsSchema(Schema):
+    """Query parameters for bulk exports"""
+    class Meta:
+        title = "ExportArgs"
+
+    format = fields.Str(load_default='ndjson', validate=validate.OneOf(['ndjson', 'csv']))
+    gzip = fields.Bool(load_default=False)
+
+class AvailableInstrumentsArgsSchema(Schema):
+    """Query parameters for the available-listings read path"""
+    class Meta:
+        title = "AvailableInstrumentsArgs"
+
+    category = fields.Str()
+    location = fields.Str()
+    min_rate = fields.Float(validate=validate.Range(min=0))
+    max_rate = fields.Float(validate=validate.Range(min=0))
+    start_date = fields.Date()  # Only listings free for the whole period (default: today)
+    end_date = fields.Date()
+    limit = fields.Int(load_default=20, validate=validate.Range(min=1, max=100))
+    cursor = fields.Str()  # Opaque next_cursor value from the previous page
+
 class InstruOwnershipSchema(Schema):
     class Meta:
         title = "InstruOwnership"
@@ -63,6 +173,33 @@ class InstruOwnershipSchema(Schema):
     # Nested instrument info
     instrument = fields.Nested(InstrumentSchema, dump_only=True)
 
+class AvailabilityPeriodArgsSchema(Schema):
+    """Date window for availability queries (both ends inclusive, default: today)"""
+    class Meta:
+        title = "AvailabilityPeriodArgs"
+
+    start_date = fields.Date()
+    end_date = fields.Date()
+
+class BookingSchema(Schema):
+    class Meta:
+        title = "Booking"
+
+    rental_id = fields.Int(dump_only=True)
+    start_date = fields.Date(dump_only=True)
+    end_date = fields.Date(dump_only=True)
+
+class ListingAvailabilitySchema(Schema):
+    class Meta:
+        title = "ListingAvailability"
+
+    instru_ownership_id = fields.Int()
+    start_date = fields.Date()
+    end_date = fields.Date()
+    is_listed = fields.Bool()
+    is_free = fields.Bool()
+    bookings = fields.List(fields.Nested(BookingSchema))
+
 class InstruOwnershipUpdateSchema(Schema):
     class Meta:
         title = "InstruOwnershipUpdate"
@@ -164,7 +301,7 @@ class ReviewSchema(Schema):
     rental_id = fields.Int(dump_only=True)
     instru_ownership_id = fields.Int(dump_only=True)
     renter_id = fields.Int(dump_only=True)
-    rating = fields.Int(required=True, validate=lambda x: 1 <= x <= 5)
+    rating = fields.Int(required=True, validate=validate.Range(min=1, max=5))
     comment = fields.Str(allow_none=True)
     created_at = fields.DateTime(dump_only=True)
     updated_at = fields.DateTime(dump_only=True)
@@ -176,14 +313,14 @@ class ReviewCreateSchema(Schema):
     
     instru_ownership_id = fields.Int(required=True)  # Fixed: was rental_id
     rental_id = fields.Int(required=True)
-    rating = fields.Int(required=True, validate=lambda x: 1 <= x <= 5)
+    rating = fields.Int(required=True, validate=validate.Range(min=1, max=5))
     comment = fields.Str(allow_none=True)
 
 class ReviewUpdateSchema(Schema):
     class Meta:
         title = "ReviewUpdate"
     
-    rating = fields.Int(validate=lambda x: 1 <= x <= 5)
+    rating = fields.Int(validate=validate.Range(min=1, max=5))
     comment = fields.Str(allow_none=True)
 
 class ChatMessageSchema(Schema):
@@ -195,6 +332,29 @@ class ChatMessageSchema(Schema):
     context_data = fields.Dict(dump_only=True)
     created_at = fields.DateTime(dump_only=True)
 
+class ChatSessionListArgsSchema(Schema):
+    """Query parameters for the chat sessions list"""
+    class Meta:
+        title = "ChatSessionListArgs"
+
+    limit = fields.Int(load_default=20, validate=validate.Range(min=1, max=100))
+    cursor = fields.Str()  # Opaque next_cursor value from the previous page
+
+class ChatSessionSchema(Schema):
+    session_id = fields.Str()
+    title = fields.Str(allow_none=True)  # Start of the first question
+    started_at = fields.DateTime()
+    last_message_at = fields.DateTime()
+    message_count = fields.Int()
+
+class ChatSessionPageSchema(Schema):
+    """One page of chat sessions, most recently active first"""
+    class Meta:
+        title = "ChatSessionPage"
+
+    sessions = fields.List(fields.Nested(ChatSessionSchema))
+    next_cursor = fields.Str(allow_none=True)  # None when this is the last page
+
 class ChatQuerySchema(Schema):
     """Schema for user queries to the chatbot"""
     session_id = fields.Str(required=False, allow_none=True)  # Optional, will be auto-generated if not provided
@@ -206,9 +366,24 @@ class ChatResponseSchema(Schema):
     user_message = fields.Str()
     assistant_response = fields.Str()
     recommendations = fields.List(fields.Dict())  # List of recommended instruments
+    cached = fields.Bool()  # Answered from the response cache
     context = fields.Dict()  # Context data used for response
     created_at = fields.DateTime()
 
+class ChatJobSchema(Schema):
+    """Status of a queued chat job (202 responses of the chat endpoints, /jobs/<job_id>)"""
+    class Meta:
+        title = "ChatJob"
+    
+    job_id = fields.Str()
+    status = fields.Str()  # queued, running, done or failed
+    status_url = fields.Str()  # Poll this, or subscribe to status_url + '/events'
+    submitted_at = fields.DateTime()
+    started_at = fields.DateTime(allow_none=True)
+    finished_at = fields.DateTime(allow_none=True)
+    error = fields.Str(allow_none=True)  # Set when failed
+    result = fields.Dict()  # The ChatResponse, once done
+
 class InstrumentRecommendationRequestSchema(Schema):
     """Schema for AI-based instrument recommendation requests"""
     class Meta:
@@ -217,4 +392,12 @@ class InstrumentRecommendationRequestSchema(Schema):
     user_needs = fields.Str(required=True)  # e.g., "beginner guitarist looking for affordable acoustic guitar"
     budget = fields.Float(required=False, allow_none=True)
     experience_level = fields.Str(required=False, allow_none=True)
-    use_case = fields.Str(required=False, allow_none=True)
\ No newline at end of file
+    use_case = fields.Str(required=False, allow_none=True)
+class InstrumentRecommendationBatchSchema(Schema):
+    """Schema for scoring many recommendation requests in one call"""
+    class Meta:
+        title = "InstrumentRecommendationBatch"
+    
+    items = fields.List(fields.Nested(InstrumentRecommendationRequestSchema), required=True,
+                        validate=validate.Length(min=1, max=500))
+    limit = fields.Int(load_default=5, validate=validate.Range(min=1, max=20))  # Recommendations per item
@@ -0,0 +1,94 @@
+"""In-memory prefix index for instrument name/brand autocomplete
+
+The index is immutable and rebuilt when the instruments change counter
+moves, so every process serves the committed catalog whichever process
+wrote it, and lookups in between never touch the catalog.
+"""
+
+from bisect import bisect_left
+from threading import Lock
+from typing import Dict, Iterable, List
+from sqlalchemy import select
+from app.db import db
+from app.models import Instrument
+from app.services.change_counter_service import change_versions
+
+
+def _normalize(value: str) -> str:
+    return " ".join(value.lower().split())
+
+
+class PrefixIndex:
+    """
+    Sorted array of (normalized term, display text, kind, instrument id) entries.
+
+    A prefix lookup is one bisect plus a scan over the matching run. Names
+    and brands are indexed as whole strings and also from each later word,
+    so "strat" and "fender strat" both find "Fender Stratocaster".
+    """
+
+    def __init__(self, rows: Iterable[tuple] = ()):
+        """Index (id, name, brand) rows"""
+        entries = set()
+        for instrument_id, name, brand in rows:
+            for kind, value in (('name', name), ('brand', brand)):
+                if not value:
+                    continue
+                display = value.strip()
+                words = _normalize(display).split(" ")
+                for i in range(len(words)):
+                    entries.add((" ".join(words[i:]), display, kind, instrument_id))
+        self._entries = sorted(entries)
+
+    def search(self, prefix: str, limit: int = 10) -> List[Dict]:
+        """
+        Return up to `limit` distinct suggestions whose term starts with prefix.
+
+        Suggestions are ordered by their matched term, so the closest
+        completions of the typed text come first.
+        """
+        key = _normalize(prefix)
+        if not key:
+            return []
+
+        results = []
+        seen = set()
+        entries = self._entries
+        i = bisect_left(entries, (key,))
+        while i < len(entries) and len(results) < limit:
+            term, display, kind, instrument_id = entries[i]
+            if not term.startswith(key):
+                break
+            if (display, kind) not in seen:
+                seen.add((display, kind))
+                results.append({'text': display, 'type': kind, 'instrument_id': instrument_id})
+            i += 1
+        return results
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_cached = None  # (key, index)
+_build_lock = Lock()
+
+
+def get_prefix_index() -> PrefixIndex:
+    """Index over the current catalog, rebuilt when the instruments change counter moves"""
+    global _cached
+    key = (db.engine, change_versions(['instruments'])['instruments'])
+    cached = _cached
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    with _build_lock:
+        cached = _cached
+        if cached is None or cached[0] != key:
+            rows = db.session.execute(select(Instrument.id, Instrument.name, Instrument.brand)).all()
+            cached = (key, PrefixIndex(rows))
+            _cached = cached
+        return cached[1]
+
+
+def autocomplete(prefix: str, limit: int = 10) -> List[Dict]:
+    """Suggest instrument names and brands starting with prefix"""
+    return get_prefix_index().search(prefix, limit)
@@ -0,0 +1,279 @@
+"""Date-range availability engine for instrument listings
+
+Booked intervals live in the `bookings` table (one row per pending/active
+rental, dates inclusive). Two questions are answered here:
+
+- "is listing X free for [start, end]?"       -> is_free()
+- "which listings are free for [start, end]?" -> free_during() / busy_ownership_ids()
+
+On PostgreSQL both go to SQL, where daterange overlap (&&) is served by
+GiST indexes and an exclusion constraint rejects overlapping bookings.
+On SQLite the listing-wide question is answered by an in-process interval
+tree over current and future bookings, rebuilt when the bookings change
+counter moves.
+"""
+
+import random
+import time
+from bisect import bisect_right
+from datetime import date, datetime, timedelta, timezone
+from threading import Lock
+from typing import Iterable, List, Optional, Set, Tuple
+from sqlalchemy import and_, exists, func, literal_column, select, update
+from sqlalchemy.exc import IntegrityError, OperationalError
+from app.db import db
+from app.models import Booking, Instru_ownership, Rental
+from app.services.change_counter_service import request_versions
+
+# Bounded retry for bookings that lose a race; backoff grows linearly (seconds)
+MAX_BOOKING_ATTEMPTS = 5
+BOOKING_RETRY_BACKOFF = 0.02
+
+
+class BookingConflict(Exception):
+    """The requested dates overlap an existing booking of the listing"""
+
+
+def today() -> date:
+    """Current date in UTC, the calendar all bookings are expressed in"""
+    return datetime.now(timezone.utc).date()
+
+
+class IntervalTree:
+    """
+    Static interval tree over inclusive (start, end, key) intervals.
+
+    Intervals are kept sorted by start and viewed as an implicit balanced
+    binary tree (the middle element of each slice is its root); every node
+    stores the largest end in its subtree. An overlap query walks only the
+    subtrees that can still contain a hit: O(log n + k).
+    """
+
+    def __init__(self, intervals: Iterable[Tuple[date, date, int]]):
+        self._items = sorted(intervals)
+        self._starts = [item[0] for item in self._items]
+        self._max_end = [None] * len(self._items)
+        if self._items:
+            self._build(0, len(self._items))
+
+    def _build(self, lo: int, hi: int):
+        mid = (lo + hi) // 2
+        max_end = self._items[mid][1]
+        if lo < mid:
+            max_end = max(max_end, self._build(lo, mid))
+        if mid + 1 < hi:
+            max_end = max(max_end, self._build(mid + 1, hi))
+        self._max_end[mid] = max_end
+        return max_end
+
+    def overlapping(self, start: date, end: date) -> Set[int]:
+        """Keys of all intervals that share at least one day with [start, end]"""
+        # Only intervals starting on or before `end` can overlap
+        limit = bisect_right(self._starts, end)
+        keys = set()
+        self._collect(0, len(self._items), start, limit, keys)
+        return keys
+
+    def _collect(self, lo: int, hi: int, start: date, limit: int, keys: Set[int]):
+        if lo >= hi or lo >= limit:
+            return
+        mid = (lo + hi) // 2
+        if self._max_end[mid] < start:
+            return  # Everything in this subtree ends before the window opens
+        self._collect(lo, mid, start, limit, keys)
+        if mid < limit:
+            item_start, item_end, key = self._items[mid]
+            if item_end >= start:
+                keys.add(key)
+            self._collect(mid + 1, hi, start, limit, keys)
+
+    def __len__(self):
+        return len(self._items)
+
+
+# In-process tree for SQLite, keyed by (engine, bookings change counter, day);
+# the counter is shared, so bookings written by any process trigger a rebuild
+_tree = None
+_tree_key = None
+_tree_lock = Lock()
+
+
+def _interval_tree() -> IntervalTree:
+    """Tree over bookings that end today or later (past bookings never block new ones)"""
+    global _tree, _tree_key
+    current_day = today()
+    key = (db.engine, request_versions([Booking.__tablename__])[Booking.__tablename__], current_day)
+    if _tree_key != key:
+        with _tree_lock:
+            if _tree_key != key:
+                rows = db.session.execute(
+                    select(Booking.start_date, Booking.end_date, Booking.instru_ownership_id)
+                    .where(Booking.end_date >= current_day)
+                ).all()
+                _tree = IntervalTree((start, end, ownership_id) for start, end, ownership_id in rows)
+                _tree_key = key
+    return _tree
+
+
+def _use_sql() -> bool:
+    return db.engine.dialect.name == 'postgresql'
+
+
+def _overlaps(start: date, end: date):
+    """SQL criterion: a booking row shares at least one day with [start, end]"""
+    if _use_sql():
+        # Spelled exactly like the indexed expression (inline '[]' literal) so the GiST indexes apply
+        inclusive = literal_column("'[]'")
+        return func.daterange(Booking.start_date, Booking.end_date, inclusive).op('&&')(
+            func.daterange(start, end, inclusive)
+        )
+    return and_(Booking.start_date <= end, Booking.end_date >= start)
+
+
+def validate_period(start: date, end: date) -> None:
+    if end < start:
+        raise ValueError("end_date must be on or after start_date")
+
+
+def resolve_period(start: Optional[date] = None, end: Optional[date] = None) -> Tuple[date, date]:
+    """Fill in the default window: today, or a single day when only start is given"""
+    start = start or today()
+    end = end or start
+    validate_period(start, end)
+    return start, end
+
+
+def busy_ownership_ids(start: date, end: date) -> Set[int]:
+    """Ids of listings with at least one booking overlapping [start, end]"""
+    validate_period(start, end)
+    if not _use_sql() and start >= today():
+        return _interval_tree().overlapping(start, end)
+    rows = db.session.execute(
+        select(Booking.instru_ownership_id).where(_overlaps(start, end)).distinct()
+    ).scalars()
+    return set(rows)
+
+
+def free_during(start: Optional[date] = None, end: Optional[date] = None):
+    """
+    SQL criterion for Instru_ownership queries: the listing is listed by its
+    owner and has no booking overlapping [start, end] (default: today).
+    """
+    start, end = resolve_period(start, end)
+    listed = Instru_ownership.is_available == True
+
+    if _use_sql():
+        booked = exists().where(
+            Booking.instru_ownership_id == Instru_ownership.id,
+            _overlaps(start, end)
+        )
+        return and_(listed, ~booked)
+
+    busy = busy_ownership_ids(start, end)
+    if not busy:
+        return listed
+    return and_(listed, Instru_ownership.id.notin_(busy))
+
+
+def is_free(ownership_id: int, start: date, end: date, exclude_rental_id: Optional[int] = None) -> bool:
+    """True if listing `ownership_id` has no booking overlapping [start, end]"""
+    validate_period(start, end)
+    query = select(Booking.id).where(
+        Booking.instru_ownership_id == ownership_id,
+        _overlaps(start, end)
+    )
+    if exclude_rental_id is not None:
+        query = query.where(Booking.rental_id != exclude_rental_id)
+    return db.session.execute(query.limit(1)).first() is None
+
+
+def bookings_for(ownership_id: int, start: date, end: date) -> List[Booking]:
+    """Bookings of one listing overlapping [start, end], in date order"""
+    validate_period(start, end)
+    return Booking.query.filter(
+        Booking.instru_ownership_id == ownership_id,
+        _overlaps(start, end)
+    ).order_by(Booking.start_date).all()
+
+
+def book_rental(ownership_id: int, user_id: int, start: date, end: date) -> Rental:
+    """
+    Atomically reserve [start, end] on a listing and create the pending rental.
+
+    Each attempt first claims the listing with an atomic
+    "UPDATE ... SET booking_version = booking_version + 1": a row lock on
+    PostgreSQL and the write lock on SQLite, so concurrent bookings of one
+    listing queue up instead of interleaving. It then re-checks for
+    overlapping bookings, inserts the rental and its booking and commits.
+    Other writes to the listing (an owner editing it) are not
+    version-checked; they just wait for the claim's lock. Attempts that still lose a race
+    (PostgreSQL's exclusion constraint, a busy SQLite database) are rolled
+    back and retried a bounded number of times, so exactly one of several
+    racing requests for the same dates wins. Commits on success.
+
+    Raises:
+        ValueError: If the period is inverted
+        BookingConflict: If the listing is unlisted, the dates are taken, or
+            the listing stayed contended for every attempt
+    """
+    validate_period(start, end)
+
+    for attempt in range(MAX_BOOKING_ATTEMPTS):
+        try:
+            claimed = db.session.execute(
+                update(Instru_ownership.__table__)
+                .where(Instru_ownership.__table__.c.id == ownership_id)
+                .values(booking_version=Instru_ownership.__table__.c.booking_version + 1)
+            ).rowcount
+            if not claimed:
+                raise BookingConflict("Instrument is not listed for rent")
+            ownership = db.session.query(Instru_ownership).filter_by(
+                id=ownership_id
+            ).populate_existing().one()
+
+            if not ownership.is_available:
+                raise BookingConflict("Instrument is not listed for rent")
+            if not is_free(ownership.id, start, end):
+                raise BookingConflict("Instrument is already booked for these dates")
+
+            rental = Rental(
+                user_id=user_id,
+                instru_ownership_id=ownership.id,
+                start_date=start,
+                end_date=end,
+                total_cost=((end - start).days + 1) * ownership.daily_rate,
+                status='pending'
+            )
+            db.session.add(rental)
+            db.session.add(Booking(instru_ownership=ownership, rental=rental, start_date=start, end_date=end))
+            db.session.commit()
+            return rental
+
+        except BookingConflict:
+            db.session.rollback()
+            raise
+        except (IntegrityError, OperationalError):
+            # Lost the race (exclusion constraint) or the database was busy
+            db.session.rollback()
+            time.sleep(random.uniform(0, BOOKING_RETRY_BACKOFF * (attempt + 1)))
+
+    raise BookingConflict("Instrument is busy, please try again")
+
+
+def release(rental) -> None:
+    """Free the dates held by a rental that was cancelled or refunded"""
+    if rental.booking is not None:
+        db.session.delete(rental.booking)
+        rental.booking = None
+
+
+def end_early(rental, return_date: date) -> None:
+    """Free the remaining days of a rental returned on return_date"""
+    booking = rental.booking
+    if booking is None:
+        return
+    last_day = return_date - timedelta(days=1)  # The instrument can go out again on the return day
+    if last_day < booking.start_date:
+        release(rental)
+    elif last_day < booking.end_date:
+        booking.end_date = last_day
@@ -0,0 +1,141 @@
+"""Streaming bulk import of catalog instruments from CSV or JSON Lines
+
+Rows are parsed incrementally from a binary stream (request body or file),
+validated, de-duplicated in memory against the (name, brand, model) keys
+already in the catalog (loaded once, one query) and inserted with batched
+Core executemany INSERTs, one transaction per batch. Bad rows are reported
+with their line number and skipped; they never abort the import.
+
+CSV input needs a header row; recognised columns are name, category, brand,
+model and description (extra columns are ignored). JSON Lines input has one
+object per line with the same keys.
+"""
+
+import csv
+import io
+import json
+import time
+from datetime import datetime
+from typing import Dict, Iterator, Tuple
+from sqlalchemy import insert, select
+from app.db import db
+from app.models import Instrument
+from app.services.change_counter_service import bump_change_counters
+
+FORMATS = ('csv', 'jsonl')
+DEFAULT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+
+# Column -> max length, mirroring the Instrument model
+_REQUIRED = {'name': 100, 'category': 50}
+_OPTIONAL = {'brand': 50, 'model': 50, 'description': None}
+
+
+def _iter_csv(text) -> Iterator[Tuple[int, object]]:
+    reader = csv.DictReader(text)
+    if reader.fieldnames is None:
+        return
+    for record in reader:
+        yield reader.line_num, record
+
+
+def _iter_jsonl(text) -> Iterator[Tuple[int, object]]:
+    for line_no, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield line_no, json.loads(line)
+        except ValueError as e:
+            yield line_no, ValueError(f"Invalid JSON: {e}")
+
+
+def _clean(record) -> Dict:
+    """Validate one parsed record and return insertable column values"""
+    if not isinstance(record, dict):
+        raise ValueError("Row must be an object")
+    row = {}
+    for field, max_length in {**_REQUIRED, **_OPTIONAL}.items():
+        value = record.get(field)
+        if value is not None and not isinstance(value, str):
+            raise ValueError(f"{field} must be a string")
+        value = value.strip() if value else None
+        if not value:
+            if field in _REQUIRED:
+                raise ValueError(f"{field} is required")
+            value = None
+        elif max_length and len(value) > max_length:
+            raise ValueError(f"{field} is longer than {max_length} characters")
+        row[field] = value
+    return row
+
+
+def import_catalog(stream, fmt: str, batch_size: int = DEFAULT_BATCH_SIZE) -> Dict:
+    """
+    Import instruments from a binary stream of CSV or JSON Lines.
+
+    Rows whose (name, brand, model) already exists, in the catalog or
+    earlier in the same input, are counted as duplicates and skipped.
+
+    Returns:
+        Summary dict: rows, inserted, duplicates, error_count, errors
+        (first MAX_REPORTED_ERRORS as {'line', 'error'}) and seconds
+
+    Raises:
+        ValueError: If fmt is not a supported format
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format '{fmt}', expected one of: {', '.join(FORMATS)}")
+
+    started = time.perf_counter()
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    records = _iter_csv(text) if fmt == 'csv' else _iter_jsonl(text)
+
+    seen = set(db.session.execute(select(Instrument.name, Instrument.brand, Instrument.model)).tuples())
+    table = Instrument.__table__
+    summary = {'rows': 0, 'inserted': 0, 'duplicates': 0, 'error_count': 0, 'errors': []}
+    batch = []
+
+    def flush():
+        now = datetime.utcnow()
+        for row in batch:
+            row['created_at'] = now
+        db.session.execute(insert(table), batch)
+        bump_change_counters([table.name])
+        db.session.commit()
+        summary['inserted'] += len(batch)
+        batch.clear()
+
+    try:
+        for line_no, record in records:
+            summary['rows'] += 1
+            try:
+                if isinstance(record, Exception):
+                    raise record
+                row = _clean(record)
+            except ValueError as e:
+                summary['error_count'] += 1
+                if len(summary['errors']) < MAX_REPORTED_ERRORS:
+                    summary['errors'].append({'line': line_no, 'error': str(e)})
+                continue
+
+            key = (row['name'], row['brand'], row['model'])
+            if key in seen:
+                summary['duplicates'] += 1
+                continue
+            seen.add(key)
+            batch.append(row)
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+    except (UnicodeDecodeError, csv.Error) as e:
+        # The stream is unreadable past this point; keep the rows parsed before it
+        if batch:
+            flush()
+        summary['error_count'] += 1
+        summary['errors'].append({'line': summary['rows'] + 1, 'error': f"Unreadable input: {e}"})
+    finally:
+        text.detach()
+
+    summary['seconds'] = round(time.perf_counter() - started, 3)
+    return summary
@@ -0,0 +1,105 @@
+"""Per-table change counters, the basis of ETags on public read endpoints
+
+Every flush that inserts, updates or deletes ORM objects records the
+affected tables on the session; once the transaction commits, their
+change_counters rows are bumped in a separate, short transaction. Writers
+therefore never hold a counter row lock for the length of their own
+transaction, so unrelated writes to one table do not queue behind each
+other. A counter moves right after committed data does (a revalidation in
+that instant may still get one 304 for the previous state) and is shared
+by all processes. Readers fetch the counters they depend on with one
+primary-key lookup, which is cheap enough to run before deciding whether
+to answer 304.
+"""
+
+from typing import Dict, Iterable
+from flask import g, has_request_context
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.db import db
+from app.models import ChangeCounter
+
+_counters = ChangeCounter.__table__
+
+
+@event.listens_for(Session, 'after_flush')
+def _record_flushed_tables(session, flush_context):
+    tables = {
+        obj.__table__.name
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted)
+        if hasattr(obj, '__table__') and not isinstance(obj, ChangeCounter)
+    }
+    if tables:
+        bump_change_counters(tables, session)
+
+
+@event.listens_for(Session, 'after_commit')
+def _stage_committed_tables(session):
+    if not session.in_nested_transaction():  # A released savepoint commits nothing yet
+        session.info['committed_tables'] = session.info.pop('changed_tables', set())
+
+
+@event.listens_for(Session, 'after_transaction_end')
+def _bump_committed_tables(session, transaction):
+    # Runs once the session has handed its connection back, so the bump never waits on the pool for a second one
+    if transaction.parent is None:
+        tables = session.info.pop('committed_tables', None)
+        if tables:
+            _bump(session.get_bind(), tables)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changed_tables(session):
+    if not session.in_nested_transaction():
+        session.info.pop('changed_tables', None)
+
+
+def bump_change_counters(tables: Iterable[str], session: Session = None) -> None:
+    """
+    Bump the counters of tables once the current transaction commits.
+
+    Called automatically on flush; call it directly after Core writes that
+    bypass the ORM.
+    """
+    session = session or db.session
+    session.info.setdefault('changed_tables', set()).update(tables)
+
+
+def _bump(engine, tables: Iterable[str]) -> None:
+    with engine.begin() as connection:
+        for table in sorted(tables):  # Fixed order, so concurrent bumps lock rows alike
+            result = connection.execute(
+                update(_counters).where(_counters.c.table_name == table).values(version=_counters.c.version + 1)
+            )
+            if not result.rowcount:
+                try:
+                    with connection.begin_nested():
+                        connection.execute(insert(_counters).values(table_name=table, version=1))
+                except IntegrityError:  # Another process created it first
+                    connection.execute(
+                        update(_counters).where(_counters.c.table_name == table).values(version=_counters.c.version + 1)
+                    )
+
+
+def change_versions(tables: Iterable[str]) -> Dict[str, int]:
+    """Current counter per table (0 for tables never written)"""
+    tables = sorted(set(tables))
+    rows = db.session.execute(
+        select(_counters.c.table_name, _counters.c.version).where(_counters.c.table_name.in_(tables))
+    ).all()
+    versions = dict.fromkeys(tables, 0)
+    versions.update(rows)
+    return versions
+
+
+def request_versions(tables: Iterable[str]) -> Dict[str, int]:
+    """
+    change_versions(), reusing the counters a conditional GET already read for
+    its ETag so the body is built from the same state the ETag names.
+    """
+    tables = set(tables)
+    versions = g.get('etag_versions') if has_request_context() else None
+    if versions is None or not tables <= versions.keys():
+        return change_versions(tables)
+    return {table: versions[table] for table in sorted(tables)}
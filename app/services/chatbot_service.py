@@ -2,9 +2,18 @@
 
 from app.models import User, SurveyResponse, Instrument, Instru_ownership, Review
 from app.db import db
-from typing import List, Dict, Optional, Tuple
+from app.metrics import observe
+from typing import Dict, Hashable, Iterable, Iterator, List, Optional, Tuple
 from datetime import datetime
+from itertools import chain as chain_iterables
+from sqlalchemy.exc import IntegrityError
 import json
+import time
+from app.services.keyword_matcher import KeywordMatcher
+from app.services.conversation_memory import (
+    NO_HISTORY, clip_to_tokens, conversation_history, estimate_tokens, update_conversation_memory
+)
+from app.services.response_cache import ResponseCache, context_key, get_response_cache, inventory_generation
 
 # Lazy-load LLM to avoid errors if Ollama is not running
 _model = None
@@ -120,17 +129,9 @@ def get_available_instruments() -> str:
         Formatted string of available instruments with details
     """
     try:
-        instruments = db.session.query(Instru_ownership).filter_by(is_available=True).all()
+        from app.services.inventory_service import available_count, get_inventory_snapshot
         
-        instruments_list = []
-        for ownership in instruments:
-            instruments_list.append({
-                'name': ownership.instrument.name,
-                'category': ownership.instrument.category,
-                'condition': ownership.condition,
-                'daily_rate': ownership.daily_rate,
-                'location': ownership.location
-            })
+        instruments_list = get_inventory_snapshot().listings
         
         if not instruments_list:
             return "No instruments currently available for rent."
@@ -138,10 +139,11 @@ def get_available_instruments() -> str:
         # Format as readable string
         formatted = "Available Instruments:\n"
         for inst in instruments_list[:15]:  # Limit to 15 to avoid token overload
-            formatted += f"- {inst['name']} ({inst['category']}): ${inst['daily_rate']}/day, {inst['condition']} condition\n"
+            formatted += f"- {inst.name} ({inst.category}): ${inst.daily_rate}/day, {inst.condition} condition\n"
         
-        if len(instruments_list) > 15:
-            formatted += f"... and {len(instruments_list) - 15} more instruments"
+        total = available_count()
+        if total > 15:
+            formatted += f"... and {total - 15} more instruments"
         
         return formatted
     except Exception as e:
@@ -149,37 +151,29 @@ def get_available_instruments() -> str:
         return "Available instruments data unavailable"
 
 
-def get_conversation_history(session_id: str, user_id: int, limit: int = 5) -> str:
+def get_conversation_history(session_id: str, user_id: int) -> str:
     """
     Fetch conversation history for context.
     
     Args:
         session_id: The session ID for this conversation
         user_id: The user ID
-        limit: Number of recent messages to include
         
     Returns:
-        Formatted conversation history string
+        The session's rolling summary and most recent messages, within
+        CHAT_HISTORY_TOKENS (see conversation_memory)
     """
     try:
-        from app.models import ChatMessage
-        
-        messages = ChatMessage.query.filter_by(
-            session_id=session_id,
-            user_id=user_id
-        ).order_by(ChatMessage.created_at.desc()).limit(limit * 2).all()
-        
-        messages.reverse()  # Show oldest first
-        
-        history = []
-        for msg in messages:
-            role = "User" if msg.message_type == "user" else "Assistant"
-            history.append(f"{role}: {msg.content}")
-        
-        return "\n".join(history) if history else "No previous conversation history"
+        return conversation_history(user_id, session_id)
     except Exception as e:
         print(f"Error fetching conversation history: {str(e)}")
-        return "No previous conversation history"
+        return NO_HISTORY
+
+
+SESSION_TITLE_TOKENS = 20  # About 80 characters of the first question
+
+RECOMMENDATIONS_OPEN = "[RECOMMENDATIONS]"
+RECOMMENDATIONS_CLOSE = "[/RECOMMENDATIONS]"
 
 
 def extract_recommendations(response: str) -> List[Dict]:
@@ -193,9 +187,9 @@ def extract_recommendations(response: str) -> List[Dict]:
         List of recommended instruments with reasons
     """
     try:
-        if "[RECOMMENDATIONS]" in response and "[/RECOMMENDATIONS]" in response:
-            start = response.find("[RECOMMENDATIONS]") + len("[RECOMMENDATIONS]")
-            end = response.find("[/RECOMMENDATIONS]")
+        if RECOMMENDATIONS_OPEN in response and RECOMMENDATIONS_CLOSE in response:
+            start = response.find(RECOMMENDATIONS_OPEN) + len(RECOMMENDATIONS_OPEN)
+            end = response.find(RECOMMENDATIONS_CLOSE)
             json_str = response[start:end].strip()
             
             recommendations = json.loads(json_str)
@@ -206,6 +200,144 @@ def extract_recommendations(response: str) -> List[Dict]:
     return []
 
 
+class RecommendationBlockParser:
+    """
+    Incrementally split a streamed reply into visible text and the [RECOMMENDATIONS] block.
+    
+    feed() returns the text that can be shown now. A tail that might be the
+    start of the marker is held back until the next chunk settles it, and
+    everything from the marker on is buffered for extract_recommendations().
+    """
+    
+    def __init__(self):
+        self._visible = []
+        self._pending = ''
+        self._block = None  # Text after the opening marker, once seen
+    
+    def feed(self, chunk: str) -> str:
+        if self._block is not None:
+            self._block += chunk
+            return ''
+        buffer = self._pending + chunk
+        index = buffer.find(RECOMMENDATIONS_OPEN)
+        if index >= 0:
+            self._pending, self._block = '', buffer[index + len(RECOMMENDATIONS_OPEN):]
+            return self._show(buffer[:index])
+        held = next((n for n in range(min(len(buffer), len(RECOMMENDATIONS_OPEN) - 1), 0, -1)
+                     if buffer.endswith(RECOMMENDATIONS_OPEN[:n])), 0)
+        self._pending = buffer[len(buffer) - held:] if held else ''
+        return self._show(buffer[:len(buffer) - held])
+    
+    def finish(self) -> str:
+        """Release held-back text at the end of the stream"""
+        pending, self._pending = self._pending, ''
+        return self._show(pending)
+    
+    def _show(self, text: str) -> str:
+        self._visible.append(text)
+        return text
+    
+    @property
+    def response(self) -> str:
+        """The reply without the recommendations block (as chat_with_user stores it)"""
+        return ''.join(self._visible).strip()
+    
+    @property
+    def recommendations(self) -> List[Dict]:
+        if self._block is None:
+            return []
+        return extract_recommendations(RECOMMENDATIONS_OPEN + self._block)
+
+
+def _chat_context(user_id: int, session_id: str, user_message: str) -> Tuple[Dict, Dict]:
+    """User profile and the prompt inputs for one chat turn"""
+    user_profile = get_user_profile(user_id)
+    inputs = {"context": get_conversation_history(session_id, user_id),
+              "experience_level": user_profile.get('experience_level', 'beginner'),
+              "preferred_instruments": user_profile.get('preferred_instruments', 'Not specified'),
+              "favorite_genres": user_profile.get('favorite_genres', 'Not specified'),
+              "budget_range": user_profile.get('budget_range', 'Not specified'),
+              "rental_frequency": user_profile.get('rental_frequency', 'Not specified'),
+              "use_case": user_profile.get('use_case', 'Not specified'),
+              "available_instruments": get_available_instruments(),
+              "question": user_message}
+    return user_profile, inputs
+
+
+def save_chat_exchange(user_id: int, session_id: str, user_message: str, user_profile: Dict,
+                       response: str, recommendations: List[Dict], **context):
+    """
+    Store the user message and the assistant reply and fold turns that left the
+    history budget into the session summary (commits); returns the reply's ChatMessage
+    """
+    from app.models import ChatMessage
+    
+    user_msg = ChatMessage(
+        user_id=user_id,
+        session_id=session_id,
+        message_type='user',
+        content=user_message,
+        context_data={'profile': user_profile},
+        token_count=estimate_tokens(user_message)
+    )
+    db.session.add(user_msg)
+    
+    assistant_msg = ChatMessage(
+        user_id=user_id,
+        session_id=session_id,
+        message_type='assistant',
+        content=response,
+        context_data={
+            'recommendations': recommendations,
+            'profile_used': user_profile,
+            **context
+        },
+        token_count=estimate_tokens(response)
+    )
+    db.session.add(assistant_msg)
+    db.session.flush()
+    _record_chat_session(user_id, session_id, user_msg, assistant_msg)
+    update_conversation_memory(user_id, session_id)
+    db.session.commit()
+    return assistant_msg
+
+
+def _record_chat_session(user_id: int, session_id: str, user_msg, assistant_msg) -> None:
+    """
+    Create or advance the session's chat_sessions row for one stored exchange.
+
+    The first exchanges of a session may race to create its row; the loser's
+    insert fails inside a savepoint and it advances the winner's row instead,
+    so the exchange itself is never lost.
+    """
+    from app.models import ChatSession
+    
+    chat_session = ChatSession.query.filter_by(user_id=user_id, session_id=session_id).first()
+    if chat_session is None:
+        try:
+            with db.session.begin_nested():
+                db.session.add(ChatSession(
+                    user_id=user_id,
+                    session_id=session_id,
+                    started_at=user_msg.created_at,
+                    last_message_at=assistant_msg.created_at,
+                    message_count=2,
+                    title=clip_to_tokens(" ".join(user_msg.content.split()), SESSION_TITLE_TOKENS)
+                ))
+            return
+        except IntegrityError:
+            chat_session = ChatSession.query.filter_by(user_id=user_id, session_id=session_id).one()
+    chat_session.last_message_at = assistant_msg.created_at
+    chat_session.message_count = ChatSession.message_count + 2  # In SQL, so concurrent turns add up
+
+
+def _response_cache_key(inputs: Dict) -> Tuple[Optional[ResponseCache], str, Hashable]:
+    """The app's response cache (None if disabled) with the context key and inventory generation of inputs"""
+    from app.services.inventory_service import get_inventory_snapshot
+    return (get_response_cache(), context_key(inputs),
+            inventory_generation(get_inventory_snapshot().version, inputs['available_instruments']))
+
+
 def chat_with_user(user_id: int, session_id: str, user_message: str) -> Dict:
     """
     Process user message and generate chatbot response.
@@ -219,70 +351,50 @@ def chat_with_user(user_id: int, session_id: str, user_message: str) -> Dict:
         Dictionary with assistant response and context data
     """
     try:
-        from app.models import ChatMessage
-        
         # Get user profile and context
-        user_profile = get_user_profile(user_id)
-        available_instruments = get_available_instruments()
-        conversation_history = get_conversation_history(session_id, user_id)
+        user_profile, inputs = _chat_context(user_id, session_id, user_message)
         
-        # Try to use Ollama LLM first
-        try:
-            # Get the chain (lazy-loaded)
-            chain = get_chain()
-            
-            # Get response from the model
-            response = chain.invoke({"context": conversation_history, 
-                                    "experience_level": user_profile.get('experience_level', 'beginner'),
-                                    "preferred_instruments": user_profile.get('preferred_instruments', 'Not specified'),
-                                    "favorite_genres": user_profile.get('favorite_genres', 'Not specified'),
-                                    "budget_range": user_profile.get('budget_range', 'Not specified'),
-                                    "rental_frequency": user_profile.get('rental_frequency', 'Not specified'),
-                                    "use_case": user_profile.get('use_case', 'Not specified'),
-                                    "available_instruments": available_instruments,
-                                    "question": user_message})
-            
-            # Extract recommendations from response
-            recommendations = extract_recommendations(response)
-            
-            # Clean response by removing recommendation blocks
-            clean_response = response.split("[RECOMMENDATIONS]")[0].strip()
-            
-        except (RuntimeError, Exception) as e:
-            # Fallback to rule-based chatbot if Ollama is not available
-            print(f"Ollama unavailable, using fallback chatbot: {str(e)}")
-            clean_response, recommendations = fallback_chatbot_response(
-                user_message, user_profile, available_instruments
-            )
+        # Answer repeated questions from the response cache
+        cache, context, generation = _response_cache_key(inputs)
+        cached = cache.get(user_message, context, generation) if cache else None
+        if cached is not None:
+            clean_response, recommendations = cached
+        else:
+            # Try to use Ollama LLM first
+            try:
+                # Get the chain (lazy-loaded)
+                chain = get_chain()
+                
+                # Get response from the model
+                response = chain.invoke(inputs)
+                
+                # Extract recommendations from response
+                recommendations = extract_recommendations(response)
+                
+                # Clean response by removing recommendation blocks
+                clean_response = response.split(RECOMMENDATIONS_OPEN)[0].strip()
+                
+                # Only model answers are worth caching; the fallback is cheap
+                if cache:
+                    cache.set(user_message, context, generation, (clean_response, recommendations))
+                
+            except (RuntimeError, Exception) as e:
+                # Fallback to rule-based chatbot if Ollama is not available
+                print(f"Ollama unavailable, using fallback chatbot: {str(e)}")
+                clean_response, recommendations = fallback_chatbot_response(
+                    user_message, user_profile, inputs['available_instruments']
+                )
         
         # Save messages to database
-        user_msg = ChatMessage(
-            user_id=user_id,
-            session_id=session_id,
-            message_type='user',
-            content=user_message,
-            context_data={'profile': user_profile}
-        )
-        db.session.add(user_msg)
-        
-        assistant_msg = ChatMessage(
-            user_id=user_id,
-            session_id=session_id,
-            message_type='assistant',
-            content=clean_response,
-            context_data={
-                'recommendations': recommendations,
-                'profile_used': user_profile
-            }
-        )
-        db.session.add(assistant_msg)
-        db.session.commit()
+        save_chat_exchange(user_id, session_id, user_message, user_profile, clean_response, recommendations,
+                           **({'cached': True} if cached is not None else {}))
         
         return {
             'session_id': session_id,
             'user_message': user_message,
             'assistant_response': clean_response,
             'recommendations': recommendations,
+            'cached': cached is not None,
             'context': {
                 'user_profile': user_profile,
                 'experience_level': user_profile.get('experience_level'),
@@ -299,6 +411,100 @@ def chat_with_user(user_id: int, session_id: str, user_message: str) -> Dict:
         }
 
 
+def _visible_text(parser: RecommendationBlockParser, chunks: Iterable[str]) -> Iterator[str]:
+    for chunk in chunks:
+        yield parser.feed(chunk)
+    yield parser.finish()
+
+
+def stream_chat_with_user(user_id: int, session_id: str, user_message: str) -> Iterator[Tuple[str, Dict]]:
+    """
+    Generate a chatbot reply token by token.
+    
+    Yields (event, data) pairs: 'start' once, 'token' for each piece of
+    visible text as the model produces it, then 'done' with the stored reply
+    and its recommendations, or 'error' if generation fails midway. Both
+    ChatMessage rows are saved when the stream ends (an interrupted reply is
+    kept with context_data['incomplete']). A reply found in the response
+    cache is sent as a single token with source 'cache'. Time to first token
+    and total generation time are recorded as the chat.ttft and
+    chat.generation metrics.
+    """
+    started = time.perf_counter()
+    user_profile, inputs = _chat_context(user_id, session_id, user_message)
+    cache, context, generation = _response_cache_key(inputs)
+    cached = cache.get(user_message, context, generation) if cache else None
+    
+    # Ollama is unavailable if the stream cannot even produce its first chunk
+    try:
+        if cached is not None:
+            chunks, first, source = iter(()), cached[0], 'cache'
+        else:
+            chunks = iter(get_chain().stream(inputs))
+            first = next(chunks, '')
+            source = 'llm'
+    except Exception as e:
+        print(f"Ollama unavailable, using fallback chatbot: {str(e)}")
+        source = 'fallback'
+        fallback_response, fallback_recommendations = fallback_chatbot_response(
+            user_message, user_profile, inputs['available_instruments']
+        )
+        chunks, first = iter(()), fallback_response
+    yield 'start', {'session_id': session_id, 'source': source}
+    
+    parser = RecommendationBlockParser()
+    ttft = None
+    try:
+        for text in _visible_text(parser, chain_iterables([first], chunks)):
+            if not text:
+                continue
+            if ttft is None:
+                ttft = time.perf_counter() - started
+                observe('chat.ttft', ttft)
+            yield 'token', {'text': text}
+    except Exception as e:
+        print(f"Error streaming chat response: {str(e)}")
+        save_chat_exchange(user_id, session_id, user_message, user_profile, parser.response, [], incomplete=True)
+        yield 'error', {'session_id': session_id,
+                        'message': "The response was interrupted. Please try again."}
+        return
+    
+    if source == 'fallback':
+        response, recommendations = fallback_response, fallback_recommendations
+    elif source == 'cache':
+        response, recommendations = cached
+    else:
+        response, recommendations = parser.response, parser.recommendations
+        if cache:
+            cache.set(user_message, context, generation, (response, recommendations))
+    total = time.perf_counter() - started
+    observe('chat.generation', total)
+    message = save_chat_exchange(user_id, session_id, user_message, user_profile, response, recommendations,
+                                 **({'cached': True} if source == 'cache' else {}))
+    yield 'done', {
+        'session_id': session_id,
+        'message_id': message.id,
+        'assistant_response': response,
+        'recommendations': recommendations,
+        'source': source,
+        'ttft_ms': round(ttft * 1000, 1) if ttft is not None else None,
+        'total_ms': round(total * 1000, 1)
+    }
+
+
+# Intents recognised by the rule-based fallback, matched in one pass per message
+CHAT_INTENTS = {
+    'recommend': ['recommend', 'recommendation', 'suggest', 'suggestion', 'what should', 'which instrument',
+                  'best for me', 'looking for', 'want to', 'interested in'],
+    'guitar': ['guitar'],
+    'piano': ['piano', 'keyboard'],
+    'drums': ['drums'],
+    'budget': ['cost', 'price', 'pricing', 'budget'],
+    'help': ['help', 'how', 'what', 'hello', 'hi'],
+}
+_intent_matcher = KeywordMatcher(CHAT_INTENTS)
+
+
 def fallback_chatbot_response(user_message: str, user_profile: Dict, available_instruments: str) -> Tuple[str, List[Dict]]:
     """
     Fallback rule-based chatbot when Ollama is unavailable.
@@ -311,7 +517,7 @@ def fallback_chatbot_response(user_message: str, user_profile: Dict, available_i
     Returns:
         Tuple of (response_text, recommendations_list)
     """
-    message_lower = user_message.lower()
+    intents = set(_intent_matcher.matches(user_message))
     recommendations = []
     
     # Extract experience level and budget
@@ -319,14 +525,8 @@ def fallback_chatbot_response(user_message: str, user_profile: Dict, available_i
     budget_range = user_profile.get('budget_range', 'Not specified')
     preferred = user_profile.get('preferred_instruments', '').lower()
     
-    # Recommendation keywords
-    recommendation_keywords = ['recommend', 'suggest', 'what should', 'which instrument', 
-                               'best for me', 'looking for', 'want to', 'interested in']
-    
     # Check if user is asking for recommendations
-    is_recommendation_request = any(keyword in message_lower for keyword in recommendation_keywords)
-    
-    if is_recommendation_request:
+    if 'recommend' in intents:
         # Build personalized recommendations based on profile
         response = f"Based on your profile (experience level: {experience}), I'd be happy to recommend some instruments!\n\n"
         
@@ -396,19 +596,19 @@ def fallback_chatbot_response(user_message: str, user_profile: Dict, available_i
         response += "\n\nWould you like more details about any specific instrument?"
     
     # General questions about instruments
-    elif 'guitar' in message_lower:
+    elif 'guitar' in intents:
         response = "Guitars are wonderful instruments! They're versatile and great for many music styles.\n\n"
         if experience == 'beginner':
             response += "For beginners, I recommend starting with an acoustic guitar. It's easier on the fingers and helps build good technique.\n\n"
         response += "We have several guitars available for rent. Would you like me to show you our guitar options based on your budget?"
         
-    elif 'piano' in message_lower or 'keyboard' in message_lower:
+    elif 'piano' in intents:
         response = "Pianos and keyboards are excellent choices! They provide a strong foundation for understanding music theory.\n\n"
         if experience == 'beginner':
             response += "As a beginner, a keyboard might be more practical - it's portable and usually more affordable to rent.\n\n"
         response += "Let me know if you'd like recommendations based on your specific needs!"
         
-    elif 'drums' in message_lower:
+    elif 'drums' in intents:
         response = "Drums are fantastic for rhythm and coordination! \n\n"
         if experience == 'beginner':
             response += "Beginners often start with practice pads before moving to full kits. Would you like to explore our drum options?"
@@ -416,7 +616,7 @@ def fallback_chatbot_response(user_message: str, user_profile: Dict, available_i
             response += "Check out our available drum kits - we have options for all skill levels!"
     
     # Budget questions
-    elif 'cost' in message_lower or 'price' in message_lower or 'budget' in message_lower:
+    elif 'budget' in intents:
         response = "Our rental prices vary based on the instrument and condition:\n\n"
         response += "You can find instruments ranging from $25/day to $100+/day.\n"
         if budget_range != 'Not specified':
@@ -425,7 +625,7 @@ def fallback_chatbot_response(user_message: str, user_profile: Dict, available_i
             response += "\nWhat's your budget range? I can help you find the perfect instrument within your price range."
     
     # Help/general questions  
-    elif any(word in message_lower for word in ['help', 'how', 'what', 'hello', '  hi']):
+    elif 'help' in intents:
         response = f"Hello! I'm your musical instruments rental assistant. 👋\n\n"
         response += "I can help you with:\n"
         response += "- Finding the perfect instrument based on your experience and budget\n"
@@ -0,0 +1,173 @@
+"""Item-to-item co-rental recommendations
+
+Renters form a sparse user x instrument matrix U (1 where the user has a
+non-cancelled rental of any listing of the instrument). U^T U counts, for
+every pair of instruments, how many users rented both; dividing by
+sqrt(renters_i * renters_j) gives their cosine similarity. The top-k
+neighbours of each instrument are stored in instrument_neighbors, so
+serving a user is one indexed lookup: sum the neighbour scores of the
+instruments they have rented.
+
+refresh_co_rentals() is the offline job (flask refresh-co-rentals). It is
+incremental: JobCheckpoint 'co_rental' records the last rental id folded
+in, and only instruments whose row can have changed are recomputed. Those
+are instruments that gained renters, and every instrument sharing a
+renter with one of them. Cancellations and rentals committed out of id
+order are only picked up by a full rebuild (--full).
+"""
+
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from scipy import sparse
+from sqlalchemy import delete, func, insert, select
+from app.db import db
+from app.models import Instru_ownership, InstrumentNeighbor, JobCheckpoint, Rental
+
+JOB = 'co_rental'
+TOP_K = 20
+
+
+def _pairs():
+    """Distinct (user_id, instrument_id) of non-cancelled rentals"""
+    return select(Rental.user_id, Instru_ownership.instrument_id).join(
+        Instru_ownership, Rental.instru_ownership_id == Instru_ownership.id
+    ).where(func.coalesce(Rental.status, 'pending') != 'cancelled').distinct()
+
+
+def top_neighbors(user_ids: Iterable[int], instrument_ids: Iterable[int], rows: Optional[Iterable[int]] = None,
+                  renter_counts: Optional[Dict[int, int]] = None, k: int = TOP_K) -> Dict[int, List[Tuple[int, float]]]:
+    """
+    Top-k cosine co-rental neighbours, best first, for each instrument of rows.
+
+    (user_ids[i], instrument_ids[i]) are rental pairs; they must include every
+    renter of the instruments in rows (default: all instruments in the pairs).
+    renter_counts gives the global number of renters per instrument when the
+    pairs are only a slice of the history (default: counted from the pairs).
+    """
+    user_ids = np.asarray(list(user_ids), dtype=np.int64)
+    instrument_ids = np.asarray(list(instrument_ids), dtype=np.int64)
+    instruments, cols = np.unique(instrument_ids, return_inverse=True)
+    users, user_rows = np.unique(user_ids, return_inverse=True)
+    renters = sparse.csr_matrix(
+        (np.ones(len(cols), dtype=np.float64), (user_rows, cols)), shape=(len(users), len(instruments))
+    )
+    renters.data[:] = 1.0  # Duplicate pairs were summed; count each renter once
+
+    if renter_counts is None:
+        counts = np.asarray(renters.sum(axis=0)).ravel()
+    else:
+        counts = np.array([renter_counts.get(int(i), 0) for i in instruments], dtype=np.float64)
+
+    rows = instruments if rows is None else np.asarray(sorted(set(rows)), dtype=np.int64)
+    positions = np.searchsorted(instruments, rows)
+    present = positions < len(instruments)
+    present[present] = instruments[positions[present]] == rows[present]
+    result = {int(instrument_id): [] for instrument_id in rows}
+    if not present.any():
+        return result
+
+    positions = positions[present]
+    co_rentals = (renters.T.tocsr()[positions] @ renters).tocsr()
+    for r, col in enumerate(positions):
+        start, end = co_rentals.indptr[r], co_rentals.indptr[r + 1]
+        neighbors, shared = co_rentals.indices[start:end], co_rentals.data[start:end]
+        keep = neighbors != col
+        neighbors, shared = neighbors[keep], shared[keep]
+        if not len(neighbors):
+            continue
+        scores = shared / np.sqrt(counts[col] * counts[neighbors])
+        best = np.arange(len(scores))
+        if len(scores) > k:
+            # Everything at least as good as the k-th best, so ties break by instrument id
+            best = np.flatnonzero(scores >= scores[np.argpartition(-scores, k - 1)[k - 1]])
+        best = best[np.lexsort((instruments[neighbors[best]], -scores[best]))][:k]
+        result[int(instruments[col])] = [(int(instruments[neighbors[i]]), float(scores[i])) for i in best]
+    return result
+
+
+def refresh_co_rentals(full: bool = False, k: int = TOP_K) -> Dict:
+    """
+    Fold new rentals into instrument_neighbors and commit.
+
+    Returns a summary: {'full', 'rentals_through', 'instruments', 'seconds'}.
+    """
+    started = time.perf_counter()
+    checkpoint = db.session.get(JobCheckpoint, JOB)
+    since = checkpoint.position if checkpoint is not None and not full else 0
+    high = db.session.scalar(select(func.max(Rental.id))) or 0
+    full = full or since == 0
+    summary = {'full': full, 'rentals_through': high, 'instruments': 0, 'seconds': 0.0}
+    if not full and high <= since:
+        summary['seconds'] = time.perf_counter() - started
+        return summary
+
+    if full:
+        pairs = db.session.execute(_pairs()).all()
+        neighbors = top_neighbors([p[0] for p in pairs], [p[1] for p in pairs], k=k)
+        db.session.execute(delete(InstrumentNeighbor))
+    else:
+        new = _pairs().where(Rental.id > since, Rental.id <= high).subquery()
+        seeds = _pairs().subquery()
+        seed_renters = select(seeds.c.user_id).where(seeds.c.instrument_id.in_(select(new.c.instrument_id)))
+        shared = _pairs().subquery()
+        affected = db.session.scalars(
+            select(shared.c.instrument_id).where(shared.c.user_id.in_(seed_renters)).distinct()
+        ).all()
+
+        # Every renter of an affected instrument, with all of their rentals
+        scope = _pairs().subquery()
+        affected_renters = select(scope.c.user_id).where(scope.c.instrument_id.in_(affected))
+        slice_ = _pairs().subquery()
+        pairs = db.session.execute(
+            select(slice_.c.user_id, slice_.c.instrument_id).where(slice_.c.user_id.in_(affected_renters))
+        ).all()
+        everyone = _pairs().subquery()
+        renter_counts = dict(db.session.execute(
+            select(everyone.c.instrument_id, func.count())
+            .where(everyone.c.instrument_id.in_({p[1] for p in pairs}))
+            .group_by(everyone.c.instrument_id)
+        ).all())
+        neighbors = top_neighbors([p[0] for p in pairs], [p[1] for p in pairs], rows=affected,
+                                  renter_counts=renter_counts, k=k)
+        if affected:
+            db.session.execute(delete(InstrumentNeighbor).where(InstrumentNeighbor.instrument_id.in_(affected)))
+
+    rows = [{'instrument_id': instrument_id, 'neighbor_id': neighbor_id, 'score': score}
+            for instrument_id, ranked in neighbors.items() for neighbor_id, score in ranked]
+    if rows:
+        db.session.execute(insert(InstrumentNeighbor), rows)
+
+    if checkpoint is None:
+        checkpoint = JobCheckpoint(job=JOB)
+        db.session.add(checkpoint)
+    checkpoint.position = high
+    db.session.commit()
+
+    summary['instruments'] = len(neighbors)
+    summary['seconds'] = time.perf_counter() - started
+    return summary
+
+
+def co_rented_instrument_ids(user_id: int, candidates=None, limit: int = 10) -> List[int]:
+    """
+    Instruments most co-rented with the user's own rentals, best first.
+
+    Sums the stored neighbour scores of every instrument the user has rented,
+    excluding those instruments; candidates optionally restricts the result
+    (a select of instrument ids, e.g. those with a listing free today).
+    """
+    rented = select(Instru_ownership.instrument_id).join(
+        Rental, Rental.instru_ownership_id == Instru_ownership.id
+    ).where(Rental.user_id == user_id)
+    score = func.sum(InstrumentNeighbor.score).label('score')
+    query = select(InstrumentNeighbor.neighbor_id).where(
+        InstrumentNeighbor.instrument_id.in_(rented),
+        InstrumentNeighbor.neighbor_id.not_in(rented)
+    )
+    if candidates is not None:
+        query = query.where(InstrumentNeighbor.neighbor_id.in_(candidates))
+    query = query.group_by(InstrumentNeighbor.neighbor_id).order_by(
+        score.desc(), InstrumentNeighbor.neighbor_id
+    ).limit(limit)
+    return list(db.session.scalars(query))
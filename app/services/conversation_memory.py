@@ -0,0 +1,155 @@
+"""Token-budgeted conversation memory for the chatbot prompt
+
+The prompt used to include the last 10 messages verbatim, so a few long
+assistant replies could make it arbitrarily large (and every generation
+slower). Instead:
+
+- every ChatMessage stores an approximate token count (estimate_tokens)
+- the newest turns that fit in CHAT_HISTORY_TOKENS are sent verbatim
+- older turns are folded into a per-session ChatSummary when a new exchange
+  is saved. Folding is incremental: each message is condensed once (its
+  first sentence, clipped), appended to the stored summary, and the oldest
+  summary lines are dropped to stay within CHAT_SUMMARY_TOKENS
+
+conversation_history() always returns text within CHAT_HISTORY_TOKENS,
+summary included, even if the budget was lowered after messages were saved.
+"""
+
+import math
+import re
+from typing import List, Optional, Tuple
+from flask import current_app
+from sqlalchemy import select
+from app.db import db
+from app.models import ChatMessage, ChatSummary
+
+CHARS_PER_TOKEN = 4  # Rough average for English text with LLM tokenizers
+EXCERPT_TOKENS = 40  # Longest excerpt of one message kept in the summary
+SUMMARY_HEADER = "Summary of earlier conversation:"
+NO_HISTORY = "No previous conversation history"
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """Approximate token count of text (no tokenizer dependency)"""
+    return math.ceil(len(text or '') / CHARS_PER_TOKEN)
+
+
+def clip_to_tokens(text: str, tokens: int) -> str:
+    """text shortened at a word boundary (with '...') so that estimate_tokens() <= tokens"""
+    limit = tokens * CHARS_PER_TOKEN
+    if len(text) <= limit:
+        return text
+    if limit < 4:
+        return text[:limit]
+    clipped = text[:limit - 3]
+    return (clipped.rsplit(' ', 1)[0] if ' ' in clipped else clipped) + '...'
+
+
+def _role(message_type: str) -> str:
+    return "User" if message_type == "user" else "Assistant"
+
+
+def _line_cost(message_type: str, token_count: int) -> int:
+    """Tokens of one "Role: content" history line, including its newline"""
+    return estimate_tokens(f"{_role(message_type)}: ") + token_count + 1
+
+
+def _summary_cost(summary: Optional[ChatSummary]) -> int:
+    if summary is None or not summary.summary:
+        return 0
+    return estimate_tokens(SUMMARY_HEADER) + 1 + summary.token_count + 1
+
+
+def _excerpt(message_type: str, content: str) -> str:
+    first_sentence = _SENTENCE_END.split(" ".join(content.split()), 1)[0]
+    return f"{_role(message_type)}: {clip_to_tokens(first_sentence, EXCERPT_TOKENS)}"
+
+
+def fold(summary: str, messages: List[Tuple[str, str]], max_tokens: int) -> str:
+    """summary extended with excerpts of (message_type, content) messages, oldest lines dropped to fit max_tokens"""
+    lines = summary.split("\n") if summary else []
+    lines += [_excerpt(message_type, content) for message_type, content in messages]
+    total = sum(estimate_tokens(line) + 1 for line in lines)
+    while lines and total > max_tokens:
+        total -= estimate_tokens(lines.pop(0)) + 1
+    return "\n".join(lines)
+
+
+def _budgets() -> Tuple[int, int]:
+    budget = current_app.config['CHAT_HISTORY_TOKENS']
+    return budget, min(current_app.config['CHAT_SUMMARY_TOKENS'], budget // 2)
+
+
+def _summary(user_id: int, session_id: str) -> Optional[ChatSummary]:
+    return ChatSummary.query.filter_by(user_id=user_id, session_id=session_id).first()
+
+
+def update_conversation_memory(user_id: int, session_id: str) -> Optional[ChatSummary]:
+    """
+    Fold the session's messages that no longer fit the verbatim window into its summary.
+
+    The window is CHAT_HISTORY_TOKENS minus the room reserved for the
+    summary. Only messages newer than the summary are read, and only those
+    being folded are loaded with their content. Call after the newest
+    messages are flushed; the caller commits.
+    """
+    budget, summary_budget = _budgets()
+    summary = _summary(user_id, session_id)
+    through = summary.through_message_id if summary else 0
+    window = budget - (estimate_tokens(SUMMARY_HEADER) + 1 + summary_budget + 1)
+
+    rows = db.session.execute(
+        select(ChatMessage.id, ChatMessage.message_type, ChatMessage.token_count)
+        .where(ChatMessage.user_id == user_id, ChatMessage.session_id == session_id, ChatMessage.id > through)
+        .order_by(ChatMessage.id.desc())
+    ).all()
+    used, cutoff = 0, None
+    for message_id, message_type, token_count in rows:
+        used += _line_cost(message_type, token_count)
+        if used > window:
+            cutoff = message_id
+            break
+    if cutoff is None:
+        return summary
+
+    folded = db.session.execute(
+        select(ChatMessage.message_type, ChatMessage.content)
+        .where(ChatMessage.user_id == user_id, ChatMessage.session_id == session_id,
+               ChatMessage.id > through, ChatMessage.id <= cutoff)
+        .order_by(ChatMessage.id)
+    ).all()
+    if summary is None:
+        summary = ChatSummary(user_id=user_id, session_id=session_id, summary='')
+        db.session.add(summary)
+    summary.summary = fold(summary.summary, [tuple(row) for row in folded], summary_budget)
+    summary.token_count = estimate_tokens(summary.summary)
+    summary.through_message_id = cutoff
+    return summary
+
+
+def conversation_history(user_id: int, session_id: str) -> str:
+    """The session's summary and newest messages for the prompt, within CHAT_HISTORY_TOKENS"""
+    budget, _ = _budgets()
+    summary = _summary(user_id, session_id)
+    if summary is not None and _summary_cost(summary) > budget:
+        summary = None  # Budget lowered below the stored summary: send recent turns only
+    through = summary.through_message_id if summary else 0
+    remaining = budget - _summary_cost(summary)
+
+    lines = []
+    rows = db.session.execute(
+        select(ChatMessage.message_type, ChatMessage.content, ChatMessage.token_count)
+        .where(ChatMessage.user_id == user_id, ChatMessage.session_id == session_id, ChatMessage.id > through)
+        .order_by(ChatMessage.id.desc())
+    )
+    for message_type, content, token_count in rows:
+        remaining -= _line_cost(message_type, token_count)
+        if remaining < 0:
+            break
+        lines.append(f"{_role(message_type)}: {content}")
+    lines.reverse()  # Show oldest first
+
+    if summary is not None and summary.summary:
+        lines[:0] = [SUMMARY_HEADER, summary.summary]
+    return "\n".join(lines) if lines else NO_HISTORY
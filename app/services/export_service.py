@@ -0,0 +1,128 @@
+"""Streaming exports of catalog, listings, rentals and payments
+
+Rows are read with Core selects executed with yield_per, which uses a
+server-side cursor where the driver supports one (psycopg) and fetches in
+fixed-size chunks everywhere else, and are serialized on the fly into
+NDJSON or CSV text chunks, optionally gzip-compressed. Nothing holds more
+than one fetch chunk plus one output buffer, so memory stays flat
+regardless of table size.
+"""
+
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime
+from typing import Iterable, Iterator
+from sqlalchemy import select
+from app.db import db
+from app.models import Instrument, Instru_ownership, Rental, Payment
+
+FORMATS = ('ndjson', 'csv')
+FETCH_SIZE = 1000
+CHUNK_SIZE = 64 * 1024  # Output bytes buffered before a chunk is emitted
+
+DATASETS = {
+    'instruments': lambda: select(
+        Instrument.id, Instrument.name, Instrument.category, Instrument.brand,
+        Instrument.model, Instrument.description, Instrument.created_at
+    ).order_by(Instrument.id),
+    'listings': lambda: select(
+        Instru_ownership.id, Instru_ownership.user_id, Instru_ownership.instrument_id,
+        Instru_ownership.condition, Instru_ownership.daily_rate, Instru_ownership.image_url,
+        Instru_ownership.location, Instru_ownership.is_available,
+        Instru_ownership.rating_count, Instru_ownership.rating_sum, Instru_ownership.created_at
+    ).order_by(Instru_ownership.id),
+    'rentals': lambda: select(
+        Rental.id, Rental.user_id, Rental.instru_ownership_id, Rental.start_date, Rental.end_date,
+        Rental.actual_return_date, Rental.total_cost, Rental.status, Rental.created_at
+    ).order_by(Rental.id),
+    'payments': lambda: select(
+        Payment.id, Payment.rental_id, Payment.renter_id, Payment.owner_id, Payment.amount,
+        Payment.status, Payment.payment_method, Payment.transaction_fee, Payment.owner_payout_amount,
+        Payment.created_at, Payment.updated_at, Payment.completed_at
+    ).order_by(Payment.id),
+}
+
+
+def _plain(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def iter_rows(dataset: str) -> Iterator[tuple]:
+    """Yield the column names, then every row of the dataset, as tuples"""
+    result = db.session.execute(DATASETS[dataset]().execution_options(yield_per=FETCH_SIZE))
+    yield tuple(result.keys())
+    for row in result:
+        yield tuple(row)
+
+
+def _ndjson(rows: Iterator[tuple]) -> Iterator[str]:
+    columns = next(rows)
+    for row in rows:
+        yield json.dumps({column: _plain(value) for column, value in zip(columns, row)}) + '\n'
+
+
+def _csv(rows: Iterator[tuple]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def _chunked(pieces: Iterable[str]) -> Iterator[bytes]:
+    """Coalesce small text pieces into ~CHUNK_SIZE byte chunks"""
+    parts, size = [], 0
+    for piece in pieces:
+        parts.append(piece)
+        size += len(piece)
+        if size >= CHUNK_SIZE:
+            yield ''.join(parts).encode('utf-8')
+            parts, size = [], 0
+    if parts:
+        yield ''.join(parts).encode('utf-8')
+
+
+def _gzipped(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31: gzip container
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export_chunks(dataset: str, fmt: str = 'ndjson', gzip: bool = False) -> Iterator[bytes]:
+    """
+    Stream one dataset as bytes chunks.
+
+    Raises:
+        ValueError: If the dataset or format is unknown (raised on call, before streaming)
+    """
+    if dataset not in DATASETS:
+        raise ValueError(f"Unknown dataset '{dataset}', expected one of: {', '.join(DATASETS)}")
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format '{fmt}', expected one of: {', '.join(FORMATS)}")
+
+    def generate():
+        rows = iter_rows(dataset)
+        pieces = _ndjson(rows) if fmt == 'ndjson' else _csv(rows)
+        chunks = _chunked(pieces)
+        yield from _gzipped(chunks) if gzip else chunks
+
+    return generate()
+
+
+def content_type(fmt: str, gzip: bool = False) -> str:
+    if gzip:
+        return 'application/gzip'
+    return 'application/x-ndjson' if fmt == 'ndjson' else 'text/csv; charset=utf-8'
+
+
+def file_name(dataset: str, fmt: str, gzip: bool = False) -> str:
+    return f"{dataset}.{fmt}" + ('.gz' if gzip else '')
@@ -0,0 +1,208 @@
+"""Hugging Face zero-shot classifier client
+
+One ClassifierClient per app (app.extensions['hf_classifier']) holds:
+
+- a pooled requests.Session, so calls reuse keep-alive connections
+- strict (connect, read) timeouts, so a slow upstream costs at most
+  HF_CONNECT_TIMEOUT + HF_READ_TIMEOUT seconds
+- an LRU + TTL cache keyed on the normalized needs text
+- a circuit breaker: after HF_BREAKER_THRESHOLD consecutive failures the
+  upstream is skipped for HF_BREAKER_RESET seconds, then a single trial
+  call decides whether to close the circuit again
+
+classify() never raises; None means "no classification", and callers fall
+back to local keyword matching. classify_async() runs the same call on a
+small thread pool so it can overlap with local scoring.
+"""
+
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Lock
+from typing import Any, Dict, List, Optional
+import requests
+from requests.adapters import HTTPAdapter
+from flask import current_app
+
+CANDIDATE_LABELS = [
+    "beginner-friendly", "professional-grade", "budget-friendly",
+    "acoustic", "electric", "percussion", "wind-instrument",
+    "string-instrument", "keyboard"
+]
+
+
+def normalize_text(text: str) -> str:
+    return " ".join((text or "").lower().split())
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after ttl seconds"""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 3600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class CircuitBreaker:
+    """Closed -> open after `threshold` consecutive failures; half-open (one trial) after `reset_timeout`"""
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half-open'
+
+    def __init__(self, threshold: int = 5, reset_timeout: float = 30.0):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self._opened_at = None
+        self._trial_running = False
+        self._lock = Lock()
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self._opened_at < self.reset_timeout:
+            return self.OPEN
+        return self.HALF_OPEN
+
+    def allow(self) -> bool:
+        """Whether a call may go upstream now (claims the single half-open trial)"""
+        with self._lock:
+            state = self.state
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_running or self.failures >= self.threshold:
+                self._opened_at = time.monotonic()
+            self._trial_running = False
+
+
+class ClassifierClient:
+    """Zero-shot classification of needs text against CANDIDATE_LABELS"""
+
+    def __init__(self, url: str, token: Optional[str] = None, connect_timeout: float = 0.5,
+                 read_timeout: float = 2.0, cache: Optional[TTLCache] = None,
+                 breaker: Optional[CircuitBreaker] = None, pool_size: int = 10, workers: int = 4):
+        self.url = url
+        self.token = token
+        self.timeout = (connect_timeout, read_timeout)
+        self.cache = cache if cache is not None else TTLCache()
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='hf-classifier')
+
+    @property
+    def max_latency(self) -> float:
+        """Upper bound on how long one upstream call can block"""
+        return sum(self.timeout)
+
+    def classify(self, user_needs: str, token: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Classification result ({"labels": [...], "scores": [...]}) or None if unavailable"""
+        key = normalize_text(user_needs)
+        if not key:
+            return None
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        if not self.breaker.allow():
+            return None
+
+        token = token or self.token
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        payload = {"inputs": key, "parameters": {"candidate_labels": CANDIDATE_LABELS, "multi_class": True}}
+        try:
+            response = self.session.post(self.url, headers=headers, json=payload, timeout=self.timeout)
+            response.raise_for_status()
+            result = response.json()
+        except (requests.RequestException, ValueError):
+            self.breaker.record_failure()
+            return None
+        self.breaker.record_success()
+        self.cache.set(key, result)
+        return result
+
+    def classify_async(self, user_needs: str, token: Optional[str] = None) -> Future:
+        """classify() on the client's thread pool; cache hits resolve immediately"""
+        cached = self.cache.get(normalize_text(user_needs))
+        if cached is not None:
+            future = Future()
+            future.set_result(cached)
+            return future
+        return self._executor.submit(self.classify, user_needs, token)
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        self.session.close()
+
+
+def top_labels(result: Optional[Dict[str, Any]], limit: int = 3) -> Optional[List[str]]:
+    """Best labels of a classification result"""
+    if not result or not isinstance(result.get('labels'), list):
+        return None
+    return result['labels'][:limit]
+
+
+_client_lock = Lock()
+
+
+def get_classifier_client() -> ClassifierClient:
+    """The current app's client, created on first use from HF_* config"""
+    app = current_app._get_current_object()
+    client = app.extensions.get('hf_classifier')
+    if client is None:
+        with _client_lock:
+            client = app.extensions.get('hf_classifier')
+            if client is None:
+                config = app.config
+                client = app.extensions['hf_classifier'] = ClassifierClient(
+                    config['HF_CLASSIFICATION_URL'],
+                    token=os.getenv("HUGGINGFACE_API_KEY") or None,
+                    connect_timeout=config['HF_CONNECT_TIMEOUT'],
+                    read_timeout=config['HF_READ_TIMEOUT'],
+                    cache=TTLCache(config['HF_CACHE_SIZE'], config['HF_CACHE_TTL']),
+                    breaker=CircuitBreaker(config['HF_BREAKER_THRESHOLD'], config['HF_BREAKER_RESET'])
+                )
+    return client
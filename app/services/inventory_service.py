@@ -0,0 +1,163 @@
+"""Shared in-process snapshot of the listings available for rent today
+
+Chatbot context, recommendation scoring and GET /api/instruments/available
+all read the same inventory. Instead of each re-querying listings and their
+instruments, they share one immutable InventorySnapshot built by a single
+joined query.
+
+The snapshot is keyed by (engine, change counters of INVENTORY_TABLES, day).
+The counters live in the database (see change_counter_service), so a write
+from any process makes every process rebuild on its next read. Under a
+conditional GET the counters the ETag hashed are reused, so the body
+always matches its ETag. Review writes count through the listing's rating
+columns.
+
+INVENTORY_SNAPSHOT_MAX_LISTINGS (50,000 by default) caps the memory the
+snapshot may use. A truncated snapshot reports complete=False; readers that
+need every listing call get_complete_inventory(), which then reads them
+with the same query, uncapped and uncached, and available_count() counts
+them in SQL.
+"""
+
+from bisect import bisect_right
+from collections import namedtuple
+from threading import Lock
+from typing import Iterator, Optional, Tuple
+from flask import current_app
+from sqlalchemy import func, select
+from app.db import db
+from app.models import Booking, Instrument, Instru_ownership
+from app.services.availability_service import free_during, today
+from app.services.change_counter_service import request_versions
+
+INVENTORY_TABLES = (Booking.__tablename__, Instrument.__tablename__, Instru_ownership.__tablename__)
+
+
+class Listing(namedtuple('Listing', [
+    'id', 'owner_id', 'condition', 'daily_rate', 'image_url', 'location',
+    'rating_count', 'rating_sum',
+    'instrument_id', 'name', 'category', 'brand', 'model', 'description'
+])):
+    """One available listing with the instrument fields readers need"""
+    __slots__ = ()
+
+    @property
+    def average_rating(self) -> Optional[float]:
+        if not self.rating_count:
+            return None
+        return self.rating_sum / self.rating_count
+
+
+class InventorySnapshot:
+    """Immutable, id-ordered tuple of available listings"""
+
+    def __init__(self, listings, complete: bool, version: Tuple[int, ...]):
+        self.listings = tuple(listings)
+        self.complete = complete
+        self.version = version  # Change counters of INVENTORY_TABLES it was built at
+        self._ids = [listing.id for listing in self.listings]
+        self._by_id = {listing.id: listing for listing in self.listings}
+
+    def get(self, ownership_id: int) -> Optional[Listing]:
+        return self._by_id.get(ownership_id)
+
+    def filter(self, category: Optional[str] = None, location: Optional[str] = None,
+               min_rate: Optional[float] = None, max_rate: Optional[float] = None,
+               after_id: Optional[int] = None) -> Iterator[Listing]:
+        """Listings matching every given filter, in id order, starting after after_id"""
+        start = bisect_right(self._ids, after_id) if after_id is not None else 0
+        for listing in self.listings[start:]:
+            if category and listing.category != category:
+                continue
+            if location and listing.location != location:
+                continue
+            if min_rate is not None and listing.daily_rate < min_rate:
+                continue
+            if max_rate is not None and listing.daily_rate > max_rate:
+                continue
+            yield listing
+
+    def __len__(self):
+        return len(self.listings)
+
+    def __iter__(self):
+        return iter(self.listings)
+
+
+_cached = None  # (key, snapshot), swapped as one reference
+_build_lock = Lock()
+
+
+def invalidate_inventory() -> None:
+    """Drop this process's snapshot so the next reader rebuilds it"""
+    global _cached
+    _cached = None
+
+
+def _build(version: Tuple[int, ...], limit: Optional[int]) -> InventorySnapshot:
+    query = (
+        select(
+            Instru_ownership.id,
+            Instru_ownership.user_id,
+            Instru_ownership.condition,
+            Instru_ownership.daily_rate,
+            Instru_ownership.image_url,
+            Instru_ownership.location,
+            Instru_ownership.rating_count,
+            Instru_ownership.rating_sum,
+            Instrument.id,
+            Instrument.name,
+            Instrument.category,
+            Instrument.brand,
+            Instrument.model,
+            Instrument.description
+        ).join(Instrument, Instru_ownership.instrument_id == Instrument.id
+        ).where(free_during()
+        ).order_by(Instru_ownership.id)
+    )
+    if limit is not None:
+        query = query.limit(limit + 1)
+    rows = db.session.execute(query).all()
+    complete = limit is None or len(rows) <= limit
+    return InventorySnapshot(
+        (Listing._make(row) for row in (rows if complete else rows[:limit])),
+        complete=complete,
+        version=version
+    )
+
+
+def get_inventory_snapshot() -> InventorySnapshot:
+    """Return the current snapshot, rebuilding it if the inventory changed"""
+    global _cached
+
+    versions = request_versions(INVENTORY_TABLES)
+    key = (db.engine, tuple(versions[table] for table in sorted(versions)), today())
+    cached = _cached
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    with _build_lock:
+        cached = _cached
+        if cached is None or cached[0] != key:
+            limit = current_app.config['INVENTORY_SNAPSHOT_MAX_LISTINGS']
+            cached = (key, _build(key[1], limit))
+            _cached = cached
+        return cached[1]
+
+
+def get_complete_inventory() -> InventorySnapshot:
+    """The snapshot if it holds every available listing, else all of them read from SQL (not cached)"""
+    snapshot = get_inventory_snapshot()
+    if snapshot.complete:
+        return snapshot
+    return _build(snapshot.version, None)
+
+
+def available_count() -> int:
+    """Number of listings available today, whether or not the snapshot holds them all"""
+    snapshot = get_inventory_snapshot()
+    if snapshot.complete:
+        return len(snapshot)
+    return db.session.execute(
+        select(func.count()).select_from(Instru_ownership).where(free_during())
+    ).scalar()
@@ -0,0 +1,81 @@
+"""Compiled multi-pattern keyword matching
+
+KeywordMatcher compiles a {label: [terms]} dictionary into a word-level
+Aho-Corasick automaton. Text is tokenized once with text_index.words
+(lower-cased, stemmed, so "drums" matches "drum" and "Guitars" matches
+"guitar"), and the automaton walks the tokens a single time, reporting
+every label whose term occurs as whole words, including overlapping
+terms ("acoustic bass" matches both an "acoustic" and a "bass" term).
+The cost depends on the text length, not on the number of terms.
+"""
+
+from collections import deque
+from typing import Dict, Iterable, List, Mapping, Set
+from app.services.text_index import words
+
+
+class KeywordMatcher:
+    """Immutable matcher; labels are returned in the dictionary's order"""
+
+    def __init__(self, dictionary: Mapping[str, Iterable[str]]):
+        self.labels = list(dictionary)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._output: List[Set[int]] = [set()]
+        self.term_count = 0
+
+        for label_index, label in enumerate(self.labels):
+            for term in dictionary[label]:
+                tokens = words(term)
+                if not tokens:
+                    continue
+                state = 0
+                for token in tokens:
+                    next_state = self._goto[state].get(token)
+                    if next_state is None:
+                        next_state = self._goto[state][token] = len(self._goto)
+                        self._goto.append({})
+                        self._output.append(set())
+                    state = next_state
+                self._output[state].add(label_index)
+                self.term_count += 1
+
+        # Failure links, breadth first; outputs inherit their failure state's outputs
+        self._fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for token, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and token not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(token, 0)
+                self._output[next_state] |= self._output[self._fail[next_state]]
+
+    def __len__(self):
+        return self.term_count
+
+    def match_indexes(self, text: str) -> Set[int]:
+        goto, fail, output = self._goto, self._fail, self._output
+        found = set()
+        state = 0
+        for token in words(text):
+            while state and token not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(token, 0)
+            if output[state]:
+                found |= output[state]
+        return found
+
+    def matches(self, text: str) -> List[str]:
+        """All labels with at least one term in text, in dictionary order"""
+        return [self.labels[i] for i in sorted(self.match_indexes(text))]
+
+
+def merge_dictionaries(*dictionaries: Mapping[str, Iterable[str]]) -> Dict[str, List[str]]:
+    """Union of several {label: [terms]} dictionaries, keeping first-seen label order"""
+    merged: Dict[str, List[str]] = {}
+    for dictionary in dictionaries:
+        for label, terms in dictionary.items():
+            merged.setdefault(label, []).extend(terms)
+    return merged
@@ -0,0 +1,266 @@
+"""Time-decayed leaderboards (most rented, best rated) as materialized rollups
+
+leaderboard_entries keeps, per scope (global, per category, per location)
+and instrument, exponentially decayed totals of rentals and review ratings.
+The half-life is LEADERBOARD_HALF_LIFE_DAYS. Decay uses a landmark epoch:
+an event at time t is stored with weight exp(rate * (t - epoch)), so a new
+event only ever adds to a row and older rows need no rewriting. Reading at
+time `now` divides by exp(rate * (now - epoch)). Ranking by rentals is
+therefore an index scan on the stored popularity.
+
+Ratings are ranked by a Bayesian average that pulls instruments with
+little (decayed) evidence towards the global mean:
+(C * mean + sum of weighted ratings) / (C + sum of weights), where C is
+LEADERBOARD_PRIOR_WEIGHT reviews' worth of weight.
+
+Rental and Review flushes update the rows incrementally in the same
+transaction. compact_leaderboards() rebuilds everything from the source
+tables with a fresh epoch, which keeps weights small and drops entries
+that have decayed to nothing. It runs on the feed refresher's sweep once
+LEADERBOARD_COMPACT_INTERVAL has passed, or via `flask compact-leaderboards`.
+Writers read the epoch with a shared lock and compaction takes an
+exclusive one, so increments never straddle a rebase.
+"""
+
+import math
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from flask import current_app, has_app_context
+from sqlalchemy import event, insert, inspect, select, update, delete, func
+from sqlalchemy.orm import Session
+from app.db import db
+from app.models import Instrument, Instru_ownership, JobCheckpoint, LeaderboardEntry, Rental, Review
+
+JOB = 'leaderboards'
+SCOPES = ('global', 'category', 'location')
+DEFAULT_EPOCH = datetime(2026, 1, 1)  # Until the first compaction
+NEGLIGIBLE = 1e-6  # Compaction drops entries whose decayed totals fall below this
+DEFAULTS = {'LEADERBOARD_HALF_LIFE_DAYS': 30.0, 'LEADERBOARD_PRIOR_WEIGHT': 5.0,
+            'LEADERBOARD_COMPACT_INTERVAL': 86400.0}
+
+_entries = LeaderboardEntry.__table__
+_checkpoints = JobCheckpoint.__table__
+
+
+def _setting(name: str) -> float:
+    if has_app_context():
+        return float(current_app.config.get(name, DEFAULTS[name]))
+    return DEFAULTS[name]
+
+
+def decay_rate() -> float:
+    """Per-second decay rate for the configured half-life"""
+    return math.log(2) / (_setting('LEADERBOARD_HALF_LIFE_DAYS') * 86400)
+
+
+def _timestamp(moment: datetime) -> float:
+    return (moment - datetime(1970, 1, 1)).total_seconds()
+
+
+def _epoch(connection, lock: Optional[str] = 'share') -> float:
+    """Current epoch (unix seconds); lock 'share' for writers, 'update' for compaction"""
+    query = select(_checkpoints.c.position).where(_checkpoints.c.job == JOB)
+    if lock:
+        query = query.with_for_update(read=lock == 'share')
+    position = connection.execute(query).scalar()
+    return float(position) if position is not None else _timestamp(DEFAULT_EPOCH)
+
+
+def _weight(moment: Optional[datetime], epoch: float, rate: float) -> float:
+    moment = moment or datetime.utcnow()
+    return math.exp(rate * (_timestamp(moment) - epoch))
+
+
+def scope_keys(category: Optional[str], location: Optional[str]) -> List[Tuple[str, str]]:
+    """(scope, scope_key) pairs an event for a listing with this category and location counts towards"""
+    keys = [('global', '')]
+    if category and category.strip():
+        keys.append(('category', category.strip().lower()))
+    if location and location.strip():
+        keys.append(('location', location.strip().lower()))
+    return keys
+
+
+def _apply(connection, deltas: Dict[Tuple[str, str, int], List[float]]) -> None:
+    """Add [popularity, rating_weight, rating_sum] deltas to entries, creating missing ones"""
+    for (scope, key, instrument_id), (popularity, weight, total) in sorted(deltas.items()):
+        match = (_entries.c.scope == scope) & (_entries.c.scope_key == key) & (_entries.c.instrument_id == instrument_id)
+        result = connection.execute(update(_entries).where(match).values(
+            popularity=_entries.c.popularity + popularity,
+            rating_weight=_entries.c.rating_weight + weight,
+            rating_sum=_entries.c.rating_sum + total
+        ))
+        if not result.rowcount:
+            connection.execute(insert(_entries).values(
+                scope=scope, scope_key=key, instrument_id=instrument_id,
+                popularity=popularity, rating_weight=weight, rating_sum=total
+            ))
+
+
+@event.listens_for(Rental.status, 'set', active_history=True)
+@event.listens_for(Review.rating, 'set', active_history=True)
+def _keep_previous_value(target, value, oldvalue, initiator):
+    """Load the previous value on assignment, even once expired, so _history() sees the change"""
+
+
+def _history(obj, attribute):
+    """(old, new) values of an attribute in the flush being processed"""
+    history = inspect(obj).attrs[attribute].history
+    old = history.deleted[0] if history.deleted else getattr(obj, attribute)
+    return old, getattr(obj, attribute)
+
+
+def _events(session) -> List[Tuple[int, datetime, float, float, float]]:
+    """(ownership id, when, popularity delta, rating weight factor, weighted rating factor) of flushed changes"""
+    events = []
+    cancelled = lambda status: status == 'cancelled'
+    for obj in session.new:
+        if isinstance(obj, Rental) and not cancelled(obj.status):
+            events.append((obj.instru_ownership_id, obj.created_at, 1, 0, 0))
+        elif isinstance(obj, Review):
+            events.append((obj.instru_ownership_id, obj.created_at, 0, 1, obj.rating))
+    for obj in session.dirty:
+        if isinstance(obj, Rental):
+            old, new = _history(obj, 'status')
+            if cancelled(old) != cancelled(new):
+                events.append((obj.instru_ownership_id, obj.created_at, -1 if cancelled(new) else 1, 0, 0))
+        elif isinstance(obj, Review):
+            old, new = _history(obj, 'rating')
+            if old != new:
+                events.append((obj.instru_ownership_id, obj.created_at, 0, 0, new - old))
+    for obj in session.deleted:
+        if isinstance(obj, Rental) and not cancelled(obj.status):
+            events.append((obj.instru_ownership_id, obj.created_at, -1, 0, 0))
+        elif isinstance(obj, Review):
+            events.append((obj.instru_ownership_id, obj.created_at, 0, -1, -obj.rating))
+    return events
+
+
+@event.listens_for(Session, 'after_flush')
+def _update_leaderboards(session, flush_context):
+    events = _events(session)
+    if not events:
+        return
+    connection = session.connection()
+    listings = {
+        row.id: row for row in connection.execute(
+            select(Instru_ownership.id, Instru_ownership.instrument_id, Instru_ownership.location, Instrument.category)
+            .join(Instrument, Instrument.id == Instru_ownership.instrument_id)
+            .where(Instru_ownership.id.in_({e[0] for e in events}))
+        )
+    }
+    epoch, rate = _epoch(connection), decay_rate()
+    deltas = defaultdict(lambda: [0.0, 0.0, 0.0])
+    for ownership_id, moment, rentals, reviews, ratings in events:
+        listing = listings.get(ownership_id)
+        if listing is None:
+            continue
+        weight = _weight(moment, epoch, rate)
+        for scope, key in scope_keys(listing.category, listing.location):
+            delta = deltas[(scope, key, listing.instrument_id)]
+            delta[0] += rentals * weight
+            delta[1] += reviews * weight
+            delta[2] += ratings * weight
+    _apply(connection, deltas)
+
+
+def top_instruments(by: str = 'rentals', scope: str = 'global', key: str = '', limit: int = 10,
+                    candidates=None) -> List[Tuple[int, float]]:
+    """
+    Leaderboard top-k as (instrument id, score), best first.
+
+    by='rentals' scores decayed rental counts; by='rating' the Bayesian
+    average rating. candidates optionally restricts instruments (a select
+    of instrument ids).
+    """
+    key = (key or '').strip().lower()
+    epoch = _epoch(db.session.connection(), lock=None)
+    scale = math.exp(decay_rate() * (time.time() - epoch))
+    where = [_entries.c.scope == scope, _entries.c.scope_key == key]
+    if candidates is not None:
+        where.append(_entries.c.instrument_id.in_(candidates))
+
+    if by == 'rentals':
+        score = _entries.c.popularity
+        where.append(score > NEGLIGIBLE * scale)
+        rows = db.session.execute(select(_entries.c.instrument_id, score).where(*where).order_by(
+            score.desc(), _entries.c.instrument_id
+        ).limit(limit)).all()
+        return [(instrument_id, popularity / scale) for instrument_id, popularity in rows]
+
+    totals = db.session.execute(select(func.sum(_entries.c.rating_sum), func.sum(_entries.c.rating_weight)).where(
+        _entries.c.scope == 'global', _entries.c.scope_key == ''
+    )).one()
+    if not totals[1] or totals[1] <= NEGLIGIBLE * scale:
+        return []
+    prior = _setting('LEADERBOARD_PRIOR_WEIGHT') * scale
+    mean = totals[0] / totals[1]
+    score = (prior * mean + _entries.c.rating_sum) / (prior + _entries.c.rating_weight)
+    where.append(_entries.c.rating_weight > NEGLIGIBLE * scale)
+    rows = db.session.execute(select(_entries.c.instrument_id, score).where(*where).order_by(
+        score.desc(), _entries.c.instrument_id
+    ).limit(limit)).all()
+    return [(instrument_id, float(value)) for instrument_id, value in rows]
+
+
+def compact_leaderboards(now: Optional[datetime] = None) -> Dict:
+    """
+    Rebuild every leaderboard from rentals and reviews with a fresh epoch (commits).
+
+    Returns {'entries', 'epoch', 'seconds'}.
+    """
+    started = time.perf_counter()
+    now = now or datetime.utcnow()
+    connection = db.session.connection()
+    _epoch(connection, lock='update')  # Blocks writers until the rebuild commits
+    epoch, rate = float(int(_timestamp(now))), decay_rate()
+
+    deltas = defaultdict(lambda: [0.0, 0.0, 0.0])
+    listing = select(Instru_ownership.instrument_id, Instrument.category, Instru_ownership.location).join(
+        Instrument, Instrument.id == Instru_ownership.instrument_id
+    )
+    rentals = connection.execute(
+        listing.add_columns(Rental.created_at).join(Rental, Rental.instru_ownership_id == Instru_ownership.id)
+        .where(func.coalesce(Rental.status, 'pending') != 'cancelled')
+        .execution_options(yield_per=1000)
+    )
+    for instrument_id, category, location, created_at in rentals:
+        weight = _weight(created_at, epoch, rate)
+        for scope, key in scope_keys(category, location):
+            deltas[(scope, key, instrument_id)][0] += weight
+    reviews = connection.execute(
+        listing.add_columns(Review.created_at, Review.rating).join(Review, Review.instru_ownership_id == Instru_ownership.id)
+        .execution_options(yield_per=1000)
+    )
+    for instrument_id, category, location, created_at, rating in reviews:
+        weight = _weight(created_at, epoch, rate)
+        for scope, key in scope_keys(category, location):
+            delta = deltas[(scope, key, instrument_id)]
+            delta[1] += weight
+            delta[2] += weight * rating
+
+    connection.execute(delete(_entries))
+    rows = [
+        {'scope': scope, 'scope_key': key, 'instrument_id': instrument_id,
+         'popularity': popularity, 'rating_weight': weight, 'rating_sum': total}
+        for (scope, key, instrument_id), (popularity, weight, total) in deltas.items()
+        if popularity > NEGLIGIBLE or weight > NEGLIGIBLE
+    ]
+    if rows:
+        connection.execute(insert(_entries), rows)
+    if connection.execute(update(_checkpoints).where(_checkpoints.c.job == JOB).values(
+            position=int(epoch), updated_at=now)).rowcount == 0:
+        connection.execute(insert(_checkpoints).values(job=JOB, position=int(epoch), updated_at=now))
+    db.session.commit()
+    return {'entries': len(rows), 'epoch': datetime.utcfromtimestamp(epoch), 'seconds': time.perf_counter() - started}
+
+
+def compact_if_due() -> bool:
+    """Compact when the last compaction is older than LEADERBOARD_COMPACT_INTERVAL"""
+    epoch = _epoch(db.session.connection(), lock=None)
+    if time.time() - epoch < _setting('LEADERBOARD_COMPACT_INTERVAL'):
+        return False
+    compact_leaderboards()
+    return True
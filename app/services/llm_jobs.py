@@ -0,0 +1,249 @@
+"""Bounded in-process job queue for LLM calls
+
+Chat generations can take up to the Ollama timeout. Running them inside
+web requests lets a handful of slow replies occupy every server worker.
+The chatbot endpoints instead submit an LLMJob to the app's LLMJobQueue:
+
+- LLM_WORKERS threads execute jobs, so at most that many generations run
+  at once per process
+- at most LLM_QUEUE_SIZE jobs wait; submit() raises QueueFull beyond that,
+  which the endpoints turn into 429 with a Retry-After estimate
+- jobs get ids clients can poll (GET /api/chatbot/jobs/<id>) or subscribe
+  to (.../events, Server-Sent Events). Finished jobs are kept for LLM_JOB_TTL
+  seconds
+- a job runs in the process that accepted it, but every state change is
+  also written to the llm_jobs table (LLMJobState), so its status URL works
+  through any server process. A job's return value must be JSON-serializable
+
+Queue wait and execution times are recorded as the llm.queue_wait and
+llm.execution metrics (app.metrics).
+"""
+
+import logging
+import math
+import queue
+import time
+import uuid
+from datetime import datetime, timedelta
+from threading import Event, Lock, Thread
+from typing import Callable, Dict, Optional
+from flask import current_app
+from sqlalchemy import delete, insert, select, update
+from app.db import db
+from app.metrics import get_metric, observe
+from app.models import LLMJobState
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+POLL_INTERVAL = 0.25  # seconds between reads of a job running in another process
+
+_states = LLMJobState.__table__
+
+
+class QueueFull(Exception):
+    """The admission limit (LLM_QUEUE_SIZE waiting jobs) is reached"""
+
+
+class LLMJob:
+    """One queued call; result holds the return value, error the failure message"""
+
+    def __init__(self, user_id: int, func: Callable, args: tuple):
+        self.id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.func = func
+        self.args = args
+        self.status = QUEUED
+        self.result = None
+        self.error = None
+        self.submitted_at = datetime.utcnow()
+        self.started_at = None
+        self.finished_at = None
+        self.finished = Event()
+        self._submitted = time.monotonic()
+        self._reload = None  # Re-reads the stored state of a job loaded from llm_jobs
+
+    @classmethod
+    def loaded(cls, state, reload: Callable) -> 'LLMJob':
+        """A read-only view of a job from its llm_jobs row; wait() polls the row"""
+        job = cls(state.user_id, None, ())
+        job.id, job.submitted_at, job._reload = state.id, state.submitted_at, reload
+        job.update_from(state)
+        return job
+
+    def update_from(self, state) -> None:
+        self.status, self.result, self.error = state.status, state.result, state.error
+        self.started_at, self.finished_at = state.started_at, state.finished_at
+        if self.status in (DONE, FAILED):
+            self.finished.set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the job finishes; False on timeout"""
+        if self._reload is None:
+            return self.finished.wait(timeout)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.finished.is_set():
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return False
+            time.sleep(POLL_INTERVAL if remaining is None else min(POLL_INTERVAL, remaining))
+            self._reload(self)
+        return True
+
+    def to_dict(self) -> Dict:
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'submitted_at': self.submitted_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'error': self.error,
+        }
+
+
+class LLMJobQueue:
+    """Fixed worker pool over a bounded FIFO queue, running jobs in an app context"""
+
+    def __init__(self, app, workers: int = 2, max_queue: int = 16, result_ttl: float = 600.0):
+        self.app = app
+        self.workers = workers
+        self.max_queue = max_queue
+        self.result_ttl = result_ttl
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._jobs: Dict[str, LLMJob] = {}
+        self._lock = Lock()
+        self._running = 0
+        self._threads = []
+
+    def start(self) -> 'LLMJobQueue':
+        for n in range(self.workers):
+            thread = Thread(target=self._run, name=f'llm-worker-{n}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Let workers finish their current job and exit (queued jobs are dropped)"""
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def submit(self, user_id: int, func: Callable, *args) -> LLMJob:
+        """Queue func(*args) for user_id; raises QueueFull when LLM_QUEUE_SIZE jobs are waiting"""
+        if self._queue.full():  # Turn overload away before writing anything
+            raise QueueFull(f"{self.max_queue} LLM jobs already waiting")
+        self._prune()
+        job = LLMJob(user_id, func, args)
+        self._execute(insert(_states).values(id=job.id, user_id=user_id, status=QUEUED,
+                                             submitted_at=job.submitted_at))
+        try:
+            with self._lock:
+                self._queue.put_nowait(job)
+                self._jobs[job.id] = job
+        except queue.Full:  # Filled up by a concurrent submit
+            self._execute(delete(_states).where(_states.c.id == job.id))
+            raise QueueFull(f"{self.max_queue} LLM jobs already waiting")
+        return job
+
+    def get(self, job_id: str) -> Optional[LLMJob]:
+        """A job of this process, or one submitted through another process (from llm_jobs)"""
+        job = self._jobs.get(job_id)
+        if job is None:
+            state = self._read(job_id)
+            job = LLMJob.loaded(state, self._reload) if state is not None else None
+        return job
+
+    def stats(self) -> Dict:
+        return {'workers': self.workers, 'running': self._running, 'queued': self._queue.qsize(),
+                'max_queue': self.max_queue}
+
+    def retry_after(self) -> int:
+        """Seconds until a queue slot is likely to free up (from mean execution time)"""
+        execution = get_metric('llm.execution')
+        mean = execution.total / execution.count if execution.count else 1.0
+        return max(1, math.ceil(mean * max(1, self._queue.qsize()) / self.workers))
+
+    def _prune(self) -> None:
+        cutoff = datetime.utcnow() - timedelta(seconds=self.result_ttl)
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job.finished_at is not None and job.finished_at < cutoff]
+            for job_id in expired:
+                del self._jobs[job_id]
+        self._execute(delete(_states).where(_states.c.finished_at < cutoff))
+
+    def _execute(self, statement) -> None:
+        # Own short transaction, independent of whatever the caller's session holds
+        with self.app.app_context(), db.engine.begin() as connection:
+            connection.execute(statement)
+
+    def _read(self, job_id: str):
+        with self.app.app_context(), db.engine.connect() as connection:
+            return connection.execute(select(_states).where(_states.c.id == job_id)).first()
+
+    def _reload(self, job: LLMJob) -> None:
+        state = self._read(job.id)
+        if state is None:  # Pruned meanwhile
+            job.status, job.error = FAILED, "Job expired"
+            job.finished.set()
+        else:
+            job.update_from(state)
+
+    def _store(self, job: LLMJob) -> None:
+        try:
+            self._execute(update(_states).where(_states.c.id == job.id).values(
+                status=job.status, result=job.result if job.status == DONE else None, error=job.error,
+                started_at=job.started_at, finished_at=job.finished_at
+            ))
+        except Exception:
+            logger.exception("Could not store the state of LLM job %s", job.id)
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            with self._lock:
+                self._running += 1
+            job.status, job.started_at = RUNNING, datetime.utcnow()
+            self._store(job)
+            started = time.monotonic()
+            observe('llm.queue_wait', started - job._submitted)
+            try:
+                with self.app.app_context():
+                    job.result = job.func(*job.args)
+                job.status = DONE
+            except Exception as e:
+                logger.exception("LLM job %s failed", job.id)
+                job.status, job.error = FAILED, str(e)
+            finally:
+                observe('llm.execution', time.monotonic() - started)
+                job.finished_at = datetime.utcnow()
+                job.func = job.args = None
+                self._store(job)
+                with self._lock:
+                    self._running -= 1
+                job.finished.set()
+
+
+_queue_lock = Lock()
+
+
+def get_llm_queue() -> LLMJobQueue:
+    """The current app's queue, created and started on first use from LLM_* config"""
+    app = current_app._get_current_object()
+    jobs = app.extensions.get('llm_jobs')
+    if jobs is None:
+        with _queue_lock:
+            jobs = app.extensions.get('llm_jobs')
+            if jobs is None:
+                config = app.config
+                jobs = app.extensions['llm_jobs'] = LLMJobQueue(
+                    app,
+                    workers=config['LLM_WORKERS'],
+                    max_queue=config['LLM_QUEUE_SIZE'],
+                    result_ttl=config['LLM_JOB_TTL']
+                ).start()
+    return jobs
@@ -0,0 +1,88 @@
+"""Per-listing rating aggregates (count, sum and 1-5 star histogram)
+
+Instru_ownership carries rating_count, rating_sum and rating_1..rating_5 so
+readers get a listing's average and distribution without touching reviews.
+Review writes call record_rating() in the same transaction; the deltas are
+applied as single "col = col + n" UPDATEs, so concurrent reviews of one
+listing never lose an increment. repair_ratings() recomputes the columns
+from the reviews table (backfill, or recovery after out-of-band edits).
+"""
+
+from typing import Iterable, Optional
+from sqlalchemy import case, func, select, update
+from app.db import db
+from app.models import Instru_ownership, Review
+from app.services.change_counter_service import bump_change_counters
+
+STARS = range(1, 6)
+
+_table = Instru_ownership.__table__
+
+
+def _star_column(stars: int):
+    return _table.c[f'rating_{stars}']
+
+
+def record_rating(ownership_id: int, old: Optional[int] = None, new: Optional[int] = None) -> None:
+    """
+    Apply one review change to a listing's aggregates (does not commit).
+
+    old/new are the review's rating before/after the change: create passes
+    only new, delete passes only old, an update passes both.
+    """
+    if old == new:
+        return
+    values = {}
+    count_delta = (new is not None) - (old is not None)
+    if count_delta:
+        values['rating_count'] = _table.c.rating_count + count_delta
+    values['rating_sum'] = _table.c.rating_sum + ((new or 0) - (old or 0))
+    if old is not None:
+        values[f'rating_{old}'] = _star_column(old) - 1
+    if new is not None:
+        values[f'rating_{new}'] = _star_column(new) + 1
+
+    db.session.execute(update(_table).where(_table.c.id == ownership_id).values(**values))
+    bump_change_counters([_table.name])
+    # The UPDATE bypasses the identity map; make a loaded listing re-read its counters
+    ownership = db.session.identity_map.get(db.session.identity_key(Instru_ownership, ownership_id))
+    if ownership is not None:
+        db.session.expire(ownership, ['rating_count', 'rating_sum'] + [f'rating_{s}' for s in STARS])
+
+
+def repair_ratings(ownership_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    Recompute aggregates from the reviews table (does not commit).
+
+    Covers every listing, or only ownership_ids when given. Returns the
+    number of listings whose stored aggregates were wrong.
+    """
+    query = select(
+        Review.instru_ownership_id,
+        func.count(Review.id),
+        func.coalesce(func.sum(Review.rating), 0),
+        *[func.sum(case((Review.rating == stars, 1), else_=0)) for stars in STARS]
+    ).group_by(Review.instru_ownership_id)
+    listings = select(_table.c.id, _table.c.rating_count, _table.c.rating_sum,
+                      *[_star_column(stars) for stars in STARS])
+    if ownership_ids is not None:
+        ownership_ids = list(ownership_ids)
+        query = query.where(Review.instru_ownership_id.in_(ownership_ids))
+        listings = listings.where(_table.c.id.in_(ownership_ids))
+
+    actual = {row[0]: tuple(int(v or 0) for v in row[1:]) for row in db.session.execute(query)}
+    empty = (0,) * (2 + len(STARS))
+
+    fixed = 0
+    for row in db.session.execute(listings).all():
+        expected = actual.get(row[0], empty)
+        if tuple(row[1:]) == expected:
+            continue
+        values = {'rating_count': expected[0], 'rating_sum': expected[1]}
+        values.update({f'rating_{stars}': expected[1 + stars] for stars in STARS})
+        db.session.execute(update(_table).where(_table.c.id == row[0]).values(**values))
+        fixed += 1
+    if fixed:
+        db.session.expire_all()
+        bump_change_counters([_table.name])
+    return fixed
@@ -1,136 +1,103 @@
-import requests
 import json
 import os
-from app.models import Instrument, Instru_ownership, Review
+import time
+from concurrent.futures import TimeoutError as FutureTimeout
+from threading import Lock
+from flask import current_app, has_app_context
+from sqlalchemy import select
 from app.db import db
-from sqlalchemy import func
+from app.models import Instrument
+from app.services.change_counter_service import change_versions
+from app.services.hf_client import get_classifier_client, top_labels
+from app.services.inventory_service import get_complete_inventory
+from app.services.keyword_matcher import KeywordMatcher, merge_dictionaries
+from app.services.scoring_engine import get_scoring_engine
+from app.services.text_index import get_text_index
 
 # Hugging Face free inference API endpoint for text classification/QA
 HF_API_URL = "https://api-inference.huggingface.co/models/deepset/roberta-base-squad2"
 # Using text summarization model for generating recommendations
 HF_SUMMARIZATION_URL = "https://api-inference.huggingface.co/models/facebook/bart-large-cnn"
-# Using zero-shot classification for categorizing instruments
-HF_CLASSIFICATION_URL = "https://api-inference.huggingface.co/models/facebook/bart-large-mnli"
+# Zero-shot classification of needs lives in hf_client (URL: HF_CLASSIFICATION_URL config)
+BATCH_CHUNK = 128  # Queries scored per (queries x listings) matrix in batch recommendations
 
 
 def get_all_instruments_text():
     """Get all available instruments as formatted text for context"""
-    ownerships = Instru_ownership.query.filter_by(is_available=True).all()
-    
     instruments_text = []
-    for ownership in ownerships:
-        instrument = ownership.instrument
-        avg_rating = db.session.query(func.avg(Review.rating)).filter_by(
-            instru_ownership_id=ownership.id
-        ).scalar() or 0
+    for listing in get_complete_inventory():
+        avg_rating = listing.average_rating or 0
         
         instrument_desc = f"""
-        - {instrument.name} ({instrument.category})
-          Brand: {instrument.brand}, Model: {instrument.model}
-          Daily Rate: ${ownership.daily_rate}
-          Condition: {ownership.condition}
-          Location: {ownership.location}
+        - {listing.name} ({listing.category})
+          Brand: {listing.brand}, Model: {listing.model}
+          Daily Rate: ${listing.daily_rate}
+          Condition: {listing.condition}
+          Location: {listing.location}
           Average Rating: {avg_rating:.1f}/5
-          Description: {instrument.description or 'No description'}
+          Description: {listing.description or 'No description'}
         """
-        instruments_text.append((ownership.id, instrument_desc.strip()))
+        instruments_text.append((listing.id, instrument_desc.strip()))
     
     return instruments_text
 
 
 def classify_user_needs_with_hf(user_needs, hf_token=None):
-    """Use HuggingFace API to classify user needs into categories"""
-    if not hf_token:
-        hf_token = os.getenv("HUGGINGFACE_API_KEY", "")
-    
-    # Define candidate categories based on our database
-    candidate_labels = [
-        "beginner-friendly", "professional-grade", "budget-friendly",
-        "acoustic", "electric", "percussion", "wind-instrument",
-        "string-instrument", "keyboard"
-    ]
-    
-    headers = {"Authorization": f"Bearer {hf_token}"} if hf_token else {}
-    
-    payload = {
-        "inputs": user_needs,
-        "parameters": {
-            "candidate_labels": candidate_labels,
-            "multi_class": True
-        }
-    }
+    """
+    Use HuggingFace API to classify user needs into categories
     
-    try:
-        response = requests.post(HF_CLASSIFICATION_URL, headers=headers, json=payload)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            # Return None if API fails, we'll use fallback method
-            return None
-    except Exception as e:
-        print(f"HuggingFace classification error: {e}")
-        return None
+    Cached, timeout-bounded and circuit-broken (see hf_client); None when unavailable
+    """
+    return get_classifier_client().classify(user_needs, hf_token)
 
 
-def extract_instrument_type_from_needs(user_needs):
-    """Fallback method: Extract instrument type from user needs text"""
-    instrument_types = {
-        'guitar': ['guitar', 'acoustic', 'electric', 'fender', 'ibanez', 'les paul'],
-        'piano': ['piano', 'keyboard', 'synthesizer', 'yamaha', 'grand piano'],
-        'drums': ['drums', 'drum kit', 'percussion', 'cymbal', 'snare'],
-        'violin': ['violin', 'viola', 'bow', 'classical', 'fiddle'],
-        'flute': ['flute', 'piccolo', 'woodwind', 'wind instrument'],
-        'bass': ['bass', 'bass guitar', 'upright', 'acoustic bass'],
-    }
-    
-    user_needs_lower = user_needs.lower()
-    matched_types = []
-    
-    for instrument_type, keywords in instrument_types.items():
-        if any(keyword in user_needs_lower for keyword in keywords):
-            matched_types.append(instrument_type)
-    
-    return matched_types
+# Built-in keyword dictionary; extended by INSTRUMENT_KEYWORDS config and catalog categories
+INSTRUMENT_TYPES = {
+    'guitar': ['guitar', 'acoustic', 'electric', 'fender', 'ibanez', 'les paul'],
+    'piano': ['piano', 'keyboard', 'synthesizer', 'yamaha', 'grand piano'],
+    'drums': ['drums', 'drum kit', 'percussion', 'cymbal', 'snare'],
+    'violin': ['violin', 'viola', 'bow', 'classical', 'fiddle'],
+    'flute': ['flute', 'piccolo', 'woodwind', 'wind instrument'],
+    'bass': ['bass', 'bass guitar', 'upright', 'acoustic bass'],
+}
+
+_default_matcher = KeywordMatcher(INSTRUMENT_TYPES)
+_matcher_cache = None  # (key, matcher)
+_matcher_lock = Lock()
 
 
-def score_instrument_match(ownership, user_needs, matched_types, budget=None):
+def get_instrument_type_matcher():
     """
-    Score how well an instrument matches user needs (0-100)
+    Matcher over INSTRUMENT_TYPES, the INSTRUMENT_KEYWORDS config and every catalog category.
+
+    Rebuilt when the instruments change counter moves; outside an app
+    context only the built-in dictionary is used.
     """
-    score = 0
-    instrument = ownership.instrument
-    
-    # Category match (40 points)
-    if instrument.category.lower() in matched_types:
-        score += 40
-    
-    # Budget match (30 points)
-    if budget:
-        if ownership.daily_rate <= budget:
-            score += 30
-        elif ownership.daily_rate <= budget * 1.5:
-            score += 15
-    else:
-        score += 20  # Default points if no budget specified
-    
-    # Rating match (20 points)
-    avg_rating = db.session.query(func.avg(Review.rating)).filter_by(
-        instru_ownership_id=ownership.id
-    ).scalar() or 0
-    
-    if avg_rating >= 4.5:
-        score += 20
-    elif avg_rating >= 4.0:
-        score += 15
-    elif avg_rating >= 3.5:
-        score += 10
-    
-    # Keyword match in description/name (10 points)
-    combined_text = (instrument.name + " " + (instrument.description or "")).lower()
-    if any(keyword in combined_text for keyword in user_needs.lower().split()):
-        score += 10
-    
-    return score
+    global _matcher_cache
+    if not has_app_context():
+        return _default_matcher
+    configured = current_app.config.get('INSTRUMENT_KEYWORDS') or {}
+    key = (db.engine, change_versions(['instruments'])['instruments'], id(configured))
+    cached = _matcher_cache
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    with _matcher_lock:
+        cached = _matcher_cache
+        if cached is None or cached[0] != key:
+            categories = db.session.execute(select(Instrument.category).distinct()).scalars()
+            catalog = {category.lower(): [category] for category in sorted(set(categories)) if category}
+            cached = (key, KeywordMatcher(merge_dictionaries(
+                INSTRUMENT_TYPES,
+                {label.lower(): terms for label, terms in configured.items()},
+                catalog
+            )))
+            _matcher_cache = cached
+        return cached[1]
+
+
+def extract_instrument_type_from_needs(user_needs):
+    """Fallback method: Extract instrument types (lower-case categories) from user needs text"""
+    return get_instrument_type_matcher().matches(user_needs)
 
 
 def recommend_instruments_by_needs(user_needs, budget=None, experience_level=None, hf_token=None):
@@ -147,63 +114,105 @@ def recommend_instruments_by_needs(user_needs, budget=None, experience_level=Non
     Returns:
         List of recommended instruments with scores
     """
+    return recommend_instruments_by_needs_batch(
+        [{"user_needs": user_needs, "budget": budget, "experience_level": experience_level}], hf_token
+    )[0]
+
+
+def recommend_instruments_by_needs_batch(queries, hf_token=None, limit=5):
+    """
+    Recommendations for many needs at once, one result per query in order
+    
+    Each query is a dict with user_needs and optional budget and
+    experience_level; each result has the shape of recommend_instruments_by_needs.
+    The inventory snapshot, scoring engine and text index are loaded once,
+    and queries are scored BATCH_CHUNK at a time as one matrix, so cost grows
+    with scoring work rather than database round-trips. Classifications run
+    concurrently and share one HF_* latency budget.
+    """
     # Get all available instruments
-    all_instruments = get_all_instruments_text()
+    snapshot = get_complete_inventory()
     
-    if not all_instruments:
-        return {
+    if not len(snapshot):
+        return [{
             "recommendations": [],
             "message": "No instruments available at the moment",
             "reasoning": "Database is empty"
-        }
-    
-    # Try to classify with HuggingFace, fallback to keyword matching
-    classification = classify_user_needs_with_hf(user_needs, hf_token)
+        } for _ in queries]
+    
+    # Try to classify with HuggingFace, fallback to keyword matching. By default the
+    # calls run on the client's pool and overlap with local scoring below
+    needs = [query["user_needs"] for query in queries]
+    client = get_classifier_client()
+    concurrent = current_app.config['HF_CLASSIFY_CONCURRENT']
+    if concurrent:
+        pending_classifications = [client.classify_async(text, hf_token) for text in needs]
+    else:
+        classifications = [client.classify(text, hf_token) for text in needs]
     
     # Extract instrument types from needs
-    matched_types = extract_instrument_type_from_needs(user_needs)
-    
-    # Score all available instruments
-    ownerships = Instru_ownership.query.filter_by(is_available=True).all()
-    scored_recommendations = []
-    
-    for ownership in ownerships:
-        score = score_instrument_match(ownership, user_needs, matched_types, budget)
-        
-        if score > 0:  # Only include if there's some match
-            instrument = ownership.instrument
-            avg_rating = db.session.query(func.avg(Review.rating)).filter_by(
-                instru_ownership_id=ownership.id
-            ).scalar() or 0
-            
-            recommendation = {
-                "id": ownership.id,
-                "instrument_id": instrument.id,
-                "name": instrument.name,
-                "category": instrument.category,
-                "brand": instrument.brand,
-                "model": instrument.model,
-                "description": instrument.description,
-                "daily_rate": ownership.daily_rate,
-                "location": ownership.location,
-                "condition": ownership.condition,
-                "average_rating": round(avg_rating, 2),
-                "match_score": score,
-                "reasoning": f"Matches your need for {matched_types[0] if matched_types else 'an instrument'} "
-                            f"at ${ownership.daily_rate}/day with {avg_rating:.1f}/5 rating"
-            }
-            scored_recommendations.append(recommendation)
-    
-    # Sort by match score (descending)
-    scored_recommendations.sort(key=lambda x: x['match_score'], reverse=True)
-    
-    # Return top 5 recommendations
-    top_recommendations = scored_recommendations[:5]
+    matcher = get_instrument_type_matcher()
+    matched_types = [matcher.matches(text) for text in needs]
+    
+    # Score all available instruments for a chunk of queries in one vectorized pass;
+    # the keyword part comes from BM25 relevance of each needs text against the catalog index
+    engine = get_scoring_engine(snapshot)
+    index = get_text_index()
+    results = []
+    for start in range(0, len(queries), BATCH_CHUNK):
+        chunk = slice(start, start + BATCH_CHUNK)
+        scores = engine.score_batch(
+            matched_types[chunk],
+            [query.get("budget") for query in queries[chunk]],
+            index.relevance_batch(engine.instrument_id, needs[chunk])
+        )
+        for offset, row_scores in enumerate(scores):
+            q = start + offset
+            results.append(_recommendation_result(engine, row_scores, needs[q], matched_types[q], limit))
+    
+    if concurrent:
+        deadline = time.monotonic() + client.max_latency
+        classifications = []
+        for pending in pending_classifications:
+            try:
+                classifications.append(pending.result(timeout=max(0.0, deadline - time.monotonic())))
+            except FutureTimeout:
+                pending.cancel()
+                classifications.append(None)
+    
+    for result, classification in zip(results, classifications):
+        result["classification"] = top_labels(classification)
+    return results
+
+
+def _recommendation_result(engine, scores, user_needs, matched_types, limit):
+    """Response body for one query from its row of match scores"""
+    # Top recommendations, best first
+    top_recommendations = []
+    for row in engine.top_k(scores, limit):
+        listing = engine.listings[row]
+        avg_rating = listing.average_rating or 0
+        top_recommendations.append({
+            "id": listing.id,
+            "instrument_id": listing.instrument_id,
+            "name": listing.name,
+            "category": listing.category,
+            "brand": listing.brand,
+            "model": listing.model,
+            "description": listing.description,
+            "daily_rate": listing.daily_rate,
+            "location": listing.location,
+            "condition": listing.condition,
+            "average_rating": round(avg_rating, 2),
+            "match_score": round(float(scores[row]), 1),
+            "reasoning": f"Matches your need for {matched_types[0] if matched_types else 'an instrument'} "
+                        f"at ${listing.daily_rate}/day with {avg_rating:.1f}/5 rating"
+        })
     
     return {
         "recommendations": top_recommendations,
-        "total_available": len(ownerships),
-        "matched_count": len(scored_recommendations),
+        "total_available": len(engine),
+        "matched_count": int((scores > 0).sum()),
         "user_needs_analyzed": user_needs,
         "matched_categories": matched_types
     }
@@ -0,0 +1,151 @@
+"""Response cache for repeated chatbot questions
+
+Many chat questions are near-identical ("what guitar for a beginner?"),
+and each one used to cost a full LLM generation. ResponseCache keeps
+recent replies keyed on:
+
+- the normalized question (lower-cased, punctuation and extra spaces removed)
+- a context key: hash of every prompt input except the question and the
+  inventory, i.e. the user-profile fields and the conversation history
+- an inventory generation: the inventory snapshot's change counters plus a hash of
+  the inventory text the prompt showed. Any change clears the whole cache,
+  so a cached reply never recommends a listing that is no longer free
+
+Lookups match the exact normalized question. Similarity matching is
+opt-in: with CHAT_CACHE_SIMILARITY > 0, a miss falls back to the most
+similar question with the same context key (Jaccard similarity of
+character trigrams) at or above that threshold. It is off by default
+because questions a few characters apart can mean different things
+("guitar under $20" / "guitar over $20", "violin" / "viola"). Entries are evicted LRU beyond CHAT_CACHE_SIZE and expire
+after CHAT_CACHE_TTL seconds. stats() reports the hit ratio.
+"""
+
+import hashlib
+import json
+import re
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Dict, FrozenSet, Hashable, Optional
+from flask import current_app
+
+NGRAM = 3
+_PUNCTUATION = re.compile(r"[^\w\s]")
+
+
+def normalize_question(text: str) -> str:
+    return " ".join(_PUNCTUATION.sub(" ", (text or "").lower()).split())
+
+
+def ngrams(text: str, n: int = NGRAM) -> FrozenSet[str]:
+    padded = f" {text} "
+    return frozenset(padded[i:i + n] for i in range(max(1, len(padded) - n + 1)))
+
+
+def context_key(inputs: Dict[str, Any]) -> str:
+    """Hash of the prompt inputs that shape the answer besides the question and inventory"""
+    used = {name: value for name, value in inputs.items() if name not in ('question', 'available_instruments')}
+    return hashlib.sha1(json.dumps(used, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def inventory_generation(version: Hashable, inventory_text: str) -> Hashable:
+    return version, hashlib.sha1(inventory_text.encode()).hexdigest()
+
+
+class ResponseCache:
+    """Thread-safe LRU + TTL cache with exact and optional n-gram similarity lookup"""
+
+    def __init__(self, maxsize: int = 512, ttl: float = 3600.0, similarity: float = 0.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.similarity = similarity
+        self._entries = OrderedDict()  # (context, question) -> (expires_at, ngrams, value)
+        self._by_context: Dict[str, set] = {}  # context -> questions, for similarity scans
+        self._generation = None
+        self._lock = Lock()
+        self.hits = self.similar_hits = self.misses = self.invalidations = 0
+
+    def get(self, question: str, context: str, generation: Hashable) -> Optional[Any]:
+        normalized = normalize_question(question)
+        with self._lock:
+            self._check_generation(generation)
+            now = time.monotonic()
+            entry = self._entries.get((context, normalized))
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end((context, normalized))
+                self.hits += 1
+                return entry[2]
+            if entry is not None:
+                self._remove((context, normalized))
+
+            if self.similarity > 0:
+                grams = ngrams(normalized)
+                best, best_score = None, self.similarity
+                for candidate in self._by_context.get(context, ()):
+                    expires_at, candidate_grams, _ = self._entries[(context, candidate)]
+                    if expires_at <= now:
+                        continue
+                    score = len(grams & candidate_grams) / len(grams | candidate_grams)
+                    if score >= best_score:
+                        best, best_score = candidate, score
+                if best is not None:
+                    self._entries.move_to_end((context, best))
+                    self.similar_hits += 1
+                    return self._entries[(context, best)][2]
+
+            self.misses += 1
+            return None
+
+    def set(self, question: str, context: str, generation: Hashable, value: Any) -> None:
+        normalized = normalize_question(question)
+        with self._lock:
+            self._check_generation(generation)
+            key = (context, normalized)
+            self._entries[key] = (time.monotonic() + self.ttl, ngrams(normalized), value)
+            self._entries.move_to_end(key)
+            self._by_context.setdefault(context, set()).add(normalized)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_context.clear()
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.similar_hits + self.misses
+        return {'size': len(self._entries), 'hits': self.hits, 'similar_hits': self.similar_hits,
+                'misses': self.misses, 'invalidations': self.invalidations,
+                'hit_ratio': round((self.hits + self.similar_hits) / lookups, 4) if lookups else 0.0}
+
+    def _check_generation(self, generation: Hashable) -> None:
+        if generation != self._generation:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._by_context.clear()
+            self._generation = generation
+
+    def _remove(self, key) -> None:
+        del self._entries[key]
+        questions = self._by_context.get(key[0])
+        if questions is not None:
+            questions.discard(key[1])
+            if not questions:
+                del self._by_context[key[0]]
+
+
+_cache_lock = Lock()
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """The current app's cache from CHAT_CACHE_* config (None when CHAT_CACHE_SIZE is 0)"""
+    app = current_app._get_current_object()
+    if 'chat_response_cache' not in app.extensions:
+        with _cache_lock:
+            if 'chat_response_cache' not in app.extensions:
+                config = app.config
+                app.extensions['chat_response_cache'] = ResponseCache(
+                    config['CHAT_CACHE_SIZE'], config['CHAT_CACHE_TTL'], config['CHAT_CACHE_SIMILARITY']
+                ) if config['CHAT_CACHE_SIZE'] > 0 else None
+    return app.extensions['chat_response_cache']
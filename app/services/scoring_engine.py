@@ -0,0 +1,186 @@
+"""Vectorized needs-based scoring over the available inventory
+
+ScoringEngine loads an inventory snapshot into columnar NumPy arrays once
+and then scores every candidate in a single vectorized pass, producing
+exactly the scores of the original per-listing scorer (kept as
+score_instrument_match in tests/test_scoring_engine.py):
+
+- category: 40 if the listing's category is one of the matched types
+- budget:   30 within budget, 15 within 1.5x budget, 20 if no budget given
+- rating:   20 / 15 / 10 for averages of at least 4.5 / 4.0 / 3.5
+- keyword:  10 if any word of the needs text occurs in name + description
+
+Callers with a BM25 relevance vector (text_index.TextIndex.relevance) pass
+it to score() instead, and the keyword part becomes 10 * relevance, so
+the best text match earns the full 10 points and weaker matches less.
+
+score_batch() scores many queries at once as a (queries x listings)
+matrix: the per-listing parts (rating tier, category codes, rates) are
+shared, and category and budget points are broadcast over the query axis.
+
+Without relevance the keyword rule is the legacy substring test. A needs word contains no whitespace,
+so it occurs in a text exactly when it occurs inside one of the text's
+whitespace-separated tokens. The engine therefore keeps a vocabulary of
+distinct tokens plus an inverted index (token -> listing rows, CSR layout);
+a query scans the vocabulary (not the listings) with np.char.find and
+marks the rows of every hit token.
+
+top_k() finds the k-th best positive score with argpartition (linear
+time), keeps every row scoring at least that much, ties included, and
+orders only those with a lexsort on (score descending, row ascending).
+With many rows tied at the k-th score the sort covers all of them.
+"""
+
+from threading import Lock
+from typing import List, Optional, Sequence
+import numpy as np
+from app.services.inventory_service import InventorySnapshot, Listing, get_complete_inventory
+
+CATEGORY_POINTS = 40
+BUDGET_POINTS, NEAR_BUDGET_POINTS, NO_BUDGET_POINTS = 30, 15, 20
+NEAR_BUDGET_FACTOR = 1.5
+RATING_TIERS = ((4.5, 20), (4.0, 15), (3.5, 10))
+KEYWORD_POINTS = 10
+
+
+class ScoringEngine:
+    """Columnar, immutable view of a list of listings for batch scoring"""
+
+    def __init__(self, listings: Sequence[Listing]):
+        self.listings = tuple(listings)
+        count = len(self.listings)
+
+        self._category_codes = {}
+        self.category = np.fromiter(
+            (self._category_codes.setdefault(l.category.lower(), len(self._category_codes)) for l in self.listings),
+            dtype=np.int32, count=count
+        )
+        self.instrument_id = np.fromiter((l.instrument_id for l in self.listings), dtype=np.int64, count=count)
+        self.daily_rate = np.fromiter((l.daily_rate for l in self.listings), dtype=np.float64, count=count)
+        self.avg_rating = np.fromiter((l.average_rating or 0 for l in self.listings), dtype=np.float64, count=count)
+        self.rating_points = np.select(
+            [self.avg_rating >= threshold for threshold, _ in RATING_TIERS],
+            [points for _, points in RATING_TIERS],
+            default=0
+        ).astype(np.int16)
+
+        # Inverted index over whitespace tokens of name + description
+        token_ids = {}
+        postings = []  # Per token: rows containing it
+        for row, listing in enumerate(self.listings):
+            text = (listing.name + " " + (listing.description or "")).lower()
+            for token in set(text.split()):
+                token_id = token_ids.get(token)
+                if token_id is None:
+                    token_id = token_ids[token] = len(postings)
+                    postings.append([])
+                postings[token_id].append(row)
+        self.vocabulary = np.array(list(token_ids), dtype=str) if token_ids else np.array([], dtype=str)
+        lengths = np.fromiter((len(rows) for rows in postings), dtype=np.int64, count=len(postings))
+        self._postings_ptr = np.concatenate(([0], np.cumsum(lengths)))
+        self._postings = np.fromiter(
+            (row for rows in postings for row in rows), dtype=np.int64, count=int(self._postings_ptr[-1])
+        )
+
+    def __len__(self):
+        return len(self.listings)
+
+    def keyword_mask(self, user_needs: str) -> np.ndarray:
+        """Rows whose name/description contains any word of user_needs"""
+        mask = np.zeros(len(self), dtype=bool)
+        if not len(self.vocabulary):
+            return mask
+        hit_tokens = np.zeros(len(self.vocabulary), dtype=bool)
+        for keyword in set(user_needs.lower().split()):
+            hit_tokens |= np.char.find(self.vocabulary, keyword) >= 0
+        # Gather the CSR slices of all hit tokens in one go
+        starts = self._postings_ptr[:-1][hit_tokens]
+        lengths = self._postings_ptr[1:][hit_tokens] - starts
+        offsets = np.arange(int(lengths.sum())) + np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+        mask[self._postings[offsets]] = True
+        return mask
+
+    def score(self, user_needs: str, matched_types: List[str], budget: Optional[float] = None,
+              relevance: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Match score (0-100) of every listing, in listing order.
+
+        Integer scores with the substring keyword rule; float scores when a
+        per-listing text relevance in [0, 1] is given.
+        """
+        codes = [self._category_codes[t] for t in matched_types if t in self._category_codes]
+        scores = np.where(np.isin(self.category, codes), CATEGORY_POINTS, 0).astype(np.int16)
+
+        if budget:
+            scores += np.where(self.daily_rate <= budget, BUDGET_POINTS,
+                               np.where(self.daily_rate <= budget * NEAR_BUDGET_FACTOR, NEAR_BUDGET_POINTS, 0)
+                               ).astype(np.int16)
+        else:
+            scores += NO_BUDGET_POINTS
+
+        scores += self.rating_points
+
+        if relevance is not None:
+            return scores + KEYWORD_POINTS * relevance
+        scores[self.keyword_mask(user_needs)] += KEYWORD_POINTS
+        return scores
+
+    def score_batch(self, matched_types: Sequence[List[str]], budgets: Sequence[Optional[float]],
+                    relevance: np.ndarray) -> np.ndarray:
+        """
+        Match scores of many queries, one row per query (queries x listings).
+
+        Row q equals score(..., matched_types[q], budgets[q], relevance=relevance[q]).
+        """
+        wanted = np.zeros((len(matched_types), len(self._category_codes)), dtype=bool)
+        for q, types in enumerate(matched_types):
+            wanted[q, [self._category_codes[t] for t in types if t in self._category_codes]] = True
+        scores = np.where(wanted[:, self.category], CATEGORY_POINTS, 0).astype(np.float64)
+
+        budget = np.array([b or np.nan for b in budgets], dtype=np.float64)[:, None]  # 0/None: no budget
+        rate = self.daily_rate[None, :]
+        scores += np.where(np.isnan(budget), NO_BUDGET_POINTS, np.where(
+            rate <= budget, BUDGET_POINTS, np.where(rate <= budget * NEAR_BUDGET_FACTOR, NEAR_BUDGET_POINTS, 0)
+        ))
+        scores += self.rating_points
+        scores += KEYWORD_POINTS * relevance
+        return scores
+
+    @staticmethod
+    def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+        """
+        Rows of the k best positive scores, best first.
+
+        Ties keep listing order (like a stable sort of the scored rows).
+        """
+        positive = np.flatnonzero(scores > 0)
+        if k <= 0 or not len(positive):
+            return positive[:0]
+        values = scores[positive]
+        if len(positive) > k:
+            # Keep everything at least as good as the k-th best, ties included
+            kth = values[np.argpartition(-values, k - 1)[k - 1]]
+            keep = values >= kth
+            positive, values = positive[keep], values[keep]
+        # Higher score first, then earlier row
+        return positive[np.lexsort((positive, -values))[:k]]
+
+
+_cached = None  # (snapshot, engine)
+_build_lock = Lock()
+
+
+def get_scoring_engine(snapshot: Optional[InventorySnapshot] = None) -> ScoringEngine:
+    """Engine over every available listing (see get_complete_inventory), rebuilt when the snapshot changes"""
+    global _cached
+    if snapshot is None:
+        snapshot = get_complete_inventory()
+    cached = _cached
+    if cached is not None and cached[0] is snapshot:
+        return cached[1]
+    with _build_lock:
+        cached = _cached
+        if cached is None or cached[0] is not snapshot:
+            cached = (snapshot, ScoringEngine(snapshot.listings))
+            _cached = cached
+        return cached[1]
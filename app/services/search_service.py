@@ -0,0 +1,76 @@
+"""Ranked full-text search over the instrument catalog"""
+
+import re
+from typing import List, Optional, Tuple
+from sqlalchemy import select, func, or_, text, table, column, literal_column
+from app.db import db
+from app.models import Instrument
+
+# Relative weight of each FTS5 column for SQLite's bm25(): name, brand, model, description
+SQLITE_BM25_WEIGHTS = (10.0, 5.0, 5.0, 1.0)
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_instruments_fts = table('instruments_fts', column('rowid'))
+
+
+def _sqlite_match_expression(query_text: str) -> Optional[str]:
+    """
+    Turn free text into a safe FTS5 MATCH expression.
+
+    Each word is quoted so FTS5 operators in user input are treated as plain
+    text; the last word also matches as a prefix so partial input still hits.
+    """
+    tokens = _TOKEN_RE.findall(query_text.lower())
+    if not tokens:
+        return None
+    terms = [f'"{token}"' for token in tokens]
+    terms[-1] += '*'
+    return " ".join(terms)
+
+
+def search_instruments(query_text: str, limit: int = 20, offset: int = 0) -> List[Tuple[Instrument, float]]:
+    """
+    Search the catalog and return instruments ordered by relevance.
+
+    Args:
+        query_text: Free text typed by the user
+        limit: Maximum number of results
+        offset: Number of ranked results to skip (for pagination)
+
+    Returns:
+        List of (Instrument, score) tuples, best match first. Higher score is better.
+    """
+    dialect = db.engine.dialect.name
+
+    if dialect == 'postgresql':
+        tsquery = func.websearch_to_tsquery('english', query_text)
+        search_vector = literal_column('instruments.search_vector')
+        rank = func.ts_rank_cd(search_vector, tsquery).label('score')
+        stmt = select(Instrument, rank).where(
+            search_vector.op('@@')(tsquery)
+        ).order_by(rank.desc(), Instrument.id)
+
+    elif dialect == 'sqlite':
+        match = _sqlite_match_expression(query_text)
+        if match is None:
+            return []
+        # bm25() is lower-is-better, so negate it to report a higher-is-better score
+        rank = func.bm25(literal_column('instruments_fts'), *SQLITE_BM25_WEIGHTS)
+        stmt = select(Instrument, (-rank).label('score')).join(
+            _instruments_fts, _instruments_fts.c.rowid == Instrument.id
+        ).where(
+            text("instruments_fts MATCH :match").bindparams(match=match)
+        ).order_by(rank, Instrument.id)
+
+    else:
+        # No full-text index on this backend: unranked substring match
+        pattern = f"%{query_text}%"
+        stmt = select(Instrument, literal_column('0.0').label('score')).where(or_(
+            Instrument.name.ilike(pattern),
+            Instrument.brand.ilike(pattern),
+            Instrument.model.ilike(pattern),
+            Instrument.description.ilike(pattern)
+        )).order_by(Instrument.id)
+
+    rows = db.session.execute(stmt.limit(limit).offset(offset)).all()
+    return [(instrument, float(score or 0)) for instrument, score in rows]
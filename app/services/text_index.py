@@ -0,0 +1,174 @@
+"""BM25 inverted index over the instrument catalog
+
+Documents are instruments; the indexed text is name, brand, model and
+description, with per-field boosts applied to term frequencies (a light
+BM25F). Text is lower-cased, split into alphanumeric words, stripped of
+stopwords and reduced with a small suffix stemmer, so "guitars",
+"Guitar" and "guitar's" are the same term and "a" or "for" match nothing.
+
+Each term's postings hold the catalog rows that contain it together with
+their precomputed BM25 weight, so a query only touches the postings of its
+own terms (sub-linear in catalog size). The index is rebuilt when the
+instruments change counter moves, i.e. once per catalog version.
+"""
+
+import math
+import re
+from collections import Counter, defaultdict
+from threading import Lock
+from typing import Dict, Iterable, List, Sequence, Tuple
+import numpy as np
+from sqlalchemy import select
+from app.db import db
+from app.models import Instrument
+from app.services.change_counter_service import change_versions
+
+K1 = 1.2
+B = 0.75
+FIELD_BOOSTS = {'name': 3.0, 'brand': 2.0, 'model': 2.0, 'description': 1.0}
+
+STOPWORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before being below
+between both but by can could did do does doing down during each few for from further had has have
+having he her here hers herself him himself his how i if in into is it its itself just me more most
+my myself no nor not now of off on once only or other our ours ourselves out over own same she
+should so some such than that the their theirs them themselves then there these they this those
+through to too under until up very was we were what when where which while who whom why will with
+would you your yours yourself yourselves
+im ive id want wants need needs looking look like something anything please get rent renting rental
+""".split())
+
+_WORD = re.compile(r"[a-z0-9]+")
+_APOSTROPHE = re.compile(r"['\u2019]")
+
+
+def stem(word: str) -> str:
+    """Light suffix stripping (plurals, -ing, -ed, -ly); leaves short words alone"""
+    if len(word) <= 3 or word.isdigit():
+        return word
+    if word.endswith('ies') and len(word) > 4:
+        return word[:-3] + 'y'
+    if word.endswith(('sses', 'xes', 'zes', 'ches', 'shes')):
+        return word[:-2]
+    if word.endswith('s') and not word.endswith(('ss', 'us', 'is')):
+        return word[:-1]
+    for suffix in ('ing', 'ed', 'ly'):
+        if word.endswith(suffix):
+            base = word[:-len(suffix)]
+            if len(base) >= 3 and any(vowel in base for vowel in 'aeiouy'):
+                return base
+    return word
+
+
+def words(text: str) -> List[str]:
+    """Text -> normalized, stemmed words (stopwords kept)"""
+    if not text:
+        return []
+    text = _APOSTROPHE.sub('', text.lower())  # "I'm" -> "im", "guitar's" -> "guitars"
+    return [stem(word) for word in _WORD.findall(text)]
+
+
+def analyze(text: str) -> List[str]:
+    """Text -> indexable terms"""
+    if not text:
+        return []
+    text = _APOSTROPHE.sub('', text.lower())
+    return [stem(word) for word in _WORD.findall(text) if word not in STOPWORDS]
+
+
+class TextIndex:
+    """Immutable BM25 index; documents are (instrument id, name, brand, model, description) rows"""
+
+    def __init__(self, rows: Iterable[Tuple]):
+        rows = sorted(rows, key=lambda row: row[0])
+        self.doc_ids = np.array([row[0] for row in rows], dtype=np.int64)
+        fields = tuple(FIELD_BOOSTS)
+
+        term_docs = defaultdict(list)  # term -> [(doc, weighted tf)]
+        lengths = np.zeros(len(rows), dtype=np.float64)
+        for doc, row in enumerate(rows):
+            tf = Counter()
+            for field, text in zip(fields, row[1:]):
+                boost = FIELD_BOOSTS[field]
+                for term in analyze(text):
+                    tf[term] += boost
+            lengths[doc] = sum(tf.values())
+            for term, freq in tf.items():
+                term_docs[term].append((doc, freq))
+
+        avg_length = lengths.mean() if len(rows) and lengths.mean() > 0 else 1.0
+        doc_count = len(rows)
+        self._postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        for term, entries in term_docs.items():
+            docs = np.fromiter((doc for doc, _ in entries), dtype=np.int64, count=len(entries))
+            tf = np.fromiter((freq for _, freq in entries), dtype=np.float64, count=len(entries))
+            idf = math.log(1 + (doc_count - len(entries) + 0.5) / (len(entries) + 0.5))
+            norm = K1 * (1 - B + B * lengths[docs] / avg_length)
+            self._postings[term] = (docs, idf * tf * (K1 + 1) / (tf + norm))
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    def search(self, query: str) -> Tuple[np.ndarray, np.ndarray]:
+        """(doc positions, BM25 scores) of every document matching at least one query term"""
+        hits = [(self._postings[term], count) for term, count in Counter(analyze(query)).items()
+                if term in self._postings]
+        if not hits:
+            return np.array([], dtype=np.int64), np.array([], dtype=np.float64)
+        docs = np.concatenate([postings[0] for postings, _ in hits])
+        weights = np.concatenate([postings[1] * count for postings, count in hits])
+        matched, inverse = np.unique(docs, return_inverse=True)
+        return matched, np.bincount(inverse, weights=weights)
+
+    def relevance(self, instrument_ids: np.ndarray, query: str) -> np.ndarray:
+        """
+        Query relevance in [0, 1] for each of instrument_ids (the best match is 1).
+
+        Instruments missing from the index (added after it was built) get 0.
+        """
+        return self.relevance_batch(instrument_ids, [query])[0]
+
+    def relevance_batch(self, instrument_ids: np.ndarray, queries: Sequence[str]) -> np.ndarray:
+        """relevance() of several queries, one row per query (queries x instrument_ids)"""
+        relevance = np.zeros((len(queries), len(instrument_ids)), dtype=np.float64)
+        positions = np.searchsorted(self.doc_ids, instrument_ids)
+        known = positions < len(self.doc_ids)
+        known[known] = self.doc_ids[positions[known]] == instrument_ids[known]
+        positions = positions[known]
+        by_doc = np.zeros(len(self.doc_ids), dtype=np.float64)
+        for q, query in enumerate(queries):
+            matched, scores = self.search(query)
+            if not len(matched):
+                continue
+            by_doc[matched] = scores / scores.max()
+            relevance[q, known] = by_doc[positions]
+            by_doc[matched] = 0.0
+        return relevance
+
+    def top(self, query: str, limit: int = 10) -> List[Tuple[int, float]]:
+        """Best (instrument id, score) pairs for a query, best first"""
+        matched, scores = self.search(query)
+        order = np.lexsort((matched, -scores))[:limit]
+        return [(int(self.doc_ids[matched[i]]), float(scores[i])) for i in order]
+
+
+_cached = None  # (key, index)
+_build_lock = Lock()
+
+
+def get_text_index() -> TextIndex:
+    """Index over the current catalog, rebuilt when the instruments change counter moves"""
+    global _cached
+    key = (db.engine, change_versions(['instruments'])['instruments'])
+    cached = _cached
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    with _build_lock:
+        cached = _cached
+        if cached is None or cached[0] != key:
+            rows = db.session.execute(select(
+                Instrument.id, Instrument.name, Instrument.brand, Instrument.model, Instrument.description
+            )).all()
+            cached = (key, TextIndex(rows))
+            _cached = cached
+        return cached[1]
@@ -0,0 +1,283 @@
+"""Precomputed per-user recommendation feeds
+
+user_recommendations holds each user's ranked instrument ids, so
+GET /api/recommendations is a primary-key lookup plus one query for the
+instruments. Feeds are computed by compute_recommendations(): co-rental
+neighbours first (co_rental_service), then instruments in categories the
+user rented or listed as preferred in their survey, then the trending and
+best rated instruments from the leaderboards (leaderboard_service).
+
+Keeping feeds fresh:
+
+- every flush that writes a Rental, Review or SurveyResponse marks the
+  owner's feed stale in the same transaction and, after commit, wakes the
+  process's FeedRefresher (if it runs one) with those user ids
+- FeedRefresher is a background thread that recomputes stale feeds in
+  batches (a short delay coalesces bursts of writes), checks for feeds
+  marked stale by other processes every RECOMMENDATION_POLL_INTERVAL, and
+  on every sweep (RECOMMENDATION_SWEEP_INTERVAL) also refreshes feeds older
+  than RECOMMENDATION_MAX_AGE, which picks up other users' rentals and new
+  listings, and compacts the leaderboards when due
+- exactly one refresher should run per deployment: `flask feed-refresher`
+  as its own process, or inside the web app with RECOMMENDATION_REFRESHER
+  (off by default, since every gunicorn worker would start one). A new
+  user's live feed is stored marked stale for it to pick up
+- `flask refresh-recommendations` does a single pass from cron instead
+
+Each stale mark also bumps the feed's version. A refresh clears the flag
+only if the version is unchanged since it started. A write that lands
+mid-computation therefore leaves the feed stale for the next round, and
+readers never see a pending change reported as fresh.
+"""
+
+import logging
+import time
+from datetime import datetime, timedelta
+from threading import Event, Lock, Thread
+from typing import Iterable, List, Optional, Set
+from flask import current_app, has_app_context
+from sqlalchemy import case, delete, event, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.db import db
+from app.models import Instrument, Instru_ownership, Rental, Review, SurveyResponse, User, UserRecommendation
+from app.services.co_rental_service import co_rented_instrument_ids, refresh_co_rentals
+from app.services.leaderboard_service import compact_if_due, top_instruments
+
+logger = logging.getLogger(__name__)
+
+FEED_SIZE = 30  # Stored candidates; the endpoint serves the first ones free today
+STRATEGY_SIZE = 5  # Instruments taken from each fallback strategy
+
+_feeds = UserRecommendation.__table__
+
+
+def compute_recommendations(user_id: int, available=None, limit: int = FEED_SIZE) -> List[int]:
+    """
+    Ranked instrument ids for a user.
+
+    available is a criterion on Instru_ownership restricting candidates
+    (default: listed by the owner; the live endpoint passes free_during()).
+    """
+    if available is None:
+        available = Instru_ownership.is_available == True
+    candidates = select(Instru_ownership.instrument_id).where(available)
+    ranked = co_rented_instrument_ids(user_id, candidates=candidates, limit=limit)
+    seen = set(ranked)
+
+    def extend(instrument_ids):
+        added = 0
+        for instrument_id in instrument_ids:
+            if instrument_id not in seen and len(ranked) < limit and added < STRATEGY_SIZE:
+                seen.add(instrument_id)
+                ranked.append(instrument_id)
+                added += 1
+
+    if len(ranked) < limit:
+        # Categories the user rented or said they prefer
+        rented_categories = select(Instrument.category).join(
+            Instru_ownership, Instru_ownership.instrument_id == Instrument.id
+        ).join(Rental, Rental.instru_ownership_id == Instru_ownership.id).where(Rental.user_id == user_id)
+        preferred = db.session.scalar(
+            select(SurveyResponse.preferred_instruments).where(SurveyResponse.user_id == user_id)
+        ) or ''
+        preferred = [name.strip().lower() for name in preferred.split(',') if name.strip()]
+        extend(db.session.scalars(select(Instrument.id).where(
+            Instrument.id.in_(candidates),
+            Instrument.category.in_(rented_categories) | func.lower(Instrument.category).in_(preferred)
+        ).order_by(Instrument.id).limit(STRATEGY_SIZE)))
+
+        # Trending (decayed rental counts), then best rated (Bayesian), from the leaderboards
+        for by in ('rentals', 'rating'):
+            if len(ranked) < limit:
+                leaders = top_instruments(by, limit=STRATEGY_SIZE + len(seen), candidates=candidates)
+                extend(instrument_id for instrument_id, _ in leaders)
+    return ranked
+
+
+def refresh_feeds(user_ids: Iterable[int]) -> int:
+    """Recompute and store the feeds of user_ids (commits); returns how many were written"""
+    user_ids = sorted(set(user_ids))
+    if not user_ids:
+        return 0
+    refresh_co_rentals()  # Fold new rentals into the neighbour table (incremental)
+    versions = dict(db.session.execute(
+        select(_feeds.c.user_id, _feeds.c.version).where(_feeds.c.user_id.in_(user_ids))
+    ).all())
+    users = set(db.session.scalars(select(User.id).where(User.id.in_(user_ids))))
+    gone = [user_id for user_id in versions if user_id not in users]
+    if gone:
+        db.session.execute(delete(_feeds).where(_feeds.c.user_id.in_(gone)))
+
+    now = datetime.utcnow()
+    for user_id in sorted(users):
+        values = {'instrument_ids': compute_recommendations(user_id), 'computed_at': now}
+        if user_id in versions:
+            # A write that landed while we computed bumped the version: stay stale
+            db.session.execute(update(_feeds).where(_feeds.c.user_id == user_id).values(
+                stale=case((_feeds.c.version == versions[user_id], False), else_=True), **values
+            ))
+        else:
+            db.session.execute(insert(_feeds).values(user_id=user_id, stale=False, **values))
+    db.session.commit()
+    return len(users)
+
+
+def refresh_stale_feeds(batch_size: int = 100, user_ids: Iterable[int] = (),
+                        max_age: Optional[timedelta] = None) -> int:
+    """
+    Refresh user_ids plus every stale feed, batch_size users at a time.
+
+    With max_age, feeds computed longer ago than that count as stale (sweep).
+    """
+    if max_age is not None:
+        db.session.execute(update(_feeds).where(
+            _feeds.c.computed_at < datetime.utcnow() - max_age
+        ).values(stale=True))
+        db.session.commit()
+
+    user_ids = sorted(set(user_ids))
+    refreshed = 0
+    for start in range(0, len(user_ids), batch_size):
+        refreshed += refresh_feeds(user_ids[start:start + batch_size])
+    while True:
+        batch = list(db.session.scalars(
+            select(_feeds.c.user_id).where(_feeds.c.stale == True).order_by(_feeds.c.computed_at).limit(batch_size)
+        ))
+        if not batch:
+            return refreshed
+        refreshed += refresh_feeds(batch)
+
+
+def request_refresh(user_ids: Iterable[int]) -> bool:
+    """Queue feeds for this process's background refresher; False if it runs none"""
+    refresher = current_app.extensions.get('feed_refresher') if has_app_context() else None
+    if refresher is None:
+        return False
+    refresher.enqueue(user_ids)
+    return True
+
+
+def store_live_feed(user_id: int, instrument_ids: List[int]) -> None:
+    """
+    Keep a live computation as user_id's feed, marked stale (commits).
+
+    For processes without a refresher: whichever process runs it then
+    finds the feed among the stale ones. No-op if a feed already exists.
+    """
+    try:
+        with db.session.begin_nested():
+            db.session.execute(insert(_feeds).values(
+                user_id=user_id, instrument_ids=list(instrument_ids), computed_at=datetime.utcnow(), stale=True
+            ))
+    except IntegrityError:
+        pass  # Stored meanwhile by a concurrent request or the refresher
+    db.session.commit()
+
+
+class FeedRefresher:
+    """Background thread refreshing queued and stale feeds, with a periodic sweep"""
+
+    def __init__(self, app, batch_size: int = 100, sweep_interval: float = 3600.0,
+                 max_age: timedelta = timedelta(days=1), delay: float = 1.0, poll_interval: float = 10.0):
+        self.app = app
+        self.batch_size = batch_size
+        self.sweep_interval = sweep_interval
+        self.poll_interval = poll_interval
+        self.max_age = max_age
+        self.delay = delay
+        self._pending: Set[int] = set()
+        self._lock = Lock()
+        self._wakeup = Event()
+        self._stop = Event()
+        self._thread = None
+
+    def enqueue(self, user_ids: Iterable[int]) -> None:
+        with self._lock:
+            self._pending.update(user_ids)
+        self._wakeup.set()
+
+    def start(self) -> 'FeedRefresher':
+        self._thread = Thread(target=self._run, name='feed-refresher', daemon=True)
+        self._thread.start()
+        return self
+
+    def run(self) -> None:
+        """Refresh in the calling thread until stop() (the feed-refresher command)"""
+        self._run()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        next_sweep = time.monotonic() + self.sweep_interval
+        while not self._stop.is_set():
+            # Woken by local writes; the poll catches feeds marked stale by other processes
+            self._wakeup.wait(timeout=max(0.0, min(self.poll_interval, next_sweep - time.monotonic())))
+            if self._stop.wait(self.delay):  # Coalesce a burst of writes into one batch
+                return
+            self._wakeup.clear()
+            with self._lock:
+                pending, self._pending = self._pending, set()
+            sweep = time.monotonic() >= next_sweep
+            try:
+                with self.app.app_context():
+                    if sweep:
+                        compact_if_due()
+                    refresh_stale_feeds(self.batch_size, pending, self.max_age if sweep else None)
+            except Exception:
+                logger.exception("Recommendation feed refresh failed")
+                with self._lock:
+                    self._pending |= pending
+            if sweep:
+                next_sweep = time.monotonic() + self.sweep_interval
+
+
+def create_feed_refresher(app) -> FeedRefresher:
+    """Create the app's refresher from RECOMMENDATION_* config (not started)"""
+    config = app.config
+    refresher = app.extensions['feed_refresher'] = FeedRefresher(
+        app,
+        batch_size=config['RECOMMENDATION_REFRESH_BATCH'],
+        sweep_interval=config['RECOMMENDATION_SWEEP_INTERVAL'],
+        max_age=timedelta(seconds=config['RECOMMENDATION_MAX_AGE']),
+        delay=config['RECOMMENDATION_REFRESH_DELAY'],
+        poll_interval=config['RECOMMENDATION_POLL_INTERVAL']
+    )
+    return refresher
+
+
+def start_feed_refresher(app) -> FeedRefresher:
+    """Create and start the app's refresher in a background thread"""
+    return create_feed_refresher(app).start()
+
+
+@event.listens_for(Session, 'after_flush')
+def _mark_feeds_stale(session, flush_context):
+    user_ids = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, (Rental, SurveyResponse)):
+            user_ids.add(obj.user_id)
+        elif isinstance(obj, Review):
+            user_ids.add(obj.renter_id)
+    user_ids.discard(None)
+    if user_ids:
+        session.connection().execute(update(_feeds).where(_feeds.c.user_id.in_(user_ids)).values(
+            stale=True, version=_feeds.c.version + 1
+        ))
+        session.info.setdefault('stale_feed_users', set()).update(user_ids)
+
+
+@event.listens_for(Session, 'after_commit')
+def _queue_stale_feeds(session):
+    user_ids = session.info.pop('stale_feed_users', None)
+    if user_ids:
+        request_refresh(user_ids)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_stale_feeds(session):
+    session.info.pop('stale_feed_users', None)
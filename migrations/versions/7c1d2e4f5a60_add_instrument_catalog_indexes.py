@@ -0,0 +1,33 @@
+"""Add catalog listing indexes for keyset pagination
+
+Revision ID: 7c1d2e4f5a60
+Revises: 5a079737e1b3
+Create Date: 2026-10-17 09:12:41.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c1d2e4f5a60'
+down_revision = '5a079737e1b3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Keyset pagination compares created_at, so legacy rows must not be NULL
+    op.execute("UPDATE instruments SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL")
+
+    with op.batch_alter_table('instruments', schema=None) as batch_op:
+        batch_op.create_index('ix_instruments_created_at_id', ['created_at', 'id'], unique=False)
+        batch_op.create_index('ix_instruments_category_created_at_id', ['category', 'created_at', 'id'], unique=False)
+        batch_op.create_index('ix_instruments_brand', ['brand'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('instruments', schema=None) as batch_op:
+        batch_op.drop_index('ix_instruments_brand')
+        batch_op.drop_index('ix_instruments_category_created_at_id')
+        batch_op.drop_index('ix_instruments_created_at_id')
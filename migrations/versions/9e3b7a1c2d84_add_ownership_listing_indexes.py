@@ -0,0 +1,28 @@
+"""Add listing indexes for the available-instruments read path
+
+Revision ID: 9e3b7a1c2d84
+Revises: 7c1d2e4f5a60
+Create Date: 2026-10-17 10:03:12.540917
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9e3b7a1c2d84'
+down_revision = '7c1d2e4f5a60'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('instruments ownership', schema=None) as batch_op:
+        batch_op.create_index('ix_instruments_ownership_available_id', ['is_available', 'id'], unique=False)
+        batch_op.create_index('ix_instruments_ownership_instrument_id', ['instrument_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('instruments ownership', schema=None) as batch_op:
+        batch_op.drop_index('ix_instruments_ownership_instrument_id')
+        batch_op.drop_index('ix_instruments_ownership_available_id')
@@ -0,0 +1,33 @@
+"""Add per-table change counters for ETags
+
+Revision ID: a3d9e1f5c7b2
+Revises: f1b7d3a8c4e2
+Create Date: 2026-10-17 17:05:12.730194
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3d9e1f5c7b2'
+down_revision = 'f1b7d3a8c4e2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    change_counters = op.create_table('change_counters',
+    sa.Column('table_name', sa.String(length=64), nullable=False),
+    sa.Column('version', sa.BigInteger(), server_default='0', nullable=False),
+    sa.PrimaryKeyConstraint('table_name')
+    )
+    # Seed the tables public endpoints depend on, so the first writes only UPDATE
+    op.bulk_insert(change_counters, [
+        {'table_name': name, 'version': 0}
+        for name in ('instruments', 'instruments ownership', 'bookings', 'reviews')
+    ])
+
+
+def downgrade():
+    op.drop_table('change_counters')
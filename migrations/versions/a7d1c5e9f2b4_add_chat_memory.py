@@ -0,0 +1,44 @@
+"""Add chat message token counts and rolling session summaries
+
+Revision ID: a7d1c5e9f2b4
+Revises: f3a7c9e1d5b8
+Create Date: 2026-10-17 21:12:40.551093
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7d1c5e9f2b4'
+down_revision = 'f3a7c9e1d5b8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('chat_messages', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('token_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.create_index('ix_chat_messages_session', ['user_id', 'session_id', 'id'], unique=False)
+    # Same estimate as conversation_memory.estimate_tokens (4 characters per token)
+    op.execute("UPDATE chat_messages SET token_count = (length(content) + 3) / 4")
+
+    op.create_table('chat_summaries',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('session_id', sa.String(length=100), nullable=False),
+    sa.Column('summary', sa.Text(), nullable=False),
+    sa.Column('token_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('through_message_id', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'session_id', name='uq_chat_summaries_session')
+    )
+
+
+def downgrade():
+    op.drop_table('chat_summaries')
+    with op.batch_alter_table('chat_messages', schema=None) as batch_op:
+        batch_op.drop_index('ix_chat_messages_session')
+        batch_op.drop_column('token_count')
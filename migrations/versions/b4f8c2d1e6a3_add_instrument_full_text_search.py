@@ -0,0 +1,74 @@
+"""Add full-text search index over the instrument catalog
+
+Revision ID: b4f8c2d1e6a3
+Revises: 9e3b7a1c2d84
+Create Date: 2026-10-17 11:26:05.361880
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b4f8c2d1e6a3'
+down_revision = '9e3b7a1c2d84'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        op.execute("""
+            ALTER TABLE instruments ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+                setweight(to_tsvector('english', coalesce(name, '')), 'A') ||
+                setweight(to_tsvector('english', coalesce(brand, '') || ' ' || coalesce(model, '')), 'B') ||
+                setweight(to_tsvector('english', coalesce(description, '')), 'C')
+            ) STORED
+        """)
+        op.execute("CREATE INDEX ix_instruments_search_vector ON instruments USING GIN (search_vector)")
+
+    elif dialect == 'sqlite':
+        op.execute("""
+            CREATE VIRTUAL TABLE instruments_fts USING fts5(
+                name, brand, model, description,
+                content='instruments', content_rowid='id', tokenize='porter unicode61'
+            )
+        """)
+        op.execute("""
+            CREATE TRIGGER instruments_fts_ai AFTER INSERT ON instruments BEGIN
+                INSERT INTO instruments_fts(rowid, name, brand, model, description)
+                VALUES (new.id, new.name, new.brand, new.model, new.description);
+            END
+        """)
+        op.execute("""
+            CREATE TRIGGER instruments_fts_ad AFTER DELETE ON instruments BEGIN
+                INSERT INTO instruments_fts(instruments_fts, rowid, name, brand, model, description)
+                VALUES ('delete', old.id, old.name, old.brand, old.model, old.description);
+            END
+        """)
+        op.execute("""
+            CREATE TRIGGER instruments_fts_au AFTER UPDATE ON instruments BEGIN
+                INSERT INTO instruments_fts(instruments_fts, rowid, name, brand, model, description)
+                VALUES ('delete', old.id, old.name, old.brand, old.model, old.description);
+                INSERT INTO instruments_fts(rowid, name, brand, model, description)
+                VALUES (new.id, new.name, new.brand, new.model, new.description);
+            END
+        """)
+        # Index the rows that already exist
+        op.execute("INSERT INTO instruments_fts(instruments_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_instruments_search_vector")
+        op.execute("ALTER TABLE instruments DROP COLUMN IF EXISTS search_vector")
+
+    elif dialect == 'sqlite':
+        op.execute("DROP TRIGGER IF EXISTS instruments_fts_au")
+        op.execute("DROP TRIGGER IF EXISTS instruments_fts_ad")
+        op.execute("DROP TRIGGER IF EXISTS instruments_fts_ai")
+        op.execute("DROP TABLE IF EXISTS instruments_fts")
@@ -0,0 +1,50 @@
+"""Add chat session index table
+
+Revision ID: b9e4f2a6c8d1
+Revises: a7d1c5e9f2b4
+Create Date: 2026-10-17 22:05:17.284716
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b9e4f2a6c8d1'
+down_revision = 'a7d1c5e9f2b4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('chat_sessions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('session_id', sa.String(length=100), nullable=False),
+    sa.Column('started_at', sa.DateTime(), nullable=False),
+    sa.Column('last_message_at', sa.DateTime(), nullable=False),
+    sa.Column('message_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('title', sa.String(length=200), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'session_id', name='uq_chat_sessions_session')
+    )
+    op.create_index('ix_chat_sessions_user_recent', 'chat_sessions',
+                    ['user_id', 'last_message_at', 'id'], unique=False)
+
+    # Backfill one row per existing (user, session), titled with its first user message
+    op.execute("""
+        INSERT INTO chat_sessions (user_id, session_id, started_at, last_message_at, message_count, title)
+        SELECT c.user_id, c.session_id, COALESCE(MIN(c.created_at), CURRENT_TIMESTAMP),
+               COALESCE(MAX(c.created_at), CURRENT_TIMESTAMP), COUNT(*),
+               (SELECT substr(m.content, 1, 80) FROM chat_messages m
+                WHERE m.user_id = c.user_id AND m.session_id = c.session_id AND m.message_type = 'user'
+                ORDER BY m.id LIMIT 1)
+        FROM chat_messages c
+        GROUP BY c.user_id, c.session_id
+    """)
+
+
+def downgrade():
+    op.drop_index('ix_chat_sessions_user_recent', table_name='chat_sessions')
+    op.drop_table('chat_sessions')
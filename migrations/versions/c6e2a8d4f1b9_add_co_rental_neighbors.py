@@ -0,0 +1,38 @@
+"""Add co-rental instrument neighbours and job checkpoints
+
+Revision ID: c6e2a8d4f1b9
+Revises: a3d9e1f5c7b2
+Create Date: 2026-10-17 18:21:40.512873
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c6e2a8d4f1b9'
+down_revision = 'a3d9e1f5c7b2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('instrument_neighbors',
+    sa.Column('instrument_id', sa.Integer(), nullable=False),
+    sa.Column('neighbor_id', sa.Integer(), nullable=False),
+    sa.Column('score', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['instrument_id'], ['instruments.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['neighbor_id'], ['instruments.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('instrument_id', 'neighbor_id')
+    )
+    op.create_table('job_checkpoints',
+    sa.Column('job', sa.String(length=64), nullable=False),
+    sa.Column('position', sa.BigInteger(), server_default='0', nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('job')
+    )
+
+
+def downgrade():
+    op.drop_table('job_checkpoints')
+    op.drop_table('instrument_neighbors')
@@ -0,0 +1,37 @@
+"""Add shared LLM job state table
+
+Revision ID: c8f3a1d7e5b2
+Revises: b9e4f2a6c8d1
+Create Date: 2026-10-17 09:42:31.508217
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c8f3a1d7e5b2'
+down_revision = 'b9e4f2a6c8d1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('llm_jobs',
+    sa.Column('id', sa.String(length=32), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=16), nullable=False),
+    sa.Column('result', sa.JSON(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('submitted_at', sa.DateTime(), nullable=False),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_llm_jobs_finished', 'llm_jobs', ['finished_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_llm_jobs_finished', table_name='llm_jobs')
+    op.drop_table('llm_jobs')
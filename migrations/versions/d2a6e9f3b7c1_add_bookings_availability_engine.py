@@ -0,0 +1,116 @@
+"""Add bookings table for date-range availability
+
+Revision ID: d2a6e9f3b7c1
+Revises: b4f8c2d1e6a3
+Create Date: 2026-10-17 13:48:27.904513
+
+"""
+import logging
+from alembic import op
+import sqlalchemy as sa
+
+logger = logging.getLogger('alembic.runtime.migration')
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2a6e9f3b7c1'
+down_revision = 'b4f8c2d1e6a3'
+branch_labels = None
+depends_on = None
+
+
+def _resolve_overlapping_rentals():
+    """
+    Cancel pending rentals whose dates overlap another pending/active rental of their listing.
+
+    Rentals keep their dates in order, active before pending, then oldest
+    first. Returns the (kept id, overlapping id) pairs of overlapping
+    active rentals, which are left for an operator to resolve.
+    """
+    bind = op.get_bind()
+    rows = bind.execute(sa.text("""
+        SELECT id, instru_ownership_id, start_date, end_date, status
+        FROM rentals
+        WHERE status IN ('pending', 'active') AND end_date >= start_date
+        ORDER BY instru_ownership_id, CASE WHEN status = 'active' THEN 0 ELSE 1 END, id
+    """)).all()
+
+    held = {}  # listing id -> [(start, end, rental id)] of rentals keeping their dates
+    cancelled, conflicts = [], []
+    for rental_id, listing_id, start, end, status in rows:
+        clash = next((other for other in held.get(listing_id, ()) if other[0] <= end and start <= other[1]), None)
+        if clash is None or status == 'active':
+            if clash is not None:
+                conflicts.append((clash[2], rental_id))
+            held.setdefault(listing_id, []).append((start, end, rental_id))
+        else:
+            cancelled.append(rental_id)
+
+    if cancelled:
+        bind.execute(
+            sa.text("UPDATE rentals SET status = 'cancelled' WHERE id IN :ids")
+            .bindparams(sa.bindparam('ids', expanding=True)),
+            {'ids': cancelled}
+        )
+        logger.warning("Cancelled %d pending rental(s) overlapping another rental of the same listing: %s",
+                       len(cancelled), ", ".join(map(str, cancelled)))
+    return conflicts
+
+
+def upgrade():
+    op.create_table('bookings',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('instru_ownership_id', sa.Integer(), nullable=False),
+    sa.Column('rental_id', sa.Integer(), nullable=False),
+    sa.Column('start_date', sa.Date(), nullable=False),
+    sa.Column('end_date', sa.Date(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['instru_ownership_id'], ['instruments ownership.id'], ),
+    sa.ForeignKeyConstraint(['rental_id'], ['rentals.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('rental_id')
+    )
+    with op.batch_alter_table('bookings', schema=None) as batch_op:
+        batch_op.create_index('ix_bookings_ownership_period', ['instru_ownership_id', 'start_date', 'end_date'], unique=False)
+        batch_op.create_index('ix_bookings_end_date', ['end_date'], unique=False)
+
+    # Double bookings would violate the overlap constraint below; settle them first
+    conflicts = _resolve_overlapping_rentals()
+    if conflicts:
+        pairs = ", ".join(f"{kept}/{other}" for kept, other in conflicts)
+        if op.get_bind().dialect.name == 'postgresql':
+            raise RuntimeError(f"Active rentals with overlapping dates on the same listing: {pairs}. "
+                               "Cancel or complete one of each pair, then rerun the migration.")
+        logger.warning("Active rentals with overlapping dates on the same listing: %s", pairs)
+
+    # Every pending/active rental holds its dates
+    op.execute("""
+        INSERT INTO bookings (instru_ownership_id, rental_id, start_date, end_date, created_at)
+        SELECT instru_ownership_id, id, start_date, end_date, created_at
+        FROM rentals
+        WHERE status IN ('pending', 'active') AND end_date >= start_date
+    """)
+
+    # is_available used to be flipped off while rented; it now only means "listed by the owner"
+    op.execute("""
+        UPDATE "instruments ownership" SET is_available = TRUE
+        WHERE id IN (SELECT instru_ownership_id FROM rentals WHERE status IN ('pending', 'active'))
+    """)
+
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+        op.execute("""
+            ALTER TABLE bookings ADD CONSTRAINT bookings_no_overlap EXCLUDE USING gist (
+                instru_ownership_id WITH =, daterange(start_date, end_date, '[]') WITH &&
+            )
+        """)
+        op.execute("CREATE INDEX ix_bookings_period ON bookings USING gist (daterange(start_date, end_date, '[]'))")
+
+
+def downgrade():
+    # Restore the old flag for listings that are rented right now
+    op.execute("""
+        UPDATE "instruments ownership" SET is_available = FALSE
+        WHERE id IN (SELECT instru_ownership_id FROM bookings WHERE start_date <= CURRENT_DATE AND end_date >= CURRENT_DATE)
+    """)
+    op.drop_table('bookings')
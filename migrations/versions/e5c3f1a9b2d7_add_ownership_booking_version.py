@@ -0,0 +1,26 @@
+"""Add optimistic booking version to instrument ownerships
+
+Revision ID: e5c3f1a9b2d7
+Revises: d2a6e9f3b7c1
+Create Date: 2026-10-17 15:02:53.217660
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5c3f1a9b2d7'
+down_revision = 'd2a6e9f3b7c1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('instruments ownership', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('booking_version', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade():
+    with op.batch_alter_table('instruments ownership', schema=None) as batch_op:
+        batch_op.drop_column('booking_version')
@@ -0,0 +1,35 @@
+"""Add precomputed per-user recommendation feeds
+
+Revision ID: e8b4d2f6a9c3
+Revises: c6e2a8d4f1b9
+Create Date: 2026-10-17 19:02:15.337104
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8b4d2f6a9c3'
+down_revision = 'c6e2a8d4f1b9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('user_recommendations',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('instrument_ids', sa.JSON(), nullable=False),
+    sa.Column('computed_at', sa.DateTime(), nullable=False),
+    sa.Column('stale', sa.Boolean(), server_default=sa.false(), nullable=False),
+    sa.Column('version', sa.Integer(), server_default='0', nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    op.create_index('ix_user_recommendations_stale_computed_at', 'user_recommendations',
+                    ['stale', 'computed_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_user_recommendations_stale_computed_at', table_name='user_recommendations')
+    op.drop_table('user_recommendations')
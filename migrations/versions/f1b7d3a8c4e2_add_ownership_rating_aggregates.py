@@ -0,0 +1,42 @@
+"""Add rating aggregates to instrument ownerships
+
+Revision ID: f1b7d3a8c4e2
+Revises: e5c3f1a9b2d7
+Create Date: 2026-10-17 16:20:41.508112
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1b7d3a8c4e2'
+down_revision = 'e5c3f1a9b2d7'
+branch_labels = None
+depends_on = None
+
+COLUMNS = ['rating_count', 'rating_sum'] + [f'rating_{stars}' for stars in range(1, 6)]
+
+
+def upgrade():
+    with op.batch_alter_table('instruments ownership', schema=None) as batch_op:
+        for name in COLUMNS:
+            batch_op.add_column(sa.Column(name, sa.Integer(), nullable=False, server_default='0'))
+
+    # Backfill from existing reviews
+    stars = ",\n            ".join(
+        f'rating_{n} = (SELECT COUNT(*) FROM reviews r WHERE r.instru_ownership_id = o.id AND r.rating = {n})'
+        for n in range(1, 6)
+    )
+    op.execute(f"""
+        UPDATE "instruments ownership" AS o SET
+            rating_count = (SELECT COUNT(*) FROM reviews r WHERE r.instru_ownership_id = o.id),
+            rating_sum = (SELECT COALESCE(SUM(r.rating), 0) FROM reviews r WHERE r.instru_ownership_id = o.id),
+            {stars}
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('instruments ownership', schema=None) as batch_op:
+        for name in reversed(COLUMNS):
+            batch_op.drop_column(name)
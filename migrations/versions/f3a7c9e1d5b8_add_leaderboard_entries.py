@@ -0,0 +1,37 @@
+"""Add time-decayed leaderboard rollups
+
+Revision ID: f3a7c9e1d5b8
+Revises: e8b4d2f6a9c3
+Create Date: 2026-10-17 19:48:03.118420
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3a7c9e1d5b8'
+down_revision = 'e8b4d2f6a9c3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('leaderboard_entries',
+    sa.Column('scope', sa.String(length=16), nullable=False),
+    sa.Column('scope_key', sa.String(length=100), nullable=False),
+    sa.Column('instrument_id', sa.Integer(), nullable=False),
+    sa.Column('popularity', sa.Float(), server_default='0', nullable=False),
+    sa.Column('rating_weight', sa.Float(), server_default='0', nullable=False),
+    sa.Column('rating_sum', sa.Float(), server_default='0', nullable=False),
+    sa.ForeignKeyConstraint(['instrument_id'], ['instruments.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('scope', 'scope_key', 'instrument_id')
+    )
+    op.create_index('ix_leaderboard_entries_popularity', 'leaderboard_entries',
+                    ['scope', 'scope_key', 'popularity'], unique=False)
+    # Existing history is loaded by the first `flask compact-leaderboards`
+
+
+def downgrade():
+    op.drop_index('ix_leaderboard_entries_popularity', table_name='leaderboard_entries')
+    op.drop_table('leaderboard_entries')
@@ -0,0 +1,315 @@
+#!/usr/bin/env python
+"""
+Offline Recommendation Replay Benchmark
+
+Seeds a synthetic catalog and rental history into a fresh database, holds
+out each user's latest rental, and replays one session per held-out user
+in-process through:
+
+- recommend_instruments_by_needs (the /by-needs scorer), with needs text
+  describing the held-out instrument
+- GET /api/recommendations (Recommendations.get) through the test client
+
+For each path it reports p50/p95/p99 latency, SQL statements per call and
+hit@k / NDCG@k of the held-out instrument, and writes everything as JSON
+so runs can be compared:
+
+    python tests/replay_benchmark.py --users 2000 --instruments 5000 --output after.json --compare before.json
+
+Classification calls go to a closed local port by default (--hf-url), so
+the run is offline and the keyword fallback is what gets measured.
+"""
+
+import sys
+import os
+import argparse
+import json
+import math
+import random
+import time
+from datetime import datetime, timedelta
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event, insert
+
+from app.init import create_app
+from app.db import db
+from app.models import User, Instrument, Instru_ownership, Rental, Review, SurveyResponse
+from app.services.co_rental_service import refresh_co_rentals
+from app.services.leaderboard_service import compact_leaderboards
+from app.services.rating_service import repair_ratings
+from app.services.recommendation_service import recommend_instruments_by_needs
+from app.services.user_feed_service import refresh_stale_feeds
+
+CATEGORIES = ['guitar', 'piano', 'drums', 'violin', 'flute', 'bass']
+BRANDS = ['Fender', 'Yamaha', 'Gibson', 'Roland', 'Pearl', 'Stentor', 'Ibanez', 'Kawai']
+WORDS = ['acoustic', 'electric', 'vintage', 'studio', 'warm', 'bright', 'compact', 'stage',
+         'practice', 'professional', 'classical', 'maple', 'rosewood', 'digital', 'travel', 'concert']
+LEVELS = ['beginner', 'intermediate', 'advanced']
+LOCATIONS = ['Berlin', 'Paris', 'Lyon', 'Madrid', 'Lisbon']
+DEFAULTS = {'instruments': 500, 'users': 300, 'rentals_per_user': 6, 'sessions': 200, 'k': 5,
+            'seed': 1, 'feeds': 'precomputed', 'warmup': 5, 'hf_url': 'http://127.0.0.1:9/',
+            'database': 'sqlite:///:memory:'}
+
+
+def make_app(config):
+    return create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': config['database'],
+                       'HF_CLASSIFICATION_URL': config['hf_url']})
+
+
+def seed(config):
+    """
+    Insert the synthetic dataset (call inside an app context).
+
+    Instruments have Zipf-like popularity and users favour one or two
+    categories, so rentals carry a signal the recommenders can find. Returns
+    the held-out rentals: {user_id: (instrument_id, needs item)}.
+    """
+    rng = random.Random(config['seed'])
+    instrument_count, user_count = config['instruments'], config['users']
+    now = datetime.utcnow()
+
+    db.session.execute(insert(User.__table__), [
+        {'id': 1, 'email': 'owner@bench.test', 'name': 'Owner', 'password_hash': 'x', 'user_type': 'owner'}
+    ] + [
+        {'id': i, 'email': f'user{i}@bench.test', 'name': f'User {i}', 'password_hash': 'x', 'user_type': 'renter'}
+        for i in range(2, user_count + 2)
+    ])
+
+    instruments, listings = [], []
+    by_category = {category: [] for category in CATEGORIES}
+    for i in range(1, instrument_count + 1):
+        category = rng.choice(CATEGORIES)
+        brand = rng.choice(BRANDS)
+        adjective, *description = rng.sample(WORDS, rng.randint(2, 6))
+        instruments.append({'id': i, 'name': f'{brand} {adjective.title()} {category.title()} {i}',
+                            'category': category, 'brand': brand, 'model': f'M{rng.randint(1, 99)}',
+                            'description': ' '.join(description), 'created_at': now - timedelta(days=365)})
+        listings.append({'id': i, 'user_id': 1, 'instrument_id': i, 'condition': rng.choice(['new', 'good', 'fair']),
+                         'daily_rate': round(rng.lognormvariate(3.0, 0.5), 2), 'location': rng.choice(LOCATIONS),
+                         'is_available': True, 'created_at': now - timedelta(days=365)})
+        by_category[category].append(i)
+    db.session.execute(insert(Instrument.__table__), instruments)
+    db.session.execute(insert(Instru_ownership.__table__), listings)
+
+    popularity = {i: 1.0 / (rank + 1) for rank, i in enumerate(rng.sample(range(1, instrument_count + 1), instrument_count))}
+    quality = {i: rng.uniform(2.5, 5.0) for i in range(1, instrument_count + 1)}
+
+    rentals, reviews, surveys, held_out = [], [], [], {}
+    rental_id = 0
+    for user_id in range(2, user_count + 2):
+        favourites = rng.sample([c for c in CATEGORIES if by_category[c]], k=rng.choice([1, 1, 2]))
+        level = rng.choice(LEVELS)
+        if rng.random() < 0.5:
+            surveys.append({'user_id': user_id, 'preferred_instruments': ','.join(favourites), 'experience_level': level})
+        count = rng.randint(1, 2 * config['rentals_per_user'] - 1)
+        moments = sorted(now - timedelta(days=rng.uniform(1, 180)) for _ in range(count))
+        for n, moment in enumerate(moments):
+            pool = by_category[rng.choice(favourites)] if rng.random() < 0.8 else list(popularity)
+            instrument_id = rng.choices(pool, weights=[popularity[i] for i in pool])[0]
+            if n == count - 1 and count > 1:
+                # Latest rental is the future the recommenders should predict
+                listing = listings[instrument_id - 1]
+                words = instruments[instrument_id - 1]['description'].split()
+                needs = f"{level} {rng.choice(words) + ' ' if words else ''}{instruments[instrument_id - 1]['category']}"
+                budget = math.ceil(listing['daily_rate'] * 1.2) if rng.random() < 0.7 else None
+                held_out[user_id] = (instrument_id, {'user_needs': needs, 'budget': budget, 'experience_level': level})
+                continue
+            rental_id += 1
+            rentals.append({'id': rental_id, 'user_id': user_id, 'instru_ownership_id': instrument_id,
+                            'start_date': moment.date(), 'end_date': moment.date() + timedelta(days=rng.randint(1, 7)),
+                            'status': 'completed', 'total_cost': 0.0, 'created_at': moment})
+            if rng.random() < 0.4:
+                rating = max(1, min(5, round(rng.gauss(quality[instrument_id], 0.7))))
+                reviews.append({'rental_id': rental_id, 'instru_ownership_id': instrument_id, 'renter_id': user_id,
+                                'rating': rating, 'created_at': moment})
+    for table, rows in ((Rental.__table__, rentals), (Review.__table__, reviews), (SurveyResponse.__table__, surveys)):
+        if rows:
+            db.session.execute(insert(table), rows)
+    db.session.commit()
+
+    # Core inserts bypass the write hooks: rebuild the derived tables as the offline jobs would
+    repair_ratings()
+    db.session.commit()
+    compact_leaderboards()
+    refresh_co_rentals(full=True)
+    return held_out, {'instruments': instrument_count, 'users': user_count, 'rentals': len(rentals),
+                      'reviews': len(reviews), 'surveys': len(surveys), 'held_out': len(held_out)}
+
+
+class QueryCounter:
+    """Counts SQL statements executed on an engine while active"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _count(self, conn, cursor, statement, *args):
+        self.count += 1
+
+    def __enter__(self):
+        self.count = 0
+        event.listen(self.engine, 'before_cursor_execute', self._count)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._count)
+
+
+def ranking_metrics(ranked, relevant, k):
+    """(hit@k, NDCG@k) for one relevant item"""
+    top = list(ranked)[:k]
+    if relevant not in top:
+        return 0.0, 0.0
+    return 1.0, 1.0 / math.log2(top.index(relevant) + 2)
+
+
+def summarize(latencies, queries, hits, ndcgs, k):
+    latencies_ms = np.asarray(latencies) * 1000
+    p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99]) if len(latencies_ms) else (0.0, 0.0, 0.0)
+    return {
+        'calls': len(latencies),
+        'latency_ms': {'p50': round(float(p50), 3), 'p95': round(float(p95), 3), 'p99': round(float(p99), 3),
+                       'mean': round(float(latencies_ms.mean()), 3) if len(latencies_ms) else 0.0},
+        'sql_queries': {'mean': round(float(np.mean(queries)), 2) if queries else 0.0,
+                        'max': int(max(queries)) if queries else 0},
+        f'hit@{k}': round(float(np.mean(hits)), 4) if hits else 0.0,
+        f'ndcg@{k}': round(float(np.mean(ndcgs)), 4) if ndcgs else 0.0,
+    }
+
+
+def replay_by_needs(app, sessions, k, warmup):
+    latencies, queries, hits, ndcgs = [], [], [], []
+    with app.app_context():
+        counter = QueryCounter(db.engine)
+        for n, (user_id, (relevant, item)) in enumerate(sessions):
+            with counter:
+                started = time.perf_counter()
+                result = recommend_instruments_by_needs(item['user_needs'], budget=item['budget'],
+                                                        experience_level=item['experience_level'])
+                elapsed = time.perf_counter() - started
+            if n < warmup:
+                continue
+            latencies.append(elapsed)
+            queries.append(counter.count)
+            hit, ndcg = ranking_metrics([r['instrument_id'] for r in result['recommendations']], relevant, k)
+            hits.append(hit)
+            ndcgs.append(ndcg)
+    return summarize(latencies, queries, hits, ndcgs, k)
+
+
+def replay_recommendations(app, sessions, k, warmup):
+    latencies, queries, hits, ndcgs = [], [], [], []
+    client = app.test_client()
+    with app.app_context():
+        tokens = {user_id: create_access_token(identity=str(user_id)) for user_id, _ in sessions}
+        counter = QueryCounter(db.engine)
+    for n, (user_id, (relevant, _)) in enumerate(sessions):
+        with counter:
+            started = time.perf_counter()
+            resp = client.get('/api/recommendations', headers={'Authorization': f'Bearer {tokens[user_id]}'})
+            elapsed = time.perf_counter() - started
+        assert resp.status_code == 200, resp.get_data(as_text=True)
+        if n < warmup:
+            continue
+        latencies.append(elapsed)
+        queries.append(counter.count)
+        hit, ndcg = ranking_metrics([instrument['id'] for instrument in resp.get_json()], relevant, k)
+        hits.append(hit)
+        ndcgs.append(ndcg)
+    return summarize(latencies, queries, hits, ndcgs, k)
+
+
+def run_benchmark(**overrides):
+    """Seed, replay and return the report dict; keyword arguments override DEFAULTS"""
+    config = {**DEFAULTS, **overrides}
+    app = make_app(config)
+    timings = {}
+    with app.app_context():
+        db.create_all()
+        started = time.perf_counter()
+        held_out, dataset = seed(config)
+        timings['seed'] = time.perf_counter() - started
+        sessions = sorted(held_out.items())
+        rng = random.Random(config['seed'])
+        sessions = rng.sample(sessions, min(config['sessions'], len(sessions)))
+        if config['feeds'] == 'precomputed':
+            started = time.perf_counter()
+            refresh_stale_feeds(user_ids=[user_id for user_id, _ in sessions])
+            timings['precompute_feeds'] = time.perf_counter() - started
+
+    # Warmup calls build the in-process caches (snapshot, scoring engine, text index)
+    warmup = min(config['warmup'], max(0, len(sessions) - 1))
+    report = {
+        'generated_at': datetime.utcnow().isoformat() + 'Z',
+        'config': config,
+        'dataset': dataset,
+        'setup_seconds': {name: round(seconds, 3) for name, seconds in timings.items()},
+        'endpoints': {
+            'by_needs': replay_by_needs(app, sessions, config['k'], warmup),
+            'recommendations': replay_recommendations(app, sessions, config['k'], warmup),
+        }
+    }
+    with app.app_context():
+        db.engine.dispose()
+    return report
+
+
+def _flatten(metrics):
+    flat = {}
+    for name, value in metrics.items():
+        if isinstance(value, dict):
+            flat.update({f'{name}.{sub}': v for sub, v in value.items()})
+        else:
+            flat[name] = value
+    return flat
+
+
+def compare(previous, current):
+    """Lines of per-metric changes between two reports"""
+    lines = []
+    for endpoint, metrics in current['endpoints'].items():
+        before = _flatten(previous.get('endpoints', {}).get(endpoint, {}))
+        for name, value in _flatten(metrics).items():
+            old = before.get(name)
+            if old is None:
+                continue
+            change = f'{(value - old) / old * 100:+.1f}%' if old else 'n/a'
+            lines.append(f'{endpoint:16s} {name:20s} {old:>10} -> {value:<10} {change}')
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--instruments', type=int, default=DEFAULTS['instruments'])
+    parser.add_argument('--users', type=int, default=DEFAULTS['users'])
+    parser.add_argument('--rentals-per-user', type=int, default=DEFAULTS['rentals_per_user'])
+    parser.add_argument('--sessions', type=int, default=DEFAULTS['sessions'], help='Held-out sessions replayed')
+    parser.add_argument('--k', type=int, default=DEFAULTS['k'], help='Cut-off for hit@k and NDCG@k')
+    parser.add_argument('--seed', type=int, default=DEFAULTS['seed'])
+    parser.add_argument('--feeds', choices=['precomputed', 'live'], default=DEFAULTS['feeds'],
+                        help='Serve GET /api/recommendations from stored feeds or compute live')
+    parser.add_argument('--warmup', type=int, default=DEFAULTS['warmup'], help='Calls excluded from the stats')
+    parser.add_argument('--hf-url', default=DEFAULTS['hf_url'])
+    parser.add_argument('--database', default=DEFAULTS['database'])
+    parser.add_argument('--output', help='Write the JSON report here')
+    parser.add_argument('--compare', help='Previous JSON report to diff against')
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(**{name: value for name, value in vars(args).items() if name in DEFAULTS})
+    text = json.dumps(report, indent=2, default=str)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    print(text)
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+        print('\n'.join(compare(previous, report)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""
+Autocomplete Tests
+Tests the in-memory prefix index behind GET /api/instruments/autocomplete
+"""
+
+import sys
+import os
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.init import create_app
+from app.db import db
+from app.models import Instrument, ChangeCounter
+from app.services.autocomplete_service import PrefixIndex
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event, insert, update
+
+
+def test_prefix_index():
+    index = PrefixIndex([
+        (1, 'Fender Stratocaster', 'Fender'),
+        (2, 'Telecaster', 'Fender'),
+        (3, 'Grand Piano', 'Steinway'),
+        (4, 'Stage Piano', 'Nord'),
+    ])
+
+    texts = [s['text'] for s in index.search('fen')]
+    assert texts == ['Fender', 'Fender Stratocaster']
+    assert [s['text'] for s in index.search('strat')] == ['Fender Stratocaster']
+    assert [s['text'] for s in index.search('PIANO')] == ['Grand Piano', 'Stage Piano']
+    assert [s['text'] for s in index.search('piano', limit=1)] == ['Grand Piano']
+    assert index.search('zzz') == [] and index.search('  ') == []
+
+
+def test_lookup_latency():
+    index = PrefixIndex((i, f'Instrument {i} Deluxe', f'Brand{i % 500}') for i in range(50000))
+
+    timings = []
+    for i in range(2000):
+        start = time.perf_counter()
+        index.search(f'brand{i % 500}')
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    p99 = timings[int(len(timings) * 0.99)]
+    print(f"entries={len(index)} p99={p99 * 1e6:.1f}us")
+    assert p99 < 0.001
+
+
+def test_endpoint_tracks_catalog_writes():
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:'})
+    with app.app_context():
+        db.create_all()
+        db.session.add(Instrument(name='Jazzmaster', category='guitar', brand='Fender'))
+        db.session.commit()
+        headers = {'Authorization': f"Bearer {create_access_token(identity='1')}"}
+        engine = db.engine
+
+    client = app.test_client()
+    assert client.get('/api/instruments/autocomplete?prefix=jazz').get_json()['suggestions'][0]['text'] == 'Jazzmaster'
+
+    resp = client.post('/api/instruments', json={'name': 'Jaguar', 'category': 'guitar', 'brand': 'Fender'},
+                       headers=headers)
+    assert resp.status_code == 201
+    jaguar_id = resp.get_json()['id']
+
+    # After a rebuild, lookups only read the change counter
+    assert client.get('/api/instruments/autocomplete?prefix=ja').status_code == 200
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(engine, 'before_cursor_execute', listener)
+    suggestions = client.get('/api/instruments/autocomplete?prefix=ja').get_json()['suggestions']
+    event.remove(engine, 'before_cursor_execute', listener)
+    assert [s['text'] for s in suggestions] == ['Jaguar', 'Jazzmaster']
+    assert len(statements) == 1 and 'change_counters' in statements[0]
+
+    client.put(f'/api/instruments/{jaguar_id}', json={'name': 'Mustang', 'category': 'guitar'}, headers=headers)
+    assert [s['text'] for s in client.get('/api/instruments/autocomplete?prefix=mus').get_json()['suggestions']] == ['Mustang']
+
+    client.delete(f'/api/instruments/{jaguar_id}', headers=headers)
+    assert client.get('/api/instruments/autocomplete?prefix=mus').get_json()['suggestions'] == []
+
+    # A catalog write committed by another process shows up once its counter moves
+    with app.app_context(), engine.begin() as connection:
+        connection.execute(insert(Instrument.__table__).values(name='Bass VI', category='guitar', brand='Fender'))
+        counters = ChangeCounter.__table__
+        connection.execute(update(counters).where(counters.c.table_name == 'instruments')
+                           .values(version=counters.c.version + 1))
+    assert [s['text'] for s in client.get('/api/instruments/autocomplete?prefix=bass').get_json()['suggestions']] == ['Bass VI']
+
+
+if __name__ == '__main__':
+    test_prefix_index()
+    test_lookup_latency()
+    test_endpoint_tracks_catalog_writes()
+    print("[OK] Autocomplete tests passed")
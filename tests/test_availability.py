@@ -0,0 +1,142 @@
+"""
+Availability Engine Tests
+Tests the interval tree and date-range booking through the rental and listing endpoints
+"""
+
+import sys
+import os
+import random
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.init import create_app
+from app.db import db
+from app.models import User, Instrument, Instru_ownership, Booking, ChangeCounter
+from app.services.availability_service import IntervalTree, today
+from flask_jwt_extended import create_access_token
+from datetime import date, timedelta
+from sqlalchemy import update
+
+
+def test_interval_tree_matches_brute_force():
+    rng = random.Random(7)
+    base = date(2026, 1, 1)
+    intervals = []
+    for key in range(500):
+        start = base + timedelta(days=rng.randint(0, 365))
+        intervals.append((start, start + timedelta(days=rng.randint(0, 20)), key))
+    tree = IntervalTree(intervals)
+
+    for _ in range(300):
+        q_start = base + timedelta(days=rng.randint(-10, 380))
+        q_end = q_start + timedelta(days=rng.randint(0, 15))
+        expected = {k for s, e, k in intervals if s <= q_end and e >= q_start}
+        assert tree.overlapping(q_start, q_end) == expected
+
+    assert IntervalTree([]).overlapping(base, base) == set()
+
+
+def make_app():
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:'})
+    with app.app_context():
+        db.create_all()
+        owner = User(email='owner@test.com', name='Owner', user_type='owner')
+        owner.set_password('password')
+        renter = User(email='renter@test.com', name='Renter', user_type='renter')
+        renter.set_password('password')
+        instrument = Instrument(name='Stratocaster', category='guitar', brand='Fender')
+        db.session.add_all([owner, renter, instrument])
+        db.session.flush()
+        for rate in (20.0, 30.0):
+            db.session.add(Instru_ownership(user_id=owner.id, instrument_id=instrument.id,
+                                            condition='good', daily_rate=rate, location='Berlin'))
+        db.session.commit()
+        app.config['RENTER_TOKEN'] = create_access_token(identity=str(renter.id))
+    return app
+
+
+def rent(client, token, ownership_id, start, end):
+    return client.post('/api/rentals', headers={'Authorization': f'Bearer {token}'}, json={
+        'instru_ownership_id': ownership_id,
+        'start_date': start.isoformat(),
+        'end_date': end.isoformat()
+    })
+
+
+def test_booking_lifecycle():
+    app = make_app()
+    client = app.test_client()
+    token = app.config['RENTER_TOKEN']
+    auth = {'Authorization': f'Bearer {token}'}
+    day = today()
+
+    first = rent(client, token, 1, day + timedelta(days=10), day + timedelta(days=12))
+    assert first.status_code == 201
+    assert first.get_json()['total_cost'] == 60.0
+
+    # Overlapping dates are rejected, adjacent and future dates are not
+    assert rent(client, token, 1, day + timedelta(days=12), day + timedelta(days=14)).status_code == 409
+    assert rent(client, token, 1, day + timedelta(days=13), day + timedelta(days=14)).status_code == 201
+    assert rent(client, token, 1, day + timedelta(days=5), day + timedelta(days=4)).status_code == 400
+
+    # The listing is still free today, but not during the booked window
+    listed = client.get('/api/instru-ownership').get_json()
+    assert {o['id'] for o in listed} == {1, 2}
+    window = f'start_date={(day + timedelta(days=11)).isoformat()}&end_date={(day + timedelta(days=11)).isoformat()}'
+    assert {o['id'] for o in client.get(f'/api/instru-ownership?{window}').get_json()} == {2}
+    items = client.get(f'/api/instruments/available?{window}').get_json()['items']
+    assert [i['id'] for i in items] == [2]
+
+    availability = client.get(f'/api/instru-ownership/1/availability?{window}').get_json()
+    assert availability['is_free'] is False
+    assert availability['bookings'][0]['rental_id'] == first.get_json()['id']
+
+    # Cancelling the pending rental frees its dates
+    assert client.delete(f"/api/rentals/{first.get_json()['id']}", headers=auth).status_code == 204
+    assert {o['id'] for o in client.get(f'/api/instru-ownership?{window}').get_json()} == {1, 2}
+
+
+def test_return_frees_remaining_days():
+    app = make_app()
+    client = app.test_client()
+    token = app.config['RENTER_TOKEN']
+    day = today()
+
+    rental = rent(client, token, 1, day - timedelta(days=2), day + timedelta(days=5)).get_json()
+    assert {o['id'] for o in client.get('/api/instru-ownership').get_json()} == {2}
+
+    resp = client.post(f"/api/rentals/{rental['id']}/return", headers={'Authorization': f'Bearer {token}'})
+    assert resp.status_code == 200
+    assert {o['id'] for o in client.get('/api/instru-ownership').get_json()} == {1, 2}
+
+    with app.app_context():
+        booking = Booking.query.filter_by(rental_id=rental['id']).one()
+        assert booking.end_date == day - timedelta(days=1)
+
+
+def test_tree_follows_other_processes():
+    """Bookings moved elsewhere (here: Core on its own connection) reach the tree via the shared counter"""
+    app = make_app()
+    client = app.test_client()
+    day = today()
+    rental = rent(client, app.config['RENTER_TOKEN'], 1, day + timedelta(days=10), day + timedelta(days=12)).get_json()
+    window = f'start_date={(day + timedelta(days=21)).isoformat()}&end_date={(day + timedelta(days=21)).isoformat()}'
+    assert {o['id'] for o in client.get(f'/api/instru-ownership?{window}').get_json()} == {1, 2}
+
+    with app.app_context():
+        bookings = Booking.__table__
+        counters = ChangeCounter.__table__
+        with db.engine.begin() as connection:
+            connection.execute(update(bookings).where(bookings.c.rental_id == rental['id'])
+                               .values(start_date=day + timedelta(days=20), end_date=day + timedelta(days=22)))
+            connection.execute(update(counters).where(counters.c.table_name == bookings.name)
+                               .values(version=counters.c.version + 1))
+
+    assert {o['id'] for o in client.get(f'/api/instru-ownership?{window}').get_json()} == {2}
+
+
+if __name__ == '__main__':
+    test_interval_tree_matches_brute_force()
+    test_booking_lifecycle()
+    test_return_frees_remaining_days()
+    test_tree_follows_other_processes()
+    print("[OK] Availability tests passed")
@@ -0,0 +1,177 @@
+"""
+Available Instruments Read Path Tests
+Checks filters/pagination on GET /api/instruments/available and benchmarks
+the number of SQL statements per request against inventory size.
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.init import create_app
+from app.db import db
+from app.models import User, Instrument, Instru_ownership, ChangeCounter
+from app.services.availability_service import today
+from app.services.inventory_service import get_complete_inventory, get_inventory_snapshot, invalidate_inventory
+from app.services.chatbot_service import get_available_instruments
+from app.services.recommendation_service import get_all_instruments_text, recommend_instruments_by_needs
+from app.services.scoring_engine import get_scoring_engine
+from sqlalchemy import event, update
+from datetime import timedelta
+
+
+def make_app(listing_count):
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:'})
+    with app.app_context():
+        db.create_all()
+        owner = User(email='owner@test.com', name='Owner', user_type='owner')
+        owner.set_password('password')
+        db.session.add(owner)
+        guitar = Instrument(name='Stratocaster', category='guitar', brand='Fender')
+        piano = Instrument(name='P-125', category='piano', brand='Yamaha')
+        db.session.add_all([guitar, piano])
+        db.session.flush()
+        for i in range(listing_count):
+            db.session.add(Instru_ownership(
+                user_id=owner.id,
+                instrument_id=guitar.id if i % 2 == 0 else piano.id,
+                condition='good',
+                daily_rate=10.0 + i,
+                location='Berlin' if i % 3 == 0 else 'Paris',
+                is_available=(i % 5 != 4)
+            ))
+        db.session.commit()
+    return app
+
+
+def count_queries(app, url):
+    """Return (response, number of SQL statements executed while serving url)"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        resp = app.test_client().get(url)
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+    return resp, len(statements)
+
+
+def test_query_count_is_constant():
+    """The endpoint issues the same number of queries for any inventory size"""
+    counts = {}
+    window_counts = {}
+    window = f"start_date={(today() + timedelta(days=3)).isoformat()}&end_date={(today() + timedelta(days=4)).isoformat()}"
+    for size in (10, 100, 1000):
+        app = make_app(size)
+        app.test_client().get('/api/instruments/available')  # Warm per-process availability caches
+        app.test_client().get(f'/api/instruments/available?{window}')
+        resp, queries = count_queries(app, '/api/instruments/available?limit=100')
+        assert resp.status_code == 200
+        assert len(resp.get_json()['items']) == min(100, size - size // 5)
+        counts[size] = queries
+        resp, window_counts[size] = count_queries(app, f'/api/instruments/available?limit=100&{window}')
+        assert len(resp.get_json()['items']) == min(100, size - size // 5)
+        print(f"inventory={size:5d} queries={queries} (dated window: {window_counts[size]})")
+
+    # One change-counter lookup for the ETag; today's inventory then comes from the
+    # snapshot, other windows take one joined query
+    assert set(counts.values()) == {1}
+    assert set(window_counts.values()) == {2}
+
+
+def test_snapshot_tracks_writes():
+    app = make_app(10)
+    client = app.test_client()
+    first = client.get('/api/instruments/available?limit=100').get_json()['items']
+    assert len(first) == 8
+
+    with app.app_context():
+        db.session.get(Instru_ownership, first[0]['id']).daily_rate = 99.0
+        db.session.get(Instru_ownership, first[1]['id']).is_available = False
+        db.session.commit()
+
+    items = client.get('/api/instruments/available?limit=100').get_json()['items']
+    assert len(items) == 7
+    assert items[0]['daily_rate'] == 99.0
+
+    # A snapshot over the memory cap is flagged incomplete and the endpoint falls back to SQL
+    app.config['INVENTORY_SNAPSHOT_MAX_LISTINGS'] = 3
+    with app.app_context():
+        invalidate_inventory()
+        assert get_inventory_snapshot().complete is False
+    assert len(client.get('/api/instruments/available?limit=100').get_json()['items']) == 7
+
+
+def test_filters_and_pagination():
+    app = make_app(50)
+    client = app.test_client()
+
+    items = client.get('/api/instruments/available?category=guitar&location=Berlin'
+                       '&min_rate=20&max_rate=50&limit=100').get_json()['items']
+    assert items
+    for item in items:
+        assert item['instrument']['category'] == 'guitar'
+        assert item['location'] == 'Berlin'
+        assert 20 <= item['daily_rate'] <= 50
+
+    seen = []
+    cursor = None
+    while True:
+        url = '/api/instruments/available?limit=7' + (f'&cursor={cursor}' if cursor else '')
+        data = client.get(url).get_json()
+        seen.extend(item['id'] for item in data['items'])
+        cursor = data['next_cursor']
+        if not cursor:
+            break
+    assert seen == sorted(seen) and len(seen) == len(set(seen)) == 40
+
+
+def test_capped_snapshot_readers_see_every_listing():
+    app = make_app(50)  # 40 available
+    app.config.update(INVENTORY_SNAPSHOT_MAX_LISTINGS=10, HF_CLASSIFICATION_URL='http://127.0.0.1:9/')
+    with app.app_context():
+        invalidate_inventory()
+        assert len(get_inventory_snapshot()) == 10 and not get_inventory_snapshot().complete
+        assert len(get_complete_inventory()) == 40 and get_complete_inventory().listings[-1].id == 49
+        assert len(get_scoring_engine()) == 40
+        assert len(get_all_instruments_text()) == 40
+        assert get_available_instruments().endswith("... and 25 more instruments")
+        result = recommend_instruments_by_needs('a piano for practice')
+        assert result['total_available'] == 40
+
+
+def test_snapshot_follows_other_processes():
+    """A write committed elsewhere (here: Core on its own connection) shows up via the shared counters"""
+    app = make_app(10)
+    client = app.test_client()
+    first = client.get('/api/instruments/available?limit=100')
+    listing = first.get_json()['items'][0]
+
+    with app.app_context():
+        table = Instru_ownership.__table__
+        with db.engine.begin() as connection:
+            connection.execute(update(table).where(table.c.id == listing['id']).values(daily_rate=77.0))
+        # Not yet announced: this process keeps serving its snapshot under the old ETag
+        assert client.get('/api/instruments/available?limit=100').get_json()['items'][0]['daily_rate'] == listing['daily_rate']
+        counters = ChangeCounter.__table__
+        with db.engine.begin() as connection:
+            connection.execute(update(counters).where(counters.c.table_name == table.name)
+                               .values(version=counters.c.version + 1))
+
+    second = client.get('/api/instruments/available?limit=100', headers={'If-None-Match': first.headers['ETag']})
+    assert second.status_code == 200 and second.headers['ETag'] != first.headers['ETag']
+    assert second.get_json()['items'][0]['daily_rate'] == 77.0
+
+
+if __name__ == '__main__':
+    test_query_count_is_constant()
+    test_snapshot_tracks_writes()
+    test_filters_and_pagination()
+    test_capped_snapshot_readers_see_every_listing()
+    test_snapshot_follows_other_processes()
+    print("[OK] Available instruments tests passed")
@@ -0,0 +1,131 @@
+"""
+Batch Recommendation Tests
+Tests POST /api/recommendations/by-needs/batch: batch matrix scoring against
+per-query scoring, identical results to single /by-needs calls, a database
+cost independent of the number of items, and validation limits.
+"""
+
+import sys
+import os
+import random
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.init import create_app
+from app.db import db
+from app.models import User, Instrument, Instru_ownership
+from app.services.recommendation_service import extract_instrument_type_from_needs
+from app.services.scoring_engine import get_scoring_engine
+from app.services.text_index import get_text_index
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+CATEGORIES = ['guitar', 'piano', 'drums', 'violin', 'bass']
+WORDS = ['acoustic', 'electric', 'beginner', 'vintage', 'studio', 'warm', 'compact', 'stage', 'fender', 'yamaha']
+ITEMS = [
+    {'user_needs': 'beginner acoustic guitar', 'budget': 20.0},
+    {'user_needs': 'electric bass for the stage'},
+    {'user_needs': 'cheap drums', 'budget': 12.5, 'experience_level': 'beginner'},
+    {'user_needs': 'vintage yamaha piano', 'budget': 0},
+    {'user_needs': 'something warm'},
+]
+
+
+def make_app(listing_count=200):
+    rng = random.Random(7)
+    # Closed port: classification fails fast and falls back to keywords
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+                      'HF_CLASSIFICATION_URL': 'http://127.0.0.1:9/'})
+    with app.app_context():
+        db.create_all()
+        owner = User(email='owner@test.com', name='Owner', user_type='owner')
+        owner.set_password('password')
+        db.session.add(owner)
+        db.session.flush()
+        for i in range(1, listing_count + 1):
+            category = rng.choice(CATEGORIES)
+            db.session.add(Instrument(id=i, name=f'{rng.choice(WORDS).title()} {category.title()} {i}',
+                                      category=category, brand='Brand',
+                                      description=' '.join(rng.choice(WORDS) for _ in range(rng.randint(0, 6)))))
+            db.session.add(Instru_ownership(user_id=owner.id, instrument_id=i, daily_rate=round(rng.uniform(5, 40), 2)))
+        db.session.commit()
+        app.config['TOKEN'] = create_access_token(identity=str(owner.id))
+    return app
+
+
+def post(app, path, body):
+    resp = app.test_client().post(path, json=body, headers={'Authorization': f"Bearer {app.config['TOKEN']}"})
+    return resp.status_code, resp.get_json()
+
+
+def test_score_batch_matches_single_scores():
+    app = make_app()
+    with app.app_context():
+        engine = get_scoring_engine()
+        index = get_text_index()
+        needs = [item['user_needs'] for item in ITEMS]
+        matched = [extract_instrument_type_from_needs(text) for text in needs]
+        budgets = [item.get('budget') for item in ITEMS]
+        relevance = index.relevance_batch(engine.instrument_id, needs)
+        scores = engine.score_batch(matched, budgets, relevance)
+        assert scores.shape == (len(ITEMS), len(engine))
+        for q, text in enumerate(needs):
+            assert relevance[q].tolist() == index.relevance(engine.instrument_id, text).tolist()
+            expected = engine.score(text, matched[q], budgets[q], relevance=relevance[q])
+            assert scores[q].tolist() == expected.tolist()
+
+
+def test_batch_matches_single_calls():
+    app = make_app()
+    status, body = post(app, '/api/recommendations/by-needs/batch', {'items': ITEMS})
+    assert status == 200 and body['count'] == len(ITEMS)
+    for item, result in zip(ITEMS, body['results']):
+        status, single = post(app, '/api/recommendations/by-needs', item)
+        assert status == 200
+        assert result == single
+        assert result['user_needs_analyzed'] == item['user_needs']
+
+    status, body = post(app, '/api/recommendations/by-needs/batch', {'items': ITEMS[:1], 'limit': 12})
+    assert len(body['results'][0]['recommendations']) == 12
+
+
+def test_validation():
+    app = make_app(listing_count=5)
+    assert post(app, '/api/recommendations/by-needs/batch', {'items': []})[0] == 422
+    assert post(app, '/api/recommendations/by-needs/batch', {'items': [{'budget': 5}]})[0] == 422
+    assert post(app, '/api/recommendations/by-needs/batch', {'items': ITEMS * 101})[0] == 422
+    assert post(app, '/api/recommendations/by-needs/batch', {'items': ITEMS, 'limit': 21})[0] == 422
+
+
+def test_database_cost_is_per_batch():
+    app = make_app()
+    with app.app_context():
+        engine = db.engine
+    post(app, '/api/recommendations/by-needs/batch', {'items': ITEMS})  # Warm the snapshot and index
+
+    counts = {}
+    for size in (1, 400):
+        items = [ITEMS[i % len(ITEMS)] | {'user_needs': f"{ITEMS[i % len(ITEMS)]['user_needs']} {i}"}
+                 for i in range(size)]
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(engine, 'before_cursor_execute', listener)
+        try:
+            started = time.perf_counter()
+            status, body = post(app, '/api/recommendations/by-needs/batch', {'items': items})
+            elapsed = time.perf_counter() - started
+        finally:
+            event.remove(engine, 'before_cursor_execute', listener)
+        assert status == 200 and body['count'] == size
+        counts[size] = len(statements)
+        print(f"batch of {size:3d}: {len(statements)} statements, {elapsed * 1000:.0f} ms")
+    # No per-item round-trips: the statement count does not grow with the batch
+    assert counts[400] == counts[1]
+
+
+if __name__ == '__main__':
+    test_score_batch_matches_single_scores()
+    test_batch_matches_single_calls()
+    test_validation()
+    test_database_cost_is_per_batch()
+    print("[OK] Batch recommendation tests passed")
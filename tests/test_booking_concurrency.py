@@ -0,0 +1,141 @@
+"""
+Booking Concurrency Stress Test
+Fires hundreds of concurrent POST /api/rentals at a local SQLite file database
+and checks that double booking is impossible, while measuring throughput.
+
+Run standalone for a bigger run:  python tests/test_booking_concurrency.py 1000
+"""
+
+import sys
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.init import create_app
+from app.db import db
+from app.models import User, Instrument, Instru_ownership, Rental, Booking
+from flask_jwt_extended import create_access_token
+from datetime import timedelta
+from app.services.availability_service import today
+
+WORKERS = 32
+
+
+def make_app(db_path, listings):
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{db_path}',
+        'SQLALCHEMY_ENGINE_OPTIONS': {
+            'connect_args': {'timeout': 30, 'check_same_thread': False},
+            'pool_size': WORKERS,
+            'max_overflow': 0
+        }
+    })
+    with app.app_context():
+        db.create_all()
+        owner = User(email='owner@test.com', name='Owner', user_type='owner')
+        owner.set_password('password')
+        renter = User(email='renter@test.com', name='Renter', user_type='renter')
+        renter.set_password('password')
+        instrument = Instrument(name='Stratocaster', category='guitar', brand='Fender')
+        db.session.add_all([owner, renter, instrument])
+        db.session.flush()
+        for _ in range(listings):
+            db.session.add(Instru_ownership(user_id=owner.id, instrument_id=instrument.id, daily_rate=25.0))
+        db.session.commit()
+        app.config['RENTER_TOKEN'] = create_access_token(identity=str(renter.id))
+    return app
+
+
+def fire(app, payloads):
+    """POST every payload concurrently; return (status codes, elapsed seconds)"""
+    headers = {'Authorization': f"Bearer {app.config['RENTER_TOKEN']}"}
+    start_gate = threading.Barrier(WORKERS)
+    local = threading.local()
+
+    def post(payload):
+        if not hasattr(local, 'client'):
+            local.client = app.test_client()
+            start_gate.wait()  # Line every worker up so the first wave truly collides
+        return local.client.post('/api/rentals', json=payload, headers=headers).status_code
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+        statuses = list(pool.map(post, payloads))
+    return statuses, time.perf_counter() - started
+
+
+def test_same_dates_have_exactly_one_winner(requests=200):
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(os.path.join(tmp, 'stress.db'), listings=1)
+        start = today() + timedelta(days=7)
+        payload = {
+            'instru_ownership_id': 1,
+            'start_date': start.isoformat(),
+            'end_date': (start + timedelta(days=3)).isoformat()
+        }
+
+        statuses, elapsed = fire(app, [payload] * requests)
+        print(f"contended: {requests} requests in {elapsed:.2f}s "
+              f"({requests / elapsed:.0f} req/s), outcomes={ {s: statuses.count(s) for s in set(statuses)} }")
+
+        assert statuses.count(201) == 1
+        assert statuses.count(409) == requests - 1
+        with app.app_context():
+            assert Rental.query.count() == 1
+            assert Booking.query.count() == 1
+            db.engine.dispose()
+
+
+def test_booking_throughput(requests=200):
+    listings = 20
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(os.path.join(tmp, 'throughput.db'), listings=listings)
+        base = today() + timedelta(days=1)
+        # Non-overlapping week-long slots spread across listings
+        payloads = [{
+            'instru_ownership_id': (i % listings) + 1,
+            'start_date': (base + timedelta(days=7 * (i // listings))).isoformat(),
+            'end_date': (base + timedelta(days=7 * (i // listings) + 6)).isoformat()
+        } for i in range(requests)]
+
+        statuses, elapsed = fire(app, payloads)
+        print(f"uncontended: {requests} bookings in {elapsed:.2f}s ({requests / elapsed:.0f} bookings/s)")
+
+        assert statuses.count(201) == requests
+        with app.app_context():
+            assert Booking.query.count() == requests
+            db.engine.dispose()
+
+
+def test_owner_edit_racing_a_booking():
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(os.path.join(tmp, 'edit.db'), listings=1)
+        start = today() + timedelta(days=3)
+        with app.app_context():
+            # The owner's request has loaded the listing...
+            ownership = db.session.get(Instru_ownership, 1)
+            # ...when a booking commits from another request
+            booker = threading.Thread(target=lambda: app.test_client().post('/api/rentals', json={
+                'instru_ownership_id': 1, 'start_date': start.isoformat(),
+                'end_date': (start + timedelta(days=2)).isoformat()
+            }, headers={'Authorization': f"Bearer {app.config['RENTER_TOKEN']}"}))
+            booker.start()
+            booker.join()
+            ownership.daily_rate = 30.0
+            db.session.commit()  # Not a StaleDataError
+            db.session.expire_all()
+            assert db.session.get(Instru_ownership, 1).daily_rate == 30.0
+            assert Booking.query.count() == 1
+            db.engine.dispose()
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    test_same_dates_have_exactly_one_winner(count)
+    test_booking_throughput(count)
+    test_owner_edit_racing_a_booking()
+    print("[OK] Booking concurrency tests passed")
@@ -0,0 +1,141 @@
+"""
+Chat Sessions Tests
+Tests the chat_sessions index: rows maintained as exchanges are saved
+(times, counts, title), losing the race to create a session's row,
+keyset pagination of /api/chatbot/sessions most recent first, the single
+query per page, other users' sessions, invalid cursors and clearing a
+session.
+"""
+
+import sys
+import os
+from datetime import datetime, timedelta
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.init import create_app
+from app.db import db
+from app.models import User, ChatMessage, ChatSession, ChatSummary
+from app.services.chatbot_service import save_chat_exchange
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+
+def make_app():
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+                      'CHAT_HISTORY_TOKENS': 60, 'CHAT_SUMMARY_TOKENS': 20})
+    with app.app_context():
+        db.create_all()
+        tokens = []
+        for i in range(2):
+            user = User(email=f'sessions{i}@test.com', name=f'Sessions {i}', user_type='renter')
+            user.set_password('password')
+            db.session.add(user)
+            db.session.flush()
+            tokens.append(create_access_token(identity=str(user.id)))
+        db.session.commit()
+        app.config['TOKENS'] = tokens
+    return app
+
+
+def get(app, url, user=0):
+    return app.test_client().get(url, headers={'Authorization': f"Bearer {app.config['TOKENS'][user]}"})
+
+
+def test_session_rows_follow_messages():
+    app = make_app()
+    with app.app_context():
+        question = '  Which   guitar should I rent for a summer of campfire songs with my friends at the lake?  '
+        save_chat_exchange(1, 's1', question, {}, 'A travel guitar.', [])
+        save_chat_exchange(1, 's1', 'And strings?', {}, 'Nylon strings.', [])
+        save_chat_exchange(2, 's1', 'Piano?', {}, 'A digital piano.', [])
+
+        row = ChatSession.query.filter_by(user_id=1, session_id='s1').one()
+        messages = ChatMessage.query.filter_by(user_id=1, session_id='s1').order_by(ChatMessage.id).all()
+        assert row.message_count == 4 == len(messages)
+        assert row.started_at == messages[0].created_at and row.last_message_at == messages[-1].created_at
+        assert row.title == 'Which guitar should I rent for a summer of campfire songs with my friends at...'
+        assert ChatSession.query.filter_by(user_id=2).one().message_count == 2
+
+
+def test_concurrent_first_exchange():
+    """Another exchange creates the session's row between our lookup and insert"""
+    app = make_app()
+    with app.app_context():
+        def create_row_first(conn, cursor, statement, *args):
+            if statement.startswith('SAVEPOINT') and not raced:  # Just before our insert
+                raced.append(True)
+                conn.exec_driver_sql(
+                    "INSERT INTO chat_sessions (user_id, session_id, started_at, last_message_at, message_count, title) "
+                    "VALUES (1, 's1', '2026-01-01 00:00:00', '2026-01-01 00:00:00', 2, 'Their question')"
+                )
+
+        raced = []
+        event.listen(db.engine, 'before_cursor_execute', create_row_first)
+        try:
+            reply = save_chat_exchange(1, 's1', 'My question', {}, 'My answer', [])
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', create_row_first)
+
+        assert raced and reply.id is not None
+        assert ChatMessage.query.filter_by(session_id='s1').count() == 2
+        row = ChatSession.query.filter_by(user_id=1, session_id='s1').one()
+        assert row.message_count == 4 and row.title == 'Their question'
+        assert row.last_message_at == reply.created_at
+
+
+def test_keyset_pagination():
+    app = make_app()
+    with app.app_context():
+        for n in range(5):
+            save_chat_exchange(1, f's{n}', f'Question {n}', {}, 'Answer', [])
+        save_chat_exchange(2, 'other', 'Hidden', {}, 'Answer', [])
+        # s2 becomes the most recently active session; s3 and s4 share a timestamp
+        base = datetime(2026, 1, 1)
+        for n, minutes in enumerate([0, 1, 10, 5, 5]):
+            ChatSession.query.filter_by(session_id=f's{n}').one().last_message_at = base + timedelta(minutes=minutes)
+        db.session.commit()
+
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            pages, url = [], '/api/chatbot/sessions?limit=2'
+            while url:
+                statements.clear()
+                body = get(app, url).get_json()
+                assert len([s for s in statements if 'chat_sessions' in s]) == 1
+                assert not any('chat_messages' in s for s in statements)
+                pages.append([s['session_id'] for s in body['sessions']])
+                url = body['next_cursor'] and f"/api/chatbot/sessions?limit=2&cursor={body['next_cursor']}"
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+
+    assert pages == [['s2', 's4'], ['s3', 's1'], ['s0']]
+    first = get(app, '/api/chatbot/sessions').get_json()['sessions'][0]
+    assert first['message_count'] == 2 and first['title'] == 'Question 2'
+    assert [s['session_id'] for s in get(app, '/api/chatbot/sessions', user=1).get_json()['sessions']] == ['other']
+    assert get(app, '/api/chatbot/sessions?cursor=bogus').status_code == 400
+    assert get(app, '/api/chatbot/sessions?limit=0').status_code == 422
+
+
+def test_clear_session():
+    app = make_app()
+    with app.app_context():
+        for n in range(4):
+            save_chat_exchange(1, 's1', f'Question {n} about long-term cello rentals?', {},
+                               'Cellos need humidity control. ' * 3, [])
+        assert ChatSummary.query.count() == 1
+    resp = app.test_client().delete('/api/chatbot/clear-session/s1',
+                                    headers={'Authorization': f"Bearer {app.config['TOKENS'][0]}"})
+    assert resp.get_json()['deleted_count'] == 8
+    assert get(app, '/api/chatbot/sessions').get_json() == {'sessions': [], 'next_cursor': None}
+    with app.app_context():
+        assert ChatSummary.query.count() == 0
+
+
+if __name__ == '__main__':
+    test_session_rows_follow_messages()
+    test_concurrent_first_exchange()
+    test_keyset_pagination()
+    test_clear_session()
+    print("[OK] Chat sessions tests passed")
@@ -0,0 +1,179 @@
+"""
+Chat Streaming Tests
+Tests /api/chatbot/chat/stream: incremental [RECOMMENDATIONS] parsing across
+chunk boundaries, SSE event order, tokens arriving before generation ends,
+saved messages, the rule-based fallback, interrupted streams and TTFT metrics.
+"""
+
+import sys
+import os
+import json
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.init import create_app
+from app.db import db
+from app.models import User, ChatMessage
+from app.services import chatbot_service
+from app.services.chatbot_service import RecommendationBlockParser, extract_recommendations
+from app.metrics import get_metric
+from flask_jwt_extended import create_access_token
+
+REPLY = ("Try the Yamaha C40, a forgiving nylon-string guitar.\n"
+         "[RECOMMENDATIONS]\n"
+         '{"recommendations": [{"name": "Yamaha C40", "reason": "Gentle on beginners"}]}\n'
+         "[/RECOMMENDATIONS]")
+
+
+class ScriptedChain:
+    """Stands in for the prompt | OllamaLLM chain: streams fixed chunks with a delay"""
+
+    def __init__(self, chunks, delay=0.0, fail_after=None):
+        self.chunks = chunks
+        self.delay = delay
+        self.fail_after = fail_after
+
+    def stream(self, inputs):
+        for n, chunk in enumerate(self.chunks):
+            if n == self.fail_after:
+                raise ConnectionError("Ollama connection reset")
+            time.sleep(self.delay)
+            yield chunk
+
+
+class UnavailableChain:
+    def stream(self, inputs):
+        raise ConnectionError("Connection refused")
+
+
+def make_app():
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:'})
+    with app.app_context():
+        db.create_all()
+        user = User(email='chat@test.com', name='Chatter', user_type='renter')
+        user.set_password('password')
+        db.session.add(user)
+        db.session.commit()
+        app.config['TOKEN'] = create_access_token(identity=str(user.id))
+    return app
+
+
+def chunked(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def parse_events(body):
+    events = []
+    for frame in body.strip().split('\n\n'):
+        if frame.startswith(':'):  # Keep-alive while the job was queued
+            continue
+        event, data = frame.split('\n')
+        events.append((event[len('event: '):], json.loads(data[len('data: '):])))
+    return events
+
+
+def post_stream(app, chain, message='Which guitar should I rent?', **kwargs):
+    chatbot_service._chain = chain
+    try:
+        return app.test_client().post('/api/chatbot/chat/stream', json={'message': message, 'session_id': 's1'},
+                                      headers={'Authorization': f"Bearer {app.config['TOKEN']}"}, **kwargs)
+    finally:
+        if not kwargs:
+            chatbot_service._chain = None
+
+
+def test_parser_handles_any_chunking():
+    expected = REPLY.split('[RECOMMENDATIONS]')[0].strip()
+    for size in range(1, len(REPLY) + 1):
+        parser = RecommendationBlockParser()
+        shown = ''.join(parser.feed(chunk) for chunk in chunked(REPLY, size)) + parser.finish()
+        assert '[' not in shown
+        assert parser.response == expected
+        assert parser.recommendations == extract_recommendations(REPLY)
+
+    # A bracket that is not the marker is released, even at the end of the stream
+    parser = RecommendationBlockParser()
+    assert parser.feed('Costs [approx') == 'Costs [approx'
+    assert parser.feed(' $5] [RECO') == ' $5] '
+    assert parser.finish() == '[RECO'
+    assert parser.recommendations == []
+
+
+def test_stream_events_and_saved_messages():
+    app = make_app()
+    ttft_before = get_metric('chat.ttft').count
+    resp = post_stream(app, ScriptedChain(chunked(REPLY, 7)))
+    assert resp.status_code == 200
+    assert resp.mimetype == 'text/event-stream' and resp.headers['Cache-Control'] == 'no-cache'
+
+    events = parse_events(resp.get_data(as_text=True))
+    assert events[0] == ('start', {'session_id': 's1', 'source': 'llm'})
+    assert {name for name, _ in events[1:-1]} == {'token'}
+    streamed = ''.join(data['text'] for _, data in events[1:-1])
+    name, done = events[-1]
+    assert name == 'done' and done['assistant_response'] == streamed.strip()
+    assert done['recommendations'] == [{'name': 'Yamaha C40', 'reason': 'Gentle on beginners'}]
+    assert 0 < done['ttft_ms'] <= done['total_ms']
+    assert get_metric('chat.ttft').count == ttft_before + 1
+
+    with app.app_context():
+        messages = ChatMessage.query.filter_by(session_id='s1').order_by(ChatMessage.id).all()
+        assert [m.message_type for m in messages] == ['user', 'assistant']
+        assert messages[1].id == done['message_id'] and messages[1].content == done['assistant_response']
+        assert messages[1].context_data['recommendations'] == done['recommendations']
+
+    metrics = app.test_client().get('/api/chatbot/metrics',
+                                    headers={'Authorization': f"Bearer {app.config['TOKEN']}"}).get_json()
+    assert metrics['chat.ttft']['count'] >= 1 and metrics['chat.ttft']['p50_ms'] > 0
+
+
+def test_first_token_arrives_before_generation_ends():
+    app = make_app()
+    chunks = chunked(REPLY, 20)
+    delay = 0.05
+    resp = post_stream(app, ScriptedChain(chunks, delay=delay), buffered=False)
+    try:
+        started = time.perf_counter()
+        arrivals = []
+        for frame in resp.response:
+            arrivals.append((time.perf_counter() - started, frame.decode() if isinstance(frame, bytes) else frame))
+        resp.close()
+    finally:
+        chatbot_service._chain = None
+    first_token = next(at for at, frame in arrivals if frame.startswith('event: token'))
+    total = arrivals[-1][0]
+    assert arrivals[-1][1].startswith('event: done')
+    # The first token is flushed after about one chunk's delay, not after the whole reply
+    assert first_token < total / 2 and total >= delay * len(chunks) * 0.9
+
+
+def test_fallback_when_ollama_is_down():
+    app = make_app()
+    events = parse_events(post_stream(app, UnavailableChain(), message='hello, can you help?').get_data(as_text=True))
+    assert events[0][1]['source'] == 'fallback'
+    assert events[-1][0] == 'done' and 'rental assistant' in events[-1][1]['assistant_response']
+    with app.app_context():
+        assert ChatMessage.query.count() == 2
+
+
+def test_interrupted_stream():
+    app = make_app()
+    events = parse_events(post_stream(app, ScriptedChain(chunked(REPLY, 10), fail_after=3)).get_data(as_text=True))
+    assert [name for name, _ in events][-1] == 'error'
+    assert ''.join(data['text'] for name, data in events if name == 'token') == REPLY[:30]
+    with app.app_context():
+        reply = ChatMessage.query.filter_by(message_type='assistant').one()
+        assert reply.content == REPLY[:30].strip() and reply.context_data['incomplete'] is True
+
+    resp = app.test_client().post('/api/chatbot/chat/stream', json={'message': '  '},
+                                  headers={'Authorization': f"Bearer {app.config['TOKEN']}"})
+    assert resp.status_code == 400
+
+
+if __name__ == '__main__':
+    test_parser_handles_any_chunking()
+    test_stream_events_and_saved_messages()
+    test_first_token_arrives_before_generation_ends()
+    test_fallback_when_ollama_is_down()
+    test_interrupted_stream()
+    print("[OK] Chat streaming tests passed")
@@ -0,0 +1,144 @@
+"""
+Conditional GET Tests
+Tests ETag / If-None-Match handling on the public catalog and listing endpoints
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.init import create_app
+from app.db import db
+from app.models import User, Instrument, Instru_ownership
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+from datetime import timedelta
+from app.services.availability_service import today
+from app.services.change_counter_service import change_versions
+
+
+def make_app(**config):
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:', **config})
+    with app.app_context():
+        db.create_all()
+        owner = User(email='owner@test.com', name='Owner', user_type='owner')
+        owner.set_password('password')
+        renter = User(email='renter@test.com', name='Renter', user_type='renter')
+        renter.set_password('password')
+        guitar = Instrument(name='Stratocaster', category='guitar', brand='Fender')
+        db.session.add_all([owner, renter, guitar])
+        db.session.flush()
+        db.session.add(Instru_ownership(user_id=owner.id, instrument_id=guitar.id, daily_rate=20.0))
+        db.session.commit()
+        app.config['RENTER_TOKEN'] = create_access_token(identity=str(renter.id))
+    return app
+
+
+def revalidate(client, url, etag):
+    return client.get(url, headers={'If-None-Match': etag})
+
+
+def test_not_modified_skips_the_view():
+    app = make_app()
+    client = app.test_client()
+
+    first = client.get('/api/instruments')
+    assert first.status_code == 200
+    assert first.headers['Cache-Control'] == 'public, no-cache'
+    etag = first.headers['ETag']
+    assert not etag.startswith('W/')
+
+    statements = []
+    with app.app_context():
+        engine = db.engine
+    listener = lambda *args: statements.append(args[2])
+    event.listen(engine, 'before_cursor_execute', listener)
+    try:
+        resp = revalidate(client, '/api/instruments', etag)
+    finally:
+        event.remove(engine, 'before_cursor_execute', listener)
+    assert resp.status_code == 304
+    assert resp.data == b''
+    assert resp.headers['ETag'] == etag
+    assert len(statements) == 1 and 'change_counters' in statements[0]
+
+    # Another query string is another representation
+    assert revalidate(client, '/api/instruments?category=guitar', etag).status_code == 200
+
+    with app.app_context():
+        db.session.add(Instrument(name='P-125', category='piano', brand='Yamaha'))
+        db.session.commit()
+    resp = revalidate(client, '/api/instruments', etag)
+    assert resp.status_code == 200
+    assert len(resp.get_json()['items']) == 2
+
+
+def test_listing_etags_follow_bookings():
+    app = make_app(PUBLIC_CACHE_CONTROL='public, max-age=30')
+    client = app.test_client()
+
+    urls = ['/api/instruments/available', '/api/instru-ownership']
+    etags = {}
+    for url in urls:
+        resp = client.get(url)
+        assert resp.headers['Cache-Control'] == 'public, max-age=30'
+        etags[url] = resp.headers['ETag']
+        assert revalidate(client, url, etags[url]).status_code == 304
+
+    # Unrelated writes keep the listing ETags valid
+    with app.app_context():
+        db.session.get(User, 1).name = 'Renamed Owner'
+        db.session.commit()
+    for url in urls:
+        assert revalidate(client, url, etags[url]).status_code == 304
+
+    day = today()
+    resp = client.post('/api/rentals', headers={'Authorization': f"Bearer {app.config['RENTER_TOKEN']}"}, json={
+        'instru_ownership_id': 1,
+        'start_date': day.isoformat(),
+        'end_date': (day + timedelta(days=2)).isoformat()
+    })
+    assert resp.status_code == 201
+    for url in urls:
+        resp = revalidate(client, url, etags[url])
+        assert resp.status_code == 200
+        assert resp.headers['ETag'] != etags[url]
+
+
+def test_counters_move_after_commit():
+    app = make_app()
+    with app.app_context():
+        before = change_versions(['instruments'])['instruments']
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            db.session.add(Instrument(name='P-125', category='piano', brand='Yamaha'))
+            db.session.flush()
+            # The writer's transaction does not touch (or lock) the counter row
+            assert not any('change_counters' in statement for statement in statements)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        db.session.commit()
+        assert change_versions(['instruments'])['instruments'] == before + 1
+
+        db.session.add(Instrument(name='Kazoo', category='other', brand='Generic'))
+        db.session.flush()
+        db.session.rollback()
+        assert change_versions(['instruments'])['instruments'] == before + 1
+
+        # A rolled-back savepoint does not lose the outer transaction's bump
+        db.session.add(Instrument(name='Cajon', category='drums', brand='Meinl'))
+        savepoint = db.session.begin_nested()
+        db.session.add(Instrument(name='Tabla', category='drums', brand='Generic'))
+        db.session.flush()
+        savepoint.rollback()
+        db.session.commit()
+        assert change_versions(['instruments'])['instruments'] == before + 2
+
+
+if __name__ == '__main__':
+    test_not_modified_skips_the_view()
+    test_listing_etags_follow_bookings()
+    test_counters_move_after_commit()
+    print("[OK] Conditional GET tests passed")
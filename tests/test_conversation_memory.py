@@ -0,0 +1,148 @@
+"""
+Conversation Memory Tests
+Tests the token-budgeted chat history: token counts on saved messages,
+recent turns kept verbatim, older turns folded once into the rolling
+session summary, and prompts that never exceed CHAT_HISTORY_TOKENS, also
+with oversized replies, a lowered budget and through the chat endpoint.
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.init import create_app
+from app.db import db
+from app.models import User, ChatMessage, ChatSummary
+from app.services import chatbot_service
+from app.services.chatbot_service import get_conversation_history, save_chat_exchange
+from app.services.conversation_memory import (
+    SUMMARY_HEADER, NO_HISTORY, clip_to_tokens, estimate_tokens, fold, update_conversation_memory
+)
+from flask_jwt_extended import create_access_token
+
+BUDGET = 150
+
+
+def make_app(**config):
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+                      'CHAT_HISTORY_TOKENS': BUDGET, 'CHAT_SUMMARY_TOKENS': 50, **config})
+    with app.app_context():
+        db.create_all()
+        user = User(email='memory@test.com', name='Memory', user_type='renter')
+        user.set_password('password')
+        db.session.add(user)
+        db.session.commit()
+        app.config['TOKEN'] = create_access_token(identity=str(user.id))
+    return app
+
+
+def exchange(n, reply_words=30):
+    question = f"Question {n}: which instrument suits a jazz trio?"
+    reply = f"Answer {n}. " + " ".join(["The upright bass anchors the rhythm section."] * (reply_words // 7))
+    save_chat_exchange(1, 's1', question, {}, reply, [])
+
+
+def summary():
+    return ChatSummary.query.filter_by(user_id=1, session_id='s1').first()
+
+
+def test_helpers():
+    assert estimate_tokens('') == 0 and estimate_tokens('abcd') == 1 and estimate_tokens('abcde') == 2
+    text = "one two three four five six seven eight nine ten"
+    assert clip_to_tokens(text, 100) == text
+    clipped = clip_to_tokens(text, 5)
+    assert clipped == "one two three..." and estimate_tokens(clipped) <= 5
+
+    folded = fold('', [('user', 'Which guitar? I am new.'), ('assistant', 'Try a nylon-string guitar. ' * 20)], 100)
+    assert folded.split('\n') == ['User: Which guitar?', 'Assistant: Try a nylon-string guitar.']
+    # The oldest lines make room for new ones
+    assert fold(folded, [('user', 'x' * 40)], 16).split('\n') == ['User: ' + 'x' * 40]
+
+
+def test_history_stays_within_budget():
+    app = make_app()
+    with app.app_context():
+        assert get_conversation_history('s1', 1) == NO_HISTORY
+        exchange(0)
+        history = get_conversation_history('s1', 1)
+        assert summary() is None and history.startswith('User: Question 0')
+
+        previous_through = 0
+        for n in range(1, 12):
+            exchange(n)
+            history = get_conversation_history('s1', 1)
+            assert estimate_tokens(history) <= BUDGET
+            # The newest exchange is always verbatim
+            newest = ChatMessage.query.filter_by(session_id='s1').order_by(ChatMessage.id.desc()).first()
+            assert history.endswith(f"Assistant: {newest.content}")
+            assert summary().through_message_id >= previous_through
+            previous_through = summary().through_message_id
+
+        stored = summary()
+        assert history.startswith(SUMMARY_HEADER + '\n' + stored.summary)
+        assert stored.token_count == estimate_tokens(stored.summary) <= 50
+        # Each folded message appears once, as a short excerpt, newest folded last
+        lines = stored.summary.split('\n')
+        assert len(lines) == len(set(lines))
+        folded_last = db.session.get(ChatMessage, stored.through_message_id)
+        assert lines[-1].endswith(folded_last.content.split('. ')[0] + '.')
+        # Messages after the summary are not folded again
+        for message in ChatMessage.query.filter(ChatMessage.id > stored.through_message_id):
+            assert message.content.split(':')[0] not in stored.summary
+
+        # Nothing new to fold: no change
+        update_conversation_memory(1, 's1')
+        assert summary().through_message_id == stored.through_message_id
+
+        # A lowered budget is respected before anything is folded again
+        app.config['CHAT_HISTORY_TOKENS'] = 40
+        assert estimate_tokens(get_conversation_history('s1', 1)) <= 40
+        app.config['CHAT_HISTORY_TOKENS'] = 10
+        assert get_conversation_history('s1', 1) == NO_HISTORY
+
+
+def test_oversized_reply_is_folded():
+    app = make_app()
+    with app.app_context():
+        save_chat_exchange(1, 's1', 'Tell me everything about pianos.', {}, 'Pianos are great. ' * 200, [])
+        assert ChatMessage.query.filter_by(message_type='assistant').one().token_count == 900
+        history = get_conversation_history('s1', 1)
+        assert estimate_tokens(history) <= BUDGET
+        assert 'Assistant: Pianos are great.' in summary().summary
+
+
+def test_prompt_uses_memory():
+    app = make_app()
+
+    class RecordingChain:
+        def __init__(self):
+            self.contexts = []
+
+        def invoke(self, inputs):
+            self.contexts.append(inputs['context'])
+            return "A long answer. " * 15
+
+    chatbot_service._chain = chain = RecordingChain()
+    try:
+        client = app.test_client()
+        for n in range(6):
+            resp = client.post('/api/chatbot/chat', json={'message': f'Question number {n}?', 'session_id': 's1'},
+                               headers={'Authorization': f"Bearer {app.config['TOKEN']}"})
+            assert resp.status_code == 200
+    finally:
+        chatbot_service._chain = None
+        app.extensions['llm_jobs'].stop()
+    assert chain.contexts[0] == NO_HISTORY
+    assert all(estimate_tokens(context) <= BUDGET for context in chain.contexts)
+    # The summary keeps the latest folded turns and has dropped the first ones
+    assert chain.contexts[-1].startswith(SUMMARY_HEADER) and 'User: Question number 4?' in chain.contexts[-1]
+    assert 'Question number 0?' not in chain.contexts[-1]
+    assert chain.contexts[-1].endswith('Assistant: ' + ("A long answer. " * 15).strip())
+
+
+if __name__ == '__main__':
+    test_helpers()
+    test_history_stays_within_budget()
+    test_oversized_reply_is_folded()
+    test_prompt_uses_memory()
+    print("[OK] Conversation memory tests passed")
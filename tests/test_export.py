@@ -0,0 +1,111 @@
+"""
+Data Export Tests
+Tests streaming NDJSON/CSV/gzip exports via /api/export/<dataset> and the
+export CLI, and checks that memory use does not grow with table size.
+"""
+
+import sys
+import os
+import csv
+import gzip
+import io
+import json
+import tracemalloc
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.init import create_app
+from app.db import db
+from app.models import User, Instrument, Instru_ownership, Rental
+from app.services.export_service import export_chunks
+from flask_jwt_extended import create_access_token
+from sqlalchemy import insert
+from datetime import date, datetime
+
+
+def make_app(instrument_count=3):
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:'})
+    with app.app_context():
+        db.create_all()
+        analyst = User(email='analyst@test.com', name='Analyst', user_type='owner')
+        analyst.set_password('password')
+        other = User(email='other@test.com', name='Other', user_type='renter')
+        other.set_password('password')
+        db.session.add_all([analyst, other])
+        db.session.flush()
+        now = datetime.utcnow()
+        db.session.execute(insert(Instrument.__table__), [
+            {'name': f'Model {i}', 'category': 'guitar', 'brand': 'Fender', 'description': f'Line, "quoted" {i}',
+             'created_at': now}
+            for i in range(instrument_count)
+        ])
+        db.session.add(Instru_ownership(user_id=analyst.id, instrument_id=1, daily_rate=20.0))
+        db.session.flush()
+        db.session.add(Rental(user_id=other.id, instru_ownership_id=1, start_date=date(2026, 1, 1),
+                              end_date=date(2026, 1, 3), total_cost=60.0, status='completed'))
+        db.session.commit()
+        app.config['DATA_EXPORT_USER_IDS'] = {analyst.id}
+        app.config['ANALYST_TOKEN'] = create_access_token(identity=str(analyst.id))
+        app.config['OTHER_TOKEN'] = create_access_token(identity=str(other.id))
+    return app
+
+
+def get(app, url, token='ANALYST_TOKEN'):
+    return app.test_client().get(url, headers={'Authorization': f"Bearer {app.config[token]}"})
+
+
+def test_formats():
+    app = make_app()
+
+    resp = get(app, '/api/export/instruments')
+    assert resp.status_code == 200 and resp.is_streamed
+    assert resp.mimetype == 'application/x-ndjson'
+    rows = [json.loads(line) for line in resp.data.decode().splitlines()]
+    assert [r['name'] for r in rows] == ['Model 0', 'Model 1', 'Model 2']
+    assert rows[0]['description'] == 'Line, "quoted" 0'
+
+    resp = get(app, '/api/export/rentals?format=csv')
+    assert 'filename="rentals.csv"' in resp.headers['Content-Disposition']
+    table = list(csv.DictReader(io.StringIO(resp.data.decode())))
+    assert table[0]['start_date'] == '2026-01-01' and table[0]['status'] == 'completed'
+
+    resp = get(app, '/api/export/listings?gzip=true')
+    assert resp.mimetype == 'application/gzip'
+    assert json.loads(gzip.decompress(resp.data))['daily_rate'] == 20.0
+
+    assert get(app, '/api/export/users').status_code == 404
+    assert get(app, '/api/export/payments', token='OTHER_TOKEN').status_code == 403
+    assert get(app, '/api/export/instruments', token='OTHER_TOKEN').status_code == 200
+    assert get(app, '/api/export/payments').data == b''
+
+
+def test_cli_export():
+    app = make_app()
+    result = app.test_cli_runner().invoke(args=['export', 'instruments', '--format', 'csv'])
+    assert result.exit_code == 0
+    assert result.output.splitlines()[0] == 'id,name,category,brand,model,description,created_at'
+    assert len(result.output.splitlines()) == 4
+
+
+def peak_export_memory(size):
+    app = make_app(size)
+    with app.app_context():
+        tracemalloc.start()
+        total = sum(len(chunk) for chunk in export_chunks('instruments', 'csv'))
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return total, peak
+
+
+def test_memory_is_flat():
+    small_bytes, small_peak = peak_export_memory(2000)
+    large_bytes, large_peak = peak_export_memory(40000)
+    print(f"2k rows: {small_bytes} bytes, peak {small_peak} B; 40k rows: {large_bytes} bytes, peak {large_peak} B")
+    assert large_bytes > 15 * small_bytes
+    assert large_peak < 2 * small_peak
+
+
+if __name__ == '__main__':
+    test_formats()
+    test_cli_export()
+    test_memory_is_flat()
+    print("[OK] Export tests passed")
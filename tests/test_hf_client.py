@@ -0,0 +1,166 @@
+"""
+Classifier Client Tests
+Tests the Hugging Face classifier client against a local stub HTTP server:
+caching, timeouts, the circuit breaker, and overlapping the call with local
+scoring in recommend_instruments_by_needs.
+"""
+
+import sys
+import os
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.init import create_app
+from app.db import db
+from app.models import User, Instrument, Instru_ownership
+from app.services.hf_client import ClassifierClient, CircuitBreaker, TTLCache
+from app.services.recommendation_service import recommend_instruments_by_needs
+
+RESULT = {'sequence': 'x', 'labels': ['acoustic', 'beginner-friendly', 'string-instrument', 'keyboard'],
+          'scores': [0.9, 0.8, 0.7, 0.1]}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        server.requests.append(body)
+        time.sleep(server.delay)
+        if server.status != 200:
+            self.send_response(server.status)
+            self.end_headers()
+            return
+        payload = json.dumps(RESULT).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub(delay=0.0, status=200):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    server.daemon_threads = True
+    server.requests, server.delay, server.status = [], delay, status
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}/classify'
+
+
+def test_cache_normalizes_text():
+    server, url = start_stub()
+    client = ClassifierClient(url)
+    try:
+        assert client.classify('Beginner  acoustic GUITAR') == RESULT
+        assert client.classify('beginner acoustic guitar ') == RESULT
+        assert client.classify_async('BEGINNER acoustic guitar').result(timeout=1) == RESULT
+        assert len(server.requests) == 1 and server.requests[0]['inputs'] == 'beginner acoustic guitar'
+    finally:
+        client.close()
+        server.shutdown()
+
+    cache = TTLCache(maxsize=2, ttl=0.05)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)  # Evicts the least recently used entry, 'b'
+    assert cache.get('b') is None and cache.get('a') == 1
+    time.sleep(0.06)
+    assert cache.get('a') is None
+
+
+def test_read_timeout_bounds_latency():
+    server, url = start_stub(delay=1.0)
+    client = ClassifierClient(url, connect_timeout=0.2, read_timeout=0.2)
+    try:
+        started = time.perf_counter()
+        assert client.classify('slow upstream') is None
+        assert time.perf_counter() - started < 0.6
+        assert client.breaker.failures == 1 and len(client.cache) == 0
+    finally:
+        client.close()
+        server.shutdown()
+
+
+def test_circuit_breaker():
+    server, url = start_stub(status=503)
+    client = ClassifierClient(url, breaker=CircuitBreaker(threshold=3, reset_timeout=0.2))
+    try:
+        for i in range(5):
+            assert client.classify(f'needs {i}') is None
+        # Opened after three failures; the rest never reached the server
+        assert len(server.requests) == 3 and client.breaker.state == CircuitBreaker.OPEN
+
+        time.sleep(0.25)
+        assert client.breaker.state == CircuitBreaker.HALF_OPEN
+        assert client.classify('trial') is None  # Failed trial reopens immediately
+        assert len(server.requests) == 4 and client.breaker.state == CircuitBreaker.OPEN
+
+        server.status = 200
+        time.sleep(0.25)
+        assert client.classify('recovered') == RESULT
+        assert client.breaker.state == CircuitBreaker.CLOSED and client.breaker.failures == 0
+    finally:
+        client.close()
+        server.shutdown()
+
+
+def make_app(url, **config):
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+                      'HF_CLASSIFICATION_URL': url, 'HF_READ_TIMEOUT': 0.5, **config})
+    with app.app_context():
+        db.create_all()
+        owner = User(email='owner@test.com', name='Owner', user_type='owner')
+        owner.set_password('password')
+        guitar = Instrument(name='Dreadnought', category='guitar', brand='Martin', description='Acoustic guitar')
+        db.session.add_all([owner, guitar])
+        db.session.flush()
+        db.session.add(Instru_ownership(user_id=owner.id, instrument_id=guitar.id, daily_rate=20.0))
+        db.session.commit()
+    return app
+
+
+def timed_recommendation(app, user_needs):
+    with app.app_context():
+        started = time.perf_counter()
+        result = recommend_instruments_by_needs(user_needs)
+        return result, time.perf_counter() - started
+
+
+def test_recommendations_overlap_and_degrade():
+    server, url = start_stub(delay=0.3)
+    try:
+        app = make_app(url)
+        result, elapsed = timed_recommendation(app, 'acoustic guitar')
+        assert result['classification'] == ['acoustic', 'beginner-friendly', 'string-instrument']
+        assert result['recommendations'][0]['name'] == 'Dreadnought'
+        assert elapsed < 0.5
+        # Cached now: no second upstream call, no waiting
+        result, elapsed = timed_recommendation(app, 'Acoustic Guitar')
+        assert len(server.requests) == 1 and elapsed < 0.1
+
+        # Upstream slower than the read timeout: recommendations still come back, unclassified
+        server.delay = 2.0
+        result, elapsed = timed_recommendation(app, 'electric guitar')
+        assert result['classification'] is None and result['recommendations']
+        assert elapsed < 1.5
+
+        sequential = make_app(url, HF_CLASSIFY_CONCURRENT=False)
+        server.delay = 0.1
+        result, _ = timed_recommendation(sequential, 'guitar please')
+        assert result['classification'] is not None
+    finally:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    test_cache_normalizes_text()
+    test_read_timeout_bounds_latency()
+    test_circuit_breaker()
+    test_recommendations_overlap_and_degrade()
+    print("[OK] Classifier client tests passed")
@@ -0,0 +1,76 @@
+"""
+Catalog Pagination Tests
+Tests keyset pagination and filters on GET /api/instruments
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.init import create_app
+from app.db import db
+from app.models import Instrument
+from datetime import datetime, timedelta
+
+
+def make_app():
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:'})
+    with app.app_context():
+        db.create_all()
+        base = datetime(2026, 1, 1)
+        # Two instruments share each timestamp so the id tiebreaker is exercised
+        for i in range(25):
+            db.session.add(Instrument(
+                name=f'Instrument {i}',
+                category='guitar' if i % 2 == 0 else 'piano',
+                brand='Fender' if i % 3 == 0 else 'Yamaha',
+                model=f'M{i}',
+                created_at=base + timedelta(minutes=i // 2)
+            ))
+        db.session.commit()
+    return app
+
+
+def test_pages_cover_catalog_once():
+    """Walking next_cursor returns every instrument exactly once, in order"""
+    app = make_app()
+    client = app.test_client()
+
+    seen = []
+    cursor = None
+    pages = 0
+    while True:
+        url = '/api/instruments?limit=10' + (f'&cursor={cursor}' if cursor else '')
+        resp = client.get(url)
+        assert resp.status_code == 200
+        data = resp.get_json()
+        assert len(data['items']) <= 10
+        seen.extend(item['id'] for item in data['items'])
+        pages += 1
+        cursor = data['next_cursor']
+        if not cursor:
+            break
+
+    assert pages == 3
+    assert seen == list(range(1, 26))
+
+
+def test_filters_and_limit():
+    """Filters combine with pagination and limit is bounded"""
+    app = make_app()
+    client = app.test_client()
+
+    resp = client.get('/api/instruments?category=guitar&brand=Fender&limit=100')
+    assert resp.status_code == 200
+    items = resp.get_json()['items']
+    assert items and all(i['category'] == 'guitar' and i['brand'] == 'Fender' for i in items)
+    assert resp.get_json()['next_cursor'] is None
+
+    assert client.get('/api/instruments?limit=500').status_code == 422
+    assert client.get('/api/instruments?cursor=not-a-cursor').status_code == 400
+
+
+if __name__ == '__main__':
+    test_pages_cover_catalog_once()
+    test_filters_and_limit()
+    print("[OK] Catalog pagination tests passed")
@@ -0,0 +1,81 @@
+"""
+Catalog Search Tests
+Tests ranked full-text search on GET /api/instruments/search (SQLite FTS5 path)
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.init import create_app
+from app.db import db
+from app.models import Instrument
+
+
+def make_app():
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:'})
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([
+            Instrument(name='Stratocaster', category='guitar', brand='Fender', model='Player',
+                       description='Electric guitar with a bright, glassy tone'),
+            Instrument(name='Dreadnought Acoustic', category='guitar', brand='Martin', model='D-28',
+                       description='Acoustic guitar, great for strumming'),
+            Instrument(name='Digital Piano', category='piano', brand='Yamaha', model='P-125',
+                       description='Weighted keys, good replacement for an acoustic piano'),
+            Instrument(name='Jazz Bass', category='bass', brand='Fender', model='JB',
+                       description='Versatile electric bass'),
+        ])
+        for i in range(30):
+            db.session.add(Instrument(name=f'Practice Pad {i}', category='drums', brand='Evans',
+                                      description='Quiet drum practice pad'))
+        db.session.commit()
+    return app
+
+
+def test_ranked_search():
+    app = make_app()
+    client = app.test_client()
+
+    items = client.get('/api/instruments/search?q=fender').get_json()['items']
+    assert {i['name'] for i in items} == {'Stratocaster', 'Jazz Bass'}
+
+    # A name hit outranks a description-only hit
+    items = client.get('/api/instruments/search?q=acoustic').get_json()['items']
+    assert items[0]['name'] == 'Dreadnought Acoustic'
+    assert len(items) == 2
+    assert items[0]['score'] >= items[1]['score']
+
+    # Stemming and prefix matching
+    assert client.get('/api/instruments/search?q=guitars').get_json()['items']
+    assert client.get('/api/instruments/search?q=strat').get_json()['items'][0]['name'] == 'Stratocaster'
+
+    # FTS operators in user input are treated as text
+    assert client.get('/api/instruments/search?q=%22OR%20NEAR(').status_code == 200
+
+
+def test_pagination_and_sync_triggers():
+    app = make_app()
+    client = app.test_client()
+
+    first = client.get('/api/instruments/search?q=practice&limit=20').get_json()
+    second = client.get(f"/api/instruments/search?q=practice&limit=20&offset={first['next_offset']}").get_json()
+    assert len(first['items']) == 20 and len(second['items']) == 10
+    assert second['next_offset'] is None
+
+    with app.app_context():
+        piano = Instrument.query.filter_by(name='Digital Piano').first()
+        piano.description = 'Stage keyboard'
+        db.session.commit()
+        db.session.delete(Instrument.query.filter_by(name='Jazz Bass').first())
+        db.session.commit()
+
+    assert client.get('/api/instruments/search?q=weighted').get_json()['items'] == []
+    assert [i['name'] for i in client.get('/api/instruments/search?q=stage').get_json()['items']] == ['Digital Piano']
+    assert [i['name'] for i in client.get('/api/instruments/search?q=fender').get_json()['items']] == ['Stratocaster']
+
+
+if __name__ == '__main__':
+    test_ranked_search()
+    test_pagination_and_sync_triggers()
+    print("[OK] Catalog search tests passed")
@@ -0,0 +1,137 @@
+"""
+Keyword Matcher Tests
+Tests the compiled Aho-Corasick KeywordMatcher, instrument-type extraction
+from config and catalog categories, and the fallback chatbot intents, and
+benchmarks the matcher against per-keyword `in` tests with thousands of terms.
+
+Run standalone for the full benchmark:  python tests/test_keyword_matcher.py
+"""
+
+import sys
+import os
+import random
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.init import create_app
+from app.db import db
+from app.models import Instrument
+from app.services.keyword_matcher import KeywordMatcher, merge_dictionaries
+from app.services.recommendation_service import extract_instrument_type_from_needs
+from app.services.chatbot_service import fallback_chatbot_response
+
+
+def make_app(config=None):
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:', **(config or {})})
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([
+            Instrument(name='Concert Uke', category='Ukulele', brand='Kala'),
+            Instrument(name='Stratocaster', category='guitar', brand='Fender'),
+        ])
+        db.session.commit()
+    return app
+
+
+def test_matcher():
+    matcher = KeywordMatcher({'guitar': ['acoustic', 'les paul'], 'bass': ['bass', 'acoustic bass'],
+                              'drums': ['drums', 'drum kit']})
+    assert len(matcher) == 6
+    # Overlapping terms all report; labels come back in dictionary order
+    assert matcher.matches('An ACOUSTIC bass, please') == ['guitar', 'bass']
+    assert matcher.matches('a Les Paul') == ['guitar'] and matcher.matches('les') == []
+    # Whole words only, with stemming on both sides
+    assert matcher.matches('a drum for my kid') == ['drums']
+    assert matcher.matches('drumsticks and bassoon') == []
+    # Failure links: "les les paul" still finds "les paul"
+    assert matcher.matches('les les paul') == ['guitar']
+    assert merge_dictionaries({'a': ['x']}, {'b': ['y'], 'a': ['z']}) == {'a': ['x', 'z'], 'b': ['y']}
+
+
+def test_instrument_types_from_config_and_catalog():
+    assert extract_instrument_type_from_needs('beginner acoustic guitar') == ['guitar']
+    assert extract_instrument_type_from_needs('a cheap ukulele') == []
+
+    app = make_app({'INSTRUMENT_KEYWORDS': {'Ukulele': ['uke'], 'guitar': ['strat']}})
+    with app.app_context():
+        assert extract_instrument_type_from_needs('a cheap ukulele') == ['ukulele']
+        assert extract_instrument_type_from_needs('uke or a strat') == ['guitar', 'ukulele']
+
+        db.session.add(Instrument(name='Etherwave', category='Theremin', brand='Moog'))
+        db.session.commit()
+        assert extract_instrument_type_from_needs('theremins') == ['theremin']
+
+
+def test_fallback_intents():
+    profile = {'experience_level': 'beginner'}
+    response, _ = fallback_chatbot_response('Any tips on drums?', profile, '')
+    assert response.startswith('Drums are fantastic')
+    response, _ = fallback_chatbot_response('What does pricing look like?', profile, '')
+    assert response.startswith('Our rental prices')
+    # "show" no longer matches "how", so this is not a help request
+    response, _ = fallback_chatbot_response('show me', profile, '')
+    assert response.startswith("That's an interesting question")
+    response, _ = fallback_chatbot_response('Can you suggest something?', profile, 'Available Instruments:\n')
+    assert response.startswith('Based on your profile')
+
+
+def synthetic_dictionary(label_count, terms_per_label, seed=7):
+    rng = random.Random(seed)
+    syllables = ['ka', 'lo', 'mi', 'ser', 'tan', 'vo', 'rux', 'pel', 'qui', 'dor']
+    dictionary = {}
+    for label in range(label_count):
+        terms = []
+        for _ in range(terms_per_label):
+            word = lambda: ''.join(rng.choice(syllables) for _ in range(rng.randint(2, 4)))
+            terms.append(word() if rng.random() < 0.7 else f"{word()} {word()}")
+        dictionary[f'label{label}'] = terms
+    return dictionary
+
+
+def naive_matches(dictionary, text):
+    """The original approach: substring test per keyword, label by label"""
+    text = text.lower()
+    return [label for label, keywords in dictionary.items() if any(keyword in text for keyword in keywords)]
+
+
+def benchmark(term_counts=(1000, 5000), message_count=200):
+    rng = random.Random(3)
+    results = {}
+    for term_count in term_counts:
+        dictionary = synthetic_dictionary(term_count // 50, 50)
+        terms = [term for keywords in dictionary.values() for term in keywords]
+        messages = [
+            "I'm looking for something " + " ".join(rng.choice(terms) for _ in range(2)) + " for my band practice"
+            for _ in range(message_count)
+        ]
+        started = time.perf_counter()
+        matcher = KeywordMatcher(dictionary)
+        build = time.perf_counter() - started
+
+        started = time.perf_counter()
+        compiled = [matcher.matches(message) for message in messages]
+        compiled_time = (time.perf_counter() - started) / message_count
+
+        started = time.perf_counter()
+        naive = [naive_matches(dictionary, message) for message in messages]
+        naive_time = (time.perf_counter() - started) / message_count
+
+        # Whole-word matching can only drop substring false positives, never miss a label
+        assert all(set(c) <= set(n) and c for c, n in zip(compiled, naive))
+        results[term_count] = (naive_time, compiled_time)
+        print(f"terms={term_count:5d}  in-loop={naive_time * 1e6:8.1f} us/msg  compiled={compiled_time * 1e6:6.1f} us/msg  "
+              f"speedup={naive_time / compiled_time:6.1f}x  (build {build * 1000:.0f} ms, once)")
+    return results
+
+
+def test_benchmark():
+    naive_time, compiled_time = benchmark((5000,), message_count=50)[5000]
+    assert compiled_time < naive_time
+
+
+if __name__ == '__main__':
+    test_matcher()
+    test_instrument_types_from_config_and_catalog()
+    test_fallback_intents()
+    benchmark((1000, 5000, 20000))
+    print("[OK] Keyword matcher tests passed")
@@ -0,0 +1,237 @@
+"""
+LLM Job Queue Tests
+Tests the bounded chatbot job queue: synchronous answers within
+LLM_SYNC_WAIT, 202 + polling and SSE subscription for async jobs, 429
+backpressure with Retry-After (streams included), failures, job ownership,
+job status served by another worker process, queue metrics, and that
+unrelated endpoints stay responsive while the LLM pool is saturated.
+"""
+
+import sys
+import os
+import json
+import tempfile
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.init import create_app
+from app.db import db
+from app.models import User, ChatMessage
+from app.services import chatbot_service
+from app.services.llm_jobs import LLMJobQueue, QueueFull
+from flask_jwt_extended import create_access_token
+
+REPLY = "An acoustic guitar is a great start."
+
+
+class SlowChain:
+    """Stands in for the prompt | OllamaLLM chain with a fixed generation time"""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+
+    def invoke(self, inputs):
+        time.sleep(self.seconds)
+        return REPLY
+
+    def stream(self, inputs):
+        yield self.invoke(inputs)
+
+
+def make_app(**config):
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+                      'LLM_WORKERS': 1, 'LLM_QUEUE_SIZE': 2, **config})
+    return seed(app)
+
+
+def seed(app):
+    with app.app_context():
+        db.create_all()
+        tokens = []
+        for i in range(2):
+            user = User(email=f'chat{i}@test.com', name=f'Chatter {i}', user_type='renter')
+            user.set_password('password')
+            db.session.add(user)
+            db.session.flush()
+            tokens.append(create_access_token(identity=str(user.id)))
+        db.session.commit()
+        app.config['TOKENS'] = tokens
+    return app
+
+
+def headers(app, user=0, **extra):
+    return {'Authorization': f"Bearer {app.config['TOKENS'][user]}", **extra}
+
+
+def chat(app, message='Which guitar?', path='/api/chatbot/chat', respond_async=False, user=0):
+    extra = {'Prefer': 'respond-async'} if respond_async else {}
+    return app.test_client().post(path, json={'message': message, 'session_id': 'jobs'},
+                                  headers=headers(app, user, **extra))
+
+
+def poll(app, url, user=0, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        body = app.test_client().get(url, headers=headers(app, user)).get_json()
+        if body['status'] in ('done', 'failed'):
+            return body
+        assert time.monotonic() < deadline
+        time.sleep(0.02)
+
+
+def stop(app):
+    app.extensions['llm_jobs'].stop()
+    chatbot_service._chain = None
+
+
+def test_sync_response_within_wait():
+    app = make_app()
+    chatbot_service._chain = SlowChain(0.01)
+    try:
+        resp = chat(app)
+        assert resp.status_code == 200
+        assert resp.get_json()['assistant_response'] == REPLY
+        with app.app_context():
+            assert ChatMessage.query.count() == 2
+    finally:
+        stop(app)
+
+
+def test_slow_generation_stays_synchronous_by_default():
+    """Without "Prefer: respond-async" clients keep getting the 200 ChatResponse"""
+    app = make_app()
+    chatbot_service._chain = SlowChain(1.2)
+    try:
+        resp = chat(app)
+        assert resp.status_code == 200 and resp.get_json()['assistant_response'] == REPLY
+    finally:
+        stop(app)
+
+
+def test_async_job_poll_and_subscribe():
+    app = make_app(LLM_SYNC_WAIT=0.05)
+    chatbot_service._chain = SlowChain(0.2)
+    try:
+        resp = chat(app, path='/api/chatbot/recommend-for-me')  # Slower than LLM_SYNC_WAIT
+        assert resp.status_code == 202
+        accepted = resp.get_json()
+        assert accepted['status'] in ('queued', 'running') and resp.headers['Location'] == accepted['status_url']
+
+        # Only the submitting user can see a job
+        assert app.test_client().get(accepted['status_url'], headers=headers(app, user=1)).status_code == 404
+        done = poll(app, accepted['status_url'])
+        assert done['status'] == 'done' and done['result']['assistant_response'] == REPLY
+
+        resp = chat(app, respond_async=True)
+        assert resp.status_code == 202
+        stream = app.test_client().get(resp.get_json()['status_url'] + '/events', headers=headers(app))
+        assert stream.mimetype == 'text/event-stream'
+        frames = [f for f in stream.get_data(as_text=True).split('\n\n') if f.startswith('event:')]
+        names = [f.split('\n')[0][len('event: '):] for f in frames]
+        assert names[-1] == 'done' and set(names[:-1]) <= {'status'}
+        assert json.loads(frames[-1].split('\n')[1][len('data: '):])['result']['assistant_response'] == REPLY
+    finally:
+        stop(app)
+
+
+def test_backpressure_and_isolation():
+    app = make_app(LLM_SYNC_WAIT=0)
+    chatbot_service._chain = SlowChain(0.3)
+    try:
+        accepted = [chat(app, respond_async=True)]
+        while app.extensions['llm_jobs'].stats()['running'] == 0:  # The worker picked it up
+            time.sleep(0.005)
+        accepted += [chat(app, respond_async=True) for _ in range(2)]  # One running, two waiting
+        assert [r.status_code for r in accepted] == [202, 202, 202]
+        rejected = chat(app, path='/api/chatbot/ask-instrument-question', respond_async=True)
+        assert rejected.status_code == 429
+        assert int(rejected.headers['Retry-After']) >= 1
+        # Streams take the same queue
+        rejected = chat(app, path='/api/chatbot/chat/stream')
+        assert rejected.status_code == 429 and int(rejected.headers['Retry-After']) >= 1
+
+        # The web tier is not blocked by the saturated LLM pool
+        started = time.perf_counter()
+        assert app.test_client().get('/api/instruments').status_code == 200
+        assert time.perf_counter() - started < 0.2
+
+        metrics = app.test_client().get('/api/chatbot/metrics', headers=headers(app)).get_json()
+        assert metrics['llm.queue']['max_queue'] == 2 and metrics['llm.queue']['running'] <= 1
+
+        for resp in accepted:
+            assert poll(app, resp.get_json()['status_url'])['status'] == 'done'
+        metrics = app.test_client().get('/api/chatbot/metrics', headers=headers(app)).get_json()
+        assert metrics['llm.execution']['count'] >= 3 and metrics['llm.execution']['p95_ms'] >= 250
+        # Later jobs waited for the single worker
+        assert metrics['llm.queue_wait']['p95_ms'] >= 250
+        assert chat(app, respond_async=True).status_code == 202  # Slots free again
+        stream = chat(app, path='/api/chatbot/chat/stream').get_data(as_text=True)
+        assert 'event: done' in stream and REPLY in stream
+    finally:
+        stop(app)
+
+
+def test_job_status_through_another_worker():
+    """Another process (its own app and engine over the same database) serves the job's status"""
+    with tempfile.TemporaryDirectory() as tmp:
+        config = {'TESTING': True, 'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp}/jobs.db",
+                  'LLM_WORKERS': 1, 'LLM_QUEUE_SIZE': 2, 'LLM_SYNC_WAIT': 0}
+        app = seed(create_app(config))
+        other = create_app(config)
+        other.config['TOKENS'] = app.config['TOKENS']
+        chatbot_service._chain = SlowChain(0.2)
+        try:
+            accepted = chat(app).get_json()
+            assert app.test_client().get(accepted['status_url'], headers=headers(other, user=1)).status_code == 404
+            assert other.test_client().get(accepted['status_url'], headers=headers(other, user=1)).status_code == 404
+            done = poll(other, accepted['status_url'])
+            assert done['status'] == 'done' and done['result']['assistant_response'] == REPLY
+
+            stream = other.test_client().get(accepted['status_url'] + '/events', headers=headers(other))
+            assert 'event: done' in stream.get_data(as_text=True)
+        finally:
+            stop(app)
+            other.extensions['llm_jobs'].stop()
+            with app.app_context():
+                db.engine.dispose()
+            with other.app_context():
+                db.engine.dispose()
+
+
+def test_queue_failures():
+    app = make_app()
+    jobs = LLMJobQueue(app, workers=1, max_queue=1).start()
+    try:
+        failing = jobs.submit(1, lambda: 1 / 0)
+        assert failing.wait(2) and failing.status == 'failed' and 'division' in failing.error
+        blocker = jobs.submit(1, time.sleep, 0.2)
+        time.sleep(0.05)
+        waiting = jobs.submit(1, lambda: 42)
+        try:
+            jobs.submit(1, lambda: 0)
+            assert False, "queue should be full"
+        except QueueFull:
+            pass
+        assert waiting.wait(2) and waiting.result == 42 and blocker.status == 'done'
+    finally:
+        jobs.stop()
+
+    jobs = LLMJobQueue(app, workers=1, max_queue=4, result_ttl=0).start()
+    try:
+        job = jobs.submit(1, lambda: 'ok')
+        job.wait(2)
+        time.sleep(0.01)
+        jobs.submit(1, lambda: 'next')  # Submitting prunes expired results
+        assert jobs.get(job.id) is None
+    finally:
+        jobs.stop()
+
+
+if __name__ == '__main__':
+    test_sync_response_within_wait()
+    test_slow_generation_stays_synchronous_by_default()
+    test_async_job_poll_and_subscribe()
+    test_backpressure_and_isolation()
+    test_queue_failures()
+    test_job_status_through_another_worker()
+    print("[OK] LLM job queue tests passed")
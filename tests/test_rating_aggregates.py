@@ -0,0 +1,118 @@
+"""
+Rating Aggregate Tests
+Tests that review create/update/delete keep listing rating aggregates in sync,
+that repair-ratings fixes drift, and that recommendation scoring reads
+ratings without per-listing queries.
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.init import create_app
+from app.db import db
+from app.models import User, Instrument, Instru_ownership, Rental
+from app.services.recommendation_service import get_all_instruments_text
+from app.services.scoring_engine import get_scoring_engine
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+from datetime import date
+
+
+def make_app(listing_count=2, reviews_per_listing=3):
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:'})
+    with app.app_context():
+        db.create_all()
+        owner = User(email='owner@test.com', name='Owner', user_type='owner')
+        owner.set_password('password')
+        renter = User(email='renter@test.com', name='Renter', user_type='renter')
+        renter.set_password('password')
+        instrument = Instrument(name='Stratocaster', category='guitar', brand='Fender')
+        db.session.add_all([owner, renter, instrument])
+        db.session.flush()
+        for _ in range(listing_count):
+            ownership = Instru_ownership(user_id=owner.id, instrument_id=instrument.id, daily_rate=20.0)
+            db.session.add(ownership)
+            db.session.flush()
+            for _ in range(reviews_per_listing):
+                db.session.add(Rental(user_id=renter.id, instru_ownership_id=ownership.id,
+                                      start_date=date(2026, 1, 1), end_date=date(2026, 1, 2),
+                                      total_cost=40.0, status='completed'))
+        db.session.commit()
+        app.config['RENTER_TOKEN'] = create_access_token(identity=str(renter.id))
+    return app
+
+
+def aggregates(app, ownership_id):
+    with app.app_context():
+        ownership = db.session.get(Instru_ownership, ownership_id)
+        return ownership.rating_count, ownership.rating_sum, ownership.rating_distribution
+
+
+def test_review_writes_maintain_aggregates():
+    app = make_app()
+    client = app.test_client()
+    auth = {'Authorization': f"Bearer {app.config['RENTER_TOKEN']}"}
+
+    ids = []
+    for rental_id, rating in ((1, 5), (2, 4), (3, 4)):
+        resp = client.post('/api/reviews/', headers=auth,
+                           json={'instru_ownership_id': 1, 'rental_id': rental_id, 'rating': rating})
+        assert resp.status_code == 201
+        ids.append(resp.get_json()['id'])
+    assert aggregates(app, 1) == (3, 13, {1: 0, 2: 0, 3: 0, 4: 2, 5: 1})
+    assert client.put(f'/api/reviews/{ids[0]}', headers=auth, json={'rating': 6}).status_code == 422
+
+    assert client.put(f'/api/reviews/{ids[0]}', headers=auth, json={'rating': 2}).status_code == 200
+    assert aggregates(app, 1) == (3, 10, {1: 0, 2: 1, 3: 0, 4: 2, 5: 0})
+
+    assert client.delete(f'/api/reviews/{ids[1]}', headers=auth).status_code == 204
+    assert aggregates(app, 1) == (2, 6, {1: 0, 2: 1, 3: 0, 4: 1, 5: 0})
+
+    stats = client.get('/api/reviews/ownership/1').get_json()['stats']
+    assert stats['average_rating'] == 3.0
+    assert stats['total_reviews'] == 2
+    assert aggregates(app, 2) == (0, 0, {1: 0, 2: 0, 3: 0, 4: 0, 5: 0})
+
+
+def test_repair_ratings_command():
+    app = make_app()
+    client = app.test_client()
+    auth = {'Authorization': f"Bearer {app.config['RENTER_TOKEN']}"}
+    client.post('/api/reviews/', headers=auth, json={'instru_ownership_id': 2, 'rental_id': 4, 'rating': 3})
+    client.post('/api/reviews/', headers=auth, json={'instru_ownership_id': 2, 'rental_id': 5, 'rating': 5})
+
+    with app.app_context():
+        ownership = db.session.get(Instru_ownership, 2)
+        ownership.rating_count, ownership.rating_sum, ownership.rating_3 = 9, 1, 0
+        db.session.commit()
+
+    result = app.test_cli_runner().invoke(args=['repair-ratings'])
+    assert 'for 1 listing(s)' in result.output
+    assert aggregates(app, 2) == (2, 8, {1: 0, 2: 0, 3: 1, 4: 0, 5: 1})
+    assert 'for 0 listing(s)' in app.test_cli_runner().invoke(args=['repair-ratings']).output
+
+
+def test_scoring_issues_no_rating_queries():
+    """Rating lookups cost nothing per listing"""
+    counts = {}
+    for size in (5, 50):
+        app = make_app(listing_count=size, reviews_per_listing=0)
+        statements = []
+        with app.app_context():
+            get_all_instruments_text()  # Warm per-process availability caches
+            event.listen(db.engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+            assert len(get_scoring_engine().score('guitar', ['guitar'])) == size
+            get_all_instruments_text()
+        # Only the snapshot's change-counter lookups, no reads of reviews or listings
+        assert all('change_counters' in statement for statement in statements)
+        counts[size] = len(statements)
+
+    assert counts[5] == counts[50] == 2
+
+
+if __name__ == '__main__':
+    test_review_writes_maintain_aggregates()
+    test_repair_ratings_command()
+    test_scoring_issues_no_rating_queries()
+    print("[OK] Rating aggregate tests passed")
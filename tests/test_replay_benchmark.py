@@ -0,0 +1,58 @@
+"""
+Replay Benchmark Tests
+Runs the offline replay harness at a small scale: report shape, held-out
+quality above a random baseline, and JSON output plus run comparison.
+"""
+
+import sys
+import os
+import json
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from replay_benchmark import run_benchmark, ranking_metrics, compare, main
+
+
+def test_ranking_metrics():
+    assert ranking_metrics([3, 1, 2], 3, 5) == (1.0, 1.0)
+    hit, ndcg = ranking_metrics([3, 1, 2], 2, 5)
+    assert hit == 1.0 and abs(ndcg - 0.5) < 1e-12
+    assert ranking_metrics([3, 1, 2], 2, 2) == (0.0, 0.0)
+    assert ranking_metrics([], 2, 5) == (0.0, 0.0)
+
+
+def test_report():
+    report = run_benchmark(instruments=120, users=60, sessions=40, warmup=2)
+    assert report['dataset']['held_out'] > 0 and report['dataset']['rentals'] > 0
+    for name in ('by_needs', 'recommendations'):
+        stats = report['endpoints'][name]
+        assert stats['calls'] == min(40, report['dataset']['held_out']) - 2
+        latency = stats['latency_ms']
+        assert 0 < latency['p50'] <= latency['p95'] <= latency['p99']
+        assert stats['sql_queries']['max'] >= 1
+        assert 0 <= stats['ndcg@5'] <= stats['hit@5'] <= 1
+    # Users' category preferences are learnable: far better than 5 random picks of 120
+    assert report['endpoints']['by_needs']['hit@5'] > 5 / 120 * 2
+
+
+def test_json_output_and_compare():
+    with tempfile.TemporaryDirectory() as directory:
+        before, after = os.path.join(directory, 'before.json'), os.path.join(directory, 'after.json')
+        args = ['--instruments', '80', '--users', '40', '--sessions', '20', '--feeds', 'live']
+        assert main(args + ['--output', before]) == 0
+        assert main(args + ['--output', after, '--compare', before]) == 0
+        with open(before) as f:
+            previous = json.load(f)
+        with open(after) as f:
+            current = json.load(f)
+    assert previous['config']['feeds'] == 'live' and previous['dataset'] == current['dataset']
+    lines = compare(previous, current)
+    assert any(line.startswith('by_needs') and 'latency_ms.p95' in line for line in lines)
+    assert any('hit@5' in line and '+0.0%' in line for line in lines)  # Same seed, same quality
+
+
+if __name__ == '__main__':
+    test_ranking_metrics()
+    test_report()
+    test_json_output_and_compare()
+    print("[OK] Replay benchmark tests passed")
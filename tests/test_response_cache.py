@@ -0,0 +1,214 @@
+"""
+Response Cache Tests
+Tests the chatbot response cache: exact (normalized) question hits, misses
+for different profiles, different wording and near-identical questions
+that mean something else, opt-in near-duplicate hits, invalidation when
+inventory changes, LRU and TTL eviction, the hit ratio in
+/api/chatbot/metrics, and that repeated questions reach the LLM once.
+"""
+
+import sys
+import os
+import time
+import uuid
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.init import create_app
+from app.db import db
+from app.models import User, Instrument, Instru_ownership, SurveyResponse, ChatMessage
+from app.services import chatbot_service
+from app.services.response_cache import ResponseCache, get_response_cache, normalize_question
+from flask_jwt_extended import create_access_token
+
+REPLY = ("The Yamaha C40 is a forgiving first guitar.\n"
+         "[RECOMMENDATIONS]\n"
+         '{"recommendations": [{"name": "Yamaha C40", "reason": "Beginner friendly"}]}\n'
+         "[/RECOMMENDATIONS]")
+
+
+class CountingChain:
+    """Stands in for the prompt | OllamaLLM chain and counts generations"""
+
+    def __init__(self):
+        self.calls = []
+
+    def invoke(self, inputs):
+        self.calls.append(inputs)
+        return REPLY
+
+    def stream(self, inputs):
+        yield self.invoke(inputs)
+
+
+def make_app(**config):
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:', **config})
+    with app.app_context():
+        db.create_all()
+        tokens = []
+        for i in range(3):
+            user = User(email=f'chat{i}@test.com', name=f'Chatter {i}', user_type='renter')
+            user.set_password('password')
+            db.session.add(user)
+            db.session.flush()
+            tokens.append(create_access_token(identity=str(user.id)))
+        # The third user's survey puts different profile fields into the prompt
+        db.session.add(SurveyResponse(user_id=3, experience_level='advanced'))
+        db.session.add(Instrument(id=1, name='Yamaha C40', category='guitar', brand='Yamaha'))
+        db.session.add(Instru_ownership(id=1, user_id=1, instrument_id=1, daily_rate=8.0, condition='good'))
+        db.session.commit()
+        app.config['TOKENS'] = tokens
+    return app
+
+
+def chat(app, message, user=0, session_id=None, path='/api/chatbot/chat'):
+    # A fresh session per question, so the conversation history is the same (empty)
+    return app.test_client().post(path, json={'message': message, 'session_id': session_id or uuid.uuid4().hex},
+                                  headers={'Authorization': f"Bearer {app.config['TOKENS'][user]}"})
+
+
+def run(app, test):
+    chatbot_service._chain = chain = CountingChain()
+    try:
+        test(chain)
+    finally:
+        chatbot_service._chain = None
+        app.extensions['llm_jobs'].stop()
+
+
+def test_repeated_questions_reach_the_llm_once():
+    app = make_app()
+
+    def test(chain):
+        first = chat(app, 'What guitar is best for a beginner?', session_id='first').get_json()
+        assert first['cached'] is False and len(chain.calls) == 1
+        again = chat(app, '  what GUITAR is best for a beginner ', session_id='again').get_json()
+        assert again['cached'] is True and len(chain.calls) == 1
+        assert again['assistant_response'] == first['assistant_response']
+        assert again['recommendations'] == [{'name': 'Yamaha C40', 'reason': 'Beginner friendly'}]
+
+        # Other wording misses, however close
+        assert chat(app, 'What guitar is best for beginners?').get_json()['cached'] is False
+        assert chat(app, 'What bass is best for a beginner?').get_json()['cached'] is False
+        assert len(chain.calls) == 3
+
+        # Same profile fields share answers; a different profile does not
+        assert chat(app, 'What guitar is best for a beginner?', user=1).get_json()['cached'] is True
+        assert chat(app, 'What guitar is best for a beginner?', user=2).get_json()['cached'] is False
+        assert len(chain.calls) == 4
+
+        # Both messages are stored for cached answers too
+        with app.app_context():
+            reply = ChatMessage.query.filter_by(session_id='again', message_type='assistant').one()
+            assert reply.context_data['cached'] is True and reply.content == first['assistant_response']
+
+        # Streaming shares the cache
+        body = chat(app, 'What guitar is best for a beginner?', path='/api/chatbot/chat/stream').get_data(as_text=True)
+        assert '"source": "cache"' in body and len(chain.calls) == 4
+
+        metrics = app.test_client().get('/api/chatbot/metrics', headers={
+            'Authorization': f"Bearer {app.config['TOKENS'][0]}"}).get_json()['chat.cache']
+        assert metrics['hits'] == 3 and metrics['similar_hits'] == 0 and metrics['misses'] == 4
+        assert metrics['hit_ratio'] == round(3 / 7, 4)
+
+    run(app, test)
+
+
+def test_near_identical_questions_with_different_meanings():
+    app = make_app()
+
+    def test(chain):
+        for asked, different in [('Which guitar under $20?', 'Which guitar over $20?'),
+                                 ('Which beginner violin should I rent?', 'Which beginner viola should I rent?')]:
+            chat(app, asked)
+            assert chat(app, different).get_json()['cached'] is False
+        assert len(chain.calls) == 4
+
+    run(app, test)
+
+
+def test_similarity_is_opt_in():
+    app = make_app(CHAT_CACHE_SIMILARITY=0.8)
+
+    def test(chain):
+        chat(app, 'What guitar is best for a beginner?')
+        assert chat(app, 'What guitar is best for beginners?').get_json()['cached'] is True
+        assert len(chain.calls) == 1
+        with app.app_context():
+            assert get_response_cache().stats()['similar_hits'] == 1
+
+    run(app, test)
+
+
+def test_inventory_change_invalidates_answers():
+    app = make_app()
+
+    def test(chain):
+        chat(app, 'Which guitar can I rent?')
+        assert chat(app, 'Which guitar can I rent?').get_json()['cached'] is True
+
+        with app.app_context():
+            db.session.get(Instru_ownership, 1).is_available = False
+            db.session.commit()
+        assert chat(app, 'Which guitar can I rent?').get_json()['cached'] is False
+        assert len(chain.calls) == 2
+        assert 'Yamaha C40' not in chain.calls[-1]['available_instruments']
+
+    run(app, test)
+
+
+def test_continuing_conversation_misses():
+    app = make_app()
+
+    def test(chain):
+        chat(app, 'Which guitar can I rent?', session_id='s1')
+        # The history in the prompt changed, so the cached answer no longer fits
+        assert chat(app, 'Which guitar can I rent?', session_id='s1').get_json()['cached'] is False
+        assert len(chain.calls) == 2
+
+    run(app, test)
+
+
+def test_disabled_cache():
+    app = make_app(CHAT_CACHE_SIZE=0)
+
+    def test(chain):
+        chat(app, 'Which guitar can I rent?')
+        assert chat(app, 'Which guitar can I rent?').get_json()['cached'] is False
+        assert len(chain.calls) == 2
+
+    run(app, test)
+
+
+def test_eviction_and_similarity_threshold():
+    assert normalize_question("  What's a GOOD  guitar?! ") == 'what s a good guitar'
+
+    cache = ResponseCache(maxsize=2, ttl=60)
+    cache.set('one', 'ctx', 1, 'a')
+    cache.set('two', 'ctx', 1, 'b')
+    assert cache.get('one', 'ctx', 1) == 'a'  # "one" is now most recently used
+    cache.set('three', 'ctx', 1, 'c')
+    assert cache.get('two', 'ctx', 1) is None and cache.get('one', 'ctx', 1) == 'a'
+    assert cache.get('one', 'other', 1) is None
+    assert cache.get('one', 'ctx', 2) is None and cache.stats()['invalidations'] == 1
+    cache.set('beginner violin', 'ctx', 2, 'violin')
+    assert cache.get('beginner viola', 'ctx', 2) is None  # Exact matches only by default
+
+    cache = ResponseCache(maxsize=4, ttl=0.05, similarity=0.8)
+    cache.set('which acoustic guitar suits a beginner', 'ctx', 1, 'a')
+    assert cache.get('which acoustic guitar suits a beginner?', 'ctx', 1) == 'a'
+    assert cache.get('which acoustic guitar suits beginners', 'ctx', 1) == 'a'
+    assert cache.get('which electric guitar suits a beginner', 'ctx', 1) is None
+    time.sleep(0.06)
+    assert cache.get('which acoustic guitar suits a beginner', 'ctx', 1) is None
+    assert cache.stats()['size'] == 0
+
+
+if __name__ == '__main__':
+    test_repeated_questions_reach_the_llm_once()
+    test_inventory_change_invalidates_answers()
+    test_near_identical_questions_with_different_meanings()
+    test_similarity_is_opt_in()
+    test_continuing_conversation_misses()
+    test_disabled_cache()
+    test_eviction_and_similarity_threshold()
+    print("[OK] Response cache tests passed")
@@ -0,0 +1,151 @@
+"""
+Scoring Engine Tests
+Checks the vectorized ScoringEngine against the per-listing
+score_instrument_match loop and benchmarks both at 1k, 10k and 100k listings.
+
+Run standalone for the full benchmark:  python tests/test_scoring_engine.py
+"""
+
+import sys
+import os
+import random
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.inventory_service import Listing
+from app.services.recommendation_service import extract_instrument_type_from_needs
+from app.services.scoring_engine import ScoringEngine
+
+CATEGORIES = ['Guitar', 'piano', 'drums', 'violin', 'flute', 'bass', 'ukulele']
+WORDS = ['acoustic', 'electric', 'beginner', 'vintage', 'studio', 'warm', 'bright', 'compact',
+         'stage', 'practice', 'professional', 'classical', 'fender', 'yamaha', 'maple', 'rosewood']
+QUERIES = [
+    ('beginner acoustic guitar', None),
+    ('electric bass for stage', 25.0),
+    ('cheap drums', 12.5),
+    ('a', 40.0),
+    ('', None),
+    ('PROFESSIONAL Violin, vintage', 30.0),
+]
+
+
+def make_listings(count, seed=1):
+    rng = random.Random(seed)
+    listings = []
+    for i in range(count):
+        rating_count = rng.choice([0, 0, 1, 3, 10])
+        listings.append(Listing(
+            id=i + 1, owner_id=1, condition='good', daily_rate=round(rng.uniform(5, 60), 2),
+            image_url=None, location='Berlin',
+            rating_count=rating_count, rating_sum=sum(rng.randint(1, 5) for _ in range(rating_count)),
+            instrument_id=i + 1, name=f"{rng.choice(WORDS).title()} {rng.choice(CATEGORIES)} {i}",
+            category=rng.choice(CATEGORIES),
+            brand='Brand', model=None,
+            description=" ".join(rng.choice(WORDS) for _ in range(rng.randint(0, 8))) or None
+        ))
+    return listings
+
+
+def score_instrument_match(listing, user_needs, matched_types, budget=None):
+    """
+    The original per-listing scorer (0-100), kept as the engine's reference.
+
+    listing is an inventory_service.Listing. Uses the substring keyword rule.
+    """
+    score = 0
+    
+    # Category match (40 points)
+    if listing.category.lower() in matched_types:
+        score += 40
+    
+    # Budget match (30 points)
+    if budget:
+        if listing.daily_rate <= budget:
+            score += 30
+        elif listing.daily_rate <= budget * 1.5:
+            score += 15
+    else:
+        score += 20  # Default points if no budget specified
+    
+    # Rating match (20 points)
+    avg_rating = listing.average_rating or 0
+    
+    if avg_rating >= 4.5:
+        score += 20
+    elif avg_rating >= 4.0:
+        score += 15
+    elif avg_rating >= 3.5:
+        score += 10
+    
+    # Keyword match in description/name (10 points)
+    combined_text = (listing.name + " " + (listing.description or "")).lower()
+    if any(keyword in combined_text for keyword in user_needs.lower().split()):
+        score += 10
+    
+    return score
+
+
+def loop_top(listings, user_needs, matched_types, budget, k=5):
+    """The original per-listing loop: score, keep positives, stable sort, take k"""
+    scored = [(score_instrument_match(l, user_needs, matched_types, budget), row) for row, l in enumerate(listings)]
+    scored = [item for item in scored if item[0] > 0]
+    scored.sort(key=lambda item: item[0], reverse=True)
+    return [row for _, row in scored[:k]], len(scored)
+
+
+def test_matches_reference_loop():
+    listings = make_listings(2000)
+    engine = ScoringEngine(listings)
+    for user_needs, budget in QUERIES:
+        matched_types = extract_instrument_type_from_needs(user_needs)
+        scores = engine.score(user_needs, matched_types, budget)
+        expected = [score_instrument_match(l, user_needs, matched_types, budget) for l in listings]
+        assert scores.tolist() == expected
+
+        top_rows, matched = loop_top(listings, user_needs, matched_types, budget)
+        assert engine.top_k(scores, 5).tolist() == top_rows
+        assert int((scores > 0).sum()) == matched
+
+
+def test_empty_inventory():
+    engine = ScoringEngine([])
+    scores = engine.score('guitar', ['guitar'], 10.0)
+    assert len(scores) == 0 and len(engine.top_k(scores, 5)) == 0
+
+
+def benchmark(sizes=(1000, 10000)):
+    results = {}
+    for size in sizes:
+        listings = make_listings(size, seed=size)
+        started = time.perf_counter()
+        engine = ScoringEngine(listings)
+        build = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for user_needs, budget in QUERIES:
+            matched_types = extract_instrument_type_from_needs(user_needs)
+            engine.top_k(engine.score(user_needs, matched_types, budget), 5)
+        vectorized = (time.perf_counter() - started) / len(QUERIES)
+
+        started = time.perf_counter()
+        for user_needs, budget in QUERIES:
+            loop_top(listings, user_needs, extract_instrument_type_from_needs(user_needs), budget)
+        loop = (time.perf_counter() - started) / len(QUERIES)
+
+        results[size] = (loop, vectorized)
+        print(f"listings={size:6d}  loop={loop * 1000:8.2f} ms  vectorized={vectorized * 1000:7.2f} ms  "
+              f"speedup={loop / vectorized:5.1f}x  (engine build {build * 1000:.0f} ms, once per snapshot)")
+    return results
+
+
+def test_benchmark():
+    results = benchmark()
+    loop, vectorized = results[10000]
+    assert vectorized < loop
+
+
+if __name__ == '__main__':
+    test_matches_reference_loop()
+    test_empty_inventory()
+    benchmark((1000, 10000, 100000))
+    print("[OK] Scoring engine tests passed")
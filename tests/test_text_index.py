@@ -0,0 +1,105 @@
+"""
+Text Index Tests
+Tests the BM25 catalog index: analysis (stopwords, stemming), ranking,
+rebuilds on catalog changes, and BM25 relevance feeding ScoringEngine.
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.init import create_app
+from app.db import db
+from app.models import User, Instrument, Instru_ownership
+from app.services.text_index import TextIndex, analyze, stem, get_text_index
+from app.services.scoring_engine import ScoringEngine
+from app.services.inventory_service import get_inventory_snapshot
+from app.services.recommendation_service import extract_instrument_type_from_needs
+
+CATALOG = [
+    (1, 'Stratocaster', 'Fender', 'Player', 'Bright electric guitar with maple neck'),
+    (2, 'Dreadnought', 'Martin', 'D-28', 'Acoustic guitar, warm and loud, great for beginners'),
+    (3, 'P-125', 'Yamaha', None, 'Digital piano with weighted keys'),
+    (4, 'Jazz Bass', 'Fender', 'JB', 'Electric bass guitar'),
+    (5, 'Export Kit', 'Pearl', None, 'Five piece drum kit'),
+]
+
+
+def make_app():
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:'})
+    with app.app_context():
+        db.create_all()
+        owner = User(email='owner@test.com', name='Owner', user_type='owner')
+        owner.set_password('password')
+        db.session.add(owner)
+        for instrument_id, name, brand, model, description in CATALOG:
+            category = 'piano' if instrument_id == 3 else 'drums' if instrument_id == 5 else 'guitar'
+            db.session.add(Instrument(id=instrument_id, name=name, category=category, brand=brand,
+                                      model=model, description=description))
+        db.session.flush()
+        for instrument_id, *_ in CATALOG:
+            db.session.add(Instru_ownership(user_id=owner.id, instrument_id=instrument_id, daily_rate=20.0))
+        db.session.commit()
+    return app
+
+
+def test_analysis():
+    assert analyze("I'm looking for a guitar") == ['guitar']
+    assert stem('guitars') == stem('guitar') == 'guitar'
+    assert stem('keys') == 'key' and stem('boxes') == 'box' and stem('strings') == 'string'
+    assert stem('bass') == 'bass' and stem('playing') == 'play' and stem('string') == 'string'
+    assert analyze('') == [] and analyze('a the of') == []
+
+
+def test_ranking():
+    index = TextIndex(CATALOG)
+    assert len(index) == 5
+    # Stopwords match nothing; "a" no longer matches every listing
+    assert index.top('a') == []
+    # Name hits outrank description hits, stemming folds plurals
+    ranked = [instrument_id for instrument_id, _ in index.top('electric guitars')]
+    assert set(ranked) == {1, 2, 4} and ranked[-1] == 2
+    assert index.top('Fender')[0][0] in (1, 4) and len(index.top('Fender')) == 2
+    assert [i for i, _ in index.top('weighted piano keys')] == [3]
+
+    relevance = index.relevance(index.doc_ids[::-1].copy(), 'drum kit')
+    assert relevance.tolist() == [1.0, 0.0, 0.0, 0.0, 0.0]
+    # Unknown instrument ids get no relevance
+    assert index.relevance(index.doc_ids + 100, 'drum').tolist() == [0.0] * 5
+
+
+def test_rebuilt_per_catalog_version():
+    app = make_app()
+    with app.app_context():
+        index = get_text_index()
+        assert get_text_index() is index
+        assert index.top('theremin') == []
+
+        db.session.add(Instrument(name='Etherwave', category='synth', brand='Moog', description='Theremin'))
+        db.session.commit()
+        rebuilt = get_text_index()
+        assert rebuilt is not index and rebuilt.top('theremin')[0][0] == 6
+
+
+def test_relevance_feeds_scoring():
+    app = make_app()
+    with app.app_context():
+        engine = ScoringEngine(get_inventory_snapshot().listings)
+        user_needs = 'warm acoustic guitar for beginners'
+        matched_types = extract_instrument_type_from_needs(user_needs)
+        relevance = get_text_index().relevance(engine.instrument_id, user_needs)
+        scores = engine.score(user_needs, matched_types, relevance=relevance)
+        best = engine.listings[engine.top_k(scores, 5)[0]]
+        assert best.name == 'Dreadnought' and scores.max() == 40 + 20 + 10
+        # Substring matching would give every guitar the full keyword points
+        legacy = engine.score(user_needs, matched_types)
+        assert sorted(legacy.tolist()) == [20, 20, 70, 70, 70]
+        assert sorted(scores.tolist())[2] < 70
+
+
+if __name__ == '__main__':
+    test_analysis()
+    test_ranking()
+    test_rebuilt_per_catalog_version()
+    test_relevance_feeds_scoring()
+    print("[OK] Text index tests passed")
@@ -0,0 +1,202 @@
+"""
+User Recommendation Feed Tests
+Tests precomputed per-user feeds: live fallback for new users, stale marking
+on rental/review/survey writes, batch and sweep refreshes, the background
+refresher (in-process, or as a separate process polling for stale feeds),
+staleness headers, and the cost of serving a stored feed.
+"""
+
+import sys
+import os
+import tempfile
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.init import create_app
+from app.db import db
+from app.models import User, Instrument, Instru_ownership, Rental, SurveyResponse, UserRecommendation
+from app.services.user_feed_service import refresh_stale_feeds, start_feed_refresher
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event, update
+from datetime import date, datetime, timedelta
+
+
+def make_app(database_uri='sqlite:///:memory:', **config):
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': database_uri, **config})
+    with app.app_context():
+        db.create_all()
+        owner = User(email='owner@test.com', name='Owner', user_type='owner')
+        renter = User(email='renter@test.com', name='Renter', user_type='renter')
+        for user in (owner, renter):
+            user.set_password('password')
+        db.session.add_all([owner, renter])
+        for i, category in enumerate(['guitar', 'piano', 'drums', 'violin'], start=1):
+            db.session.add(Instrument(id=i, name=f'{category.title()} {i}', category=category, brand='Brand'))
+        db.session.flush()
+        for i in range(1, 5):
+            db.session.add(Instru_ownership(id=i, user_id=owner.id, instrument_id=i, daily_rate=10.0))
+        db.session.commit()
+        app.config['RENTER_ID'] = renter.id
+        app.config['TOKEN'] = create_access_token(identity=str(renter.id))
+    return app
+
+
+def get_feed(app):
+    resp = app.test_client().get('/api/recommendations', headers={'Authorization': f"Bearer {app.config['TOKEN']}"})
+    assert resp.status_code == 200
+    return [i['id'] for i in resp.get_json()], resp.headers
+
+
+def add_rental(user_id, ownership_id):
+    db.session.add(Rental(user_id=user_id, instru_ownership_id=ownership_id, start_date=date(2026, 1, 1),
+                          end_date=date(2026, 1, 2), status='completed'))
+    db.session.commit()
+
+
+def test_live_fallback_then_precomputed():
+    app = make_app()
+    ids, headers = get_feed(app)
+    assert headers['X-Recommendations-Source'] == 'live'
+    assert headers['X-Recommendations-Stale'] == 'false'
+
+    with app.app_context():
+        assert refresh_stale_feeds(user_ids=[app.config['RENTER_ID']]) == 1
+        feed = db.session.get(UserRecommendation, app.config['RENTER_ID'])
+        assert feed is not None and not feed.stale
+
+    stored, headers = get_feed(app)
+    assert stored == ids
+    assert headers['X-Recommendations-Source'] == 'precomputed'
+    assert int(headers['X-Recommendations-Age']) < 5
+    assert headers['X-Recommendations-Computed-At'].endswith('Z')
+
+
+def test_writes_mark_feed_stale():
+    app = make_app()
+    renter_id = app.config['RENTER_ID']
+    with app.app_context():
+        refresh_stale_feeds(user_ids=[renter_id])
+        add_rental(renter_id, 3)
+        assert db.session.get(UserRecommendation, renter_id).stale
+    assert get_feed(app)[1]['X-Recommendations-Stale'] == 'true'
+
+    with app.app_context():
+        assert refresh_stale_feeds() == 1
+        # Drums rented: the category strategy now ranks drums first
+        assert db.session.get(UserRecommendation, renter_id).instrument_ids[0] == 3
+        assert refresh_stale_feeds() == 0
+
+        db.session.add(SurveyResponse(user_id=renter_id, preferred_instruments='Violin'))
+        db.session.commit()
+        assert db.session.get(UserRecommendation, renter_id).stale
+        refresh_stale_feeds()
+        assert db.session.get(UserRecommendation, renter_id).instrument_ids[:2] == [3, 4]
+
+    ids, headers = get_feed(app)
+    assert headers['X-Recommendations-Stale'] == 'false' and ids[:2] == [3, 4]
+
+
+def test_sweep_refreshes_old_feeds():
+    app = make_app()
+    with app.app_context():
+        refresh_stale_feeds(user_ids=[app.config['RENTER_ID']])
+        db.session.execute(update(UserRecommendation).values(computed_at=datetime.utcnow() - timedelta(days=2)))
+        db.session.commit()
+        assert refresh_stale_feeds() == 0
+        assert refresh_stale_feeds(max_age=timedelta(days=1)) == 1
+        assert refresh_stale_feeds(max_age=timedelta(days=1)) == 0
+
+    result = app.test_cli_runner().invoke(args=['refresh-recommendations', '--all'])
+    assert result.exit_code == 0 and 'Refreshed 2 recommendation feed(s)' in result.output
+
+
+def test_serving_stored_feed_is_cheap():
+    app = make_app()
+    with app.app_context():
+        refresh_stale_feeds(user_ids=[app.config['RENTER_ID']])
+        add_rental(app.config['RENTER_ID'], 1)
+        refresh_stale_feeds()
+        engine = db.engine
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, 'before_cursor_execute', listener)
+    try:
+        get_feed(app)
+    finally:
+        event.remove(engine, 'before_cursor_execute', listener)
+    # Feed row by primary key, plus the instruments free today (and at most the bookings
+    # counter lookup and one rebuild of the availability tree)
+    assert len(statements) <= 4
+    assert not any('GROUP BY' in statement for statement in statements)
+
+
+def test_background_refresher():
+    with tempfile.TemporaryDirectory() as directory:
+        app = make_app(f"sqlite:///{os.path.join(directory, 'feeds.db')}", RECOMMENDATION_REFRESH_DELAY=0.05)
+        refresher = start_feed_refresher(app)
+        try:
+            # A new user's first request queues their feed
+            assert get_feed(app)[1]['X-Recommendations-Source'] == 'live'
+            deadline = time.monotonic() + 5
+            while get_feed(app)[1]['X-Recommendations-Source'] != 'precomputed':
+                assert time.monotonic() < deadline
+                time.sleep(0.05)
+
+            # A rental wakes the refresher, which clears the stale flag
+            with app.app_context():
+                add_rental(app.config['RENTER_ID'], 2)
+            deadline = time.monotonic() + 5
+            while True:
+                ids, headers = get_feed(app)
+                if headers['X-Recommendations-Stale'] == 'false' and ids[:1] == [2]:
+                    break
+                assert time.monotonic() < deadline
+                time.sleep(0.05)
+        finally:
+            refresher.stop()
+            with app.app_context():
+                db.engine.dispose()
+
+
+def test_refresher_in_another_process():
+    with tempfile.TemporaryDirectory() as directory:
+        uri = f"sqlite:///{os.path.join(directory, 'feeds.db')}"
+        web = make_app(uri)
+        # A web app does not start its own refresher unless RECOMMENDATION_REFRESHER is set
+        assert 'feed_refresher' not in create_app({'SQLALCHEMY_DATABASE_URI': uri}).extensions
+        worker = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': uri,
+                             'RECOMMENDATION_REFRESH_DELAY': 0, 'RECOMMENDATION_POLL_INTERVAL': 0.05})
+
+        # The live feed is stored for the refresher, which only sees the database
+        ids, headers = get_feed(web)
+        assert headers['X-Recommendations-Source'] == 'live'
+        stored, headers = get_feed(web)
+        assert stored == ids and headers['X-Recommendations-Stale'] == 'true'
+
+        refresher = start_feed_refresher(worker)
+        try:
+            with web.app_context():
+                add_rental(web.config['RENTER_ID'], 2)
+            deadline = time.monotonic() + 5
+            while True:
+                ids, headers = get_feed(web)
+                if headers['X-Recommendations-Stale'] == 'false' and ids[:1] == [2]:
+                    break
+                assert time.monotonic() < deadline
+                time.sleep(0.05)
+        finally:
+            refresher.stop()
+            for app in (web, worker):
+                with app.app_context():
+                    db.engine.dispose()
+
+
+if __name__ == '__main__':
+    test_live_fallback_then_precomputed()
+    test_writes_mark_feed_stale()
+    test_sweep_refreshes_old_feeds()
+    test_serving_stored_feed_is_cheap()
+    test_background_refresher()
+    test_refresher_in_another_process()
+    print("[OK] User feed tests passed")